@@ -0,0 +1,78 @@
+"""
+LaTeXエスケープの処理量の計測．
+dataframe_to_latex をエスケープなし・あり（特殊文字なし／あり）で比べ，
+セルごとに .replace() を繰り返す素朴な実装とも比較する．
+
+    python benchmarks/bench_escape.py
+    python benchmarks/bench_escape.py --rows 100000 --cols 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.utils import parse_table, dataframe_to_latex, escape_table  # noqa: E402
+from synthetic import make_paste  # noqa: E402
+
+# 素朴な実装：特殊文字ごとに .replace() を呼ぶ（"\\" は最初に置き換える必要がある）
+_NAIVE = [("\\", r"\textbackslash{}"), ("&", r"\&"), ("%", r"\%"), ("$", r"\$"), ("#", r"\#"), ("_", r"\_"),
+          ("{", r"\{"), ("}", r"\}"), ("~", r"\textasciitilde{}"), ("^", r"\textasciicircum{}")]
+
+
+def naive_escape(text):
+    for old, new in _NAIVE:
+        text = text.replace(old, new)
+    # \textbackslash{} の { } も置き換えてしまうのを戻す
+    return text.replace(r"\textbackslash\{\}", r"\textbackslash{}") \
+               .replace(r"\textasciitilde\{\}", r"\textasciitilde{}") \
+               .replace(r"\textasciicircum\{\}", r"\textasciicircum{}")
+
+
+def naive_to_latex(table):
+    rows = [[naive_escape(cell) for cell in row] for row in table.rows()]
+    columns = [naive_escape(col) for col in table.columns]
+    return dataframe_to_latex([columns] + rows, escape=False)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    plain = parse_table(make_paste(args.rows, args.cols, ragged=0.0))
+    # 約半数のセルに % と _ が入った表（最も重い場合）
+    special = parse_table(make_paste(args.rows, args.cols, ragged=0.0).replace("3", "3%").replace("7", "_7"))
+    assert naive_to_latex(special) == dataframe_to_latex(special)
+
+    cases = [
+        ("escape=False", lambda: dataframe_to_latex(plain, escape=False)),
+        ("escape=True（特殊文字なし）", lambda: dataframe_to_latex(plain)),
+        ("escape=True（特殊文字あり）", lambda: dataframe_to_latex(special)),
+        ("escape=True（1列を除外）", lambda: dataframe_to_latex(special, raw_columns=[0])),
+        ("escape_table のみ", lambda: escape_table(special)),
+        ("素朴な .replace() の連鎖", lambda: naive_to_latex(special)),
+    ]
+    base = None
+    cells = args.rows * args.cols
+    print(f"{args.rows}x{args.cols} = {cells} cells")
+    for name, fn in cases:
+        seconds = best_of(fn, args.repeat)
+        base = base or seconds
+        print(f"{name:<28} {seconds * 1000:>9.2f} ms  {cells / seconds / 1e6:>6.2f} Mcells/s  x{seconds / base:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+編集履歴（tool/history.py）のメモリと時間の計測．
+同じ表に1セルずつの編集を繰り返したときの
+- copies: 編集のたびに DataFrame のコピーを履歴に残す方法
+- diffs:  TableState と EditHistory（セル単位の差分）
+の履歴のメモリ（tracemalloc）と，1回の編集（取り込み＋LaTeXの行の描き直し）と元に戻すのにかかる時間を表示する．
+
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py --rows 5000 --edits 500
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.history import EditHistory, TableState  # noqa: E402
+from tool.incremental import RowRenderCache  # noqa: E402
+from tool.utils import complex_row_latex, parse_table  # noqa: E402
+from synthetic import make_paste  # noqa: E402
+
+
+def edits(rows, cols, n, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randrange(rows), rng.randrange(cols), f"{rng.random() * 1000:.2f}") for _ in range(n)]
+
+
+def measure_copies(table, changes):
+    frame = table.to_frame()
+    gc.collect()
+    tracemalloc.start()
+    history = []
+    start = time.perf_counter()
+    for r, c, value in changes:
+        history.append(frame.copy())
+        frame.iat[r, c] = value
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, elapsed
+
+
+def measure_diffs(table, changes):
+    state = TableState(table, EditHistory(budget=2**40, max_steps=len(changes)))
+    cache = RowRenderCache(complex_row_latex)
+    cache.sync_state(state)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for r, c, value in changes:
+        state.apply_editor_state({"edited_rows": {r: {str(state.table.columns[c]): value}}})
+        cache.sync_state(state)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    while state.history.undo():
+        cache.sync_state(state)
+    undo = time.perf_counter() - start
+    assert state.history.nbytes > 0
+    return retained, elapsed, undo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    table = parse_table(make_paste(args.rows, args.cols, ragged=0.0))
+    changes = edits(args.rows, args.cols, args.edits)
+    print(f"{args.rows}x{args.cols} の表に {args.edits} 回の1セル編集（表自体 {table.memory_usage() / 2**20:.2f} MiB）")
+
+    retained, elapsed = measure_copies(table, changes)
+    print(f"copies: 履歴 {retained / 2**20:9.2f} MiB  編集 {elapsed / args.edits * 1e6:9.1f} µs/回")
+    retained, elapsed, undo = measure_diffs(table, changes)
+    print(f"diffs:  履歴 {retained / 2**20:9.2f} MiB  編集 {elapsed / args.edits * 1e6:9.1f} µs/回"
+          f"  元に戻す {undo / args.edits * 1e6:.1f} µs/回（LaTeXの行の描き直しを含む）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
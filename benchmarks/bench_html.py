@@ -0,0 +1,66 @@
+"""
+HTMLの表の読み込み（tool/html_table.py）の計測．Excel の「Webページとして保存」に似た，
+2段の結合ヘッダー（colspan / rowspan）と rows 行のデータを持つ HTML を作り，
+- 全体を1つの文字列として渡した場合と，バイト列（少しずつデコード）で渡した場合の時間
+- 読み込み中のピークメモリ（tracemalloc．入力の HTML 自体は含まない）と，読み込んだ表のメモリ
+を表示する．結合の展開とヘッダーの段数も確かめる．
+
+    python benchmarks/bench_html.py
+    python benchmarks/bench_html.py --rows 200000 --cols 12
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.html_table import parse_html_tables  # noqa: E402
+
+
+def make_html(rows, cols):
+    """ 1列目が縦に結合された見出し，残りの列が2列ずつ横に結合されたグループの表 """
+    groups = "".join(f'<td colspan=2 class=xl66>グループ{g}</td>' for g in range((cols - 1) // 2))
+    subs = "".join(f"<td class=xl67>項目{c}</td>" for c in range((cols - 1) // 2 * 2))
+    parts = ["<html><head><style>.xl65{mso-number-format:General}</style></head><body><table>",
+             f"<tr><td rowspan=2 class=xl65>名前</td>{groups}</tr>", f"<tr>{subs}</tr>"]
+    width = 1 + (cols - 1) // 2 * 2
+    for i in range(rows):
+        cells = "".join(f"<td class=xl68 align=right>{(i * 31 + c) % 997}.{c}</td>" for c in range(width - 1))
+        parts.append(f"<tr height=18><td class=xl65>run-{i:06d}</td>{cells}</tr>\n")
+    parts.append("</table></body></html>")
+    return "".join(parts), width
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=9)
+    args = parser.parse_args(argv)
+
+    html, width = make_html(args.rows, args.cols)
+    data = html.encode("utf-8")
+    print(f"{args.rows}行 × {width}列，HTML {len(data) / 2**20:.1f} MiB")
+
+    for name, source in (("str", html), ("bytes", data)):
+        gc.collect()
+        start = time.perf_counter()
+        [result] = parse_html_tables(source)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<6} {elapsed:7.2f} s  {args.rows / elapsed:>10,.0f} 行/s  {len(data) / 2**20 / elapsed:6.1f} MiB/s")
+
+    assert result.header_rows == 2 and result.table.shape == (args.rows + 2, width)
+    assert result.table.row(0)[:3] == ["名前", "グループ0", "グループ0"] and result.table.row(1)[0] == "名前"
+
+    gc.collect()
+    tracemalloc.start()
+    [result] = parse_html_tables(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"ピークメモリ {peak / 2**20:.1f} MiB・読み込んだ表 {result.table.memory_usage() / 2**20:.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+コアモジュールの読み込み時間の計測．
+新しいPythonプロセスで import にかかる時間を測り，重いライブラリ
+（pandas / numpy / streamlit）が読み込まれていないことを確認する．
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --budget-ms 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODULES = ["tool.utils", "tool.table", "tool.spans", "tool.cache", "tool.export", "tool.numeric", "tool.incremental", "tool.history", "tool.notion", "tool.cli", "tool.watch", "tool.html_table"]
+HEAVY = ["pandas", "numpy", "streamlit"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure(module, repeat):
+    """ 最良の読み込み時間（秒）と，一緒に読み込まれた重いライブラリ """
+    best, loaded = float("inf"), ""
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                             cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(out[0]))
+        loaded = out[1] if len(out) > 1 else ""
+    return best, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="これを超えるモジュールがあれば終了コード1")
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'module':<20} {'import [ms]':>12}  heavy modules")
+    for module in MODULES:
+        seconds, loaded = measure(module, args.repeat)
+        over = args.budget_ms is not None and seconds * 1000 > args.budget_ms
+        failed |= over or bool(loaded)
+        mark = "❌" if over or loaded else "✅"
+        print(f"{module:<20} {seconds * 1000:>12.2f}  {loaded or '-'} {mark}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
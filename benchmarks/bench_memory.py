@@ -0,0 +1,78 @@
+"""
+表の内部表現ごとのメモリ使用量の計測．
+同じ貼り付けテキストから
+- rows:      parse_rows の行のリスト（list of list）
+- DataFrame: 以前の変換経路（行のリスト → object型の DataFrame）
+- Table:     parse_table の Table（平らなセルのリスト＋同じ文字列の共有）
+を作り，作成後も残るメモリ（セル1つあたりのバイト数）と作成中のピークを tracemalloc で測る．
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --max-cells 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.utils import parse_rows, parse_table  # noqa: E402
+from synthetic import make_paste, make_repeated_paste  # noqa: E402
+
+
+def legacy_frame(text):
+    """ Table 導入前の parse_tab_separated_text と同じ手順で DataFrame を作る """
+    data = parse_rows(text)
+    width = max(map(len, data))
+    data = [row + [""] * (width - len(row)) for row in data]
+    return pd.DataFrame(data[1:], columns=data[0], dtype=object)
+
+
+BUILDERS = {
+    "rows": parse_rows,
+    "DataFrame": legacy_frame,
+    "Table": parse_table,
+}
+
+
+def build_cases(max_cells):
+    for rows, cols in ((10_000, 10), (100_000, 10), (1_000, 1_000)):
+        if rows * cols > max_cells:
+            continue
+        yield f"unique-{rows}x{cols}", rows * cols, make_paste(rows, cols, ragged=0.0)
+        yield f"repeated-{rows}x{cols}", rows * cols, make_repeated_paste(rows, cols)
+
+
+def measure(build, text):
+    """ (作成後も残るバイト数, 作成中のピークのバイト数) """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build(text)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-cells", type=int, default=10 ** 6, help="計測する表の最大セル数")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<24} {'model':<10} {'retained [MiB]':>15} {'bytes/cell':>11} {'peak [MiB]':>11} {'vs DataFrame':>13}")
+    for name, cells, text in build_cases(args.max_cells):
+        results = {model: measure(build, text) for model, build in BUILDERS.items()}
+        frame_bytes = results["DataFrame"][0]
+        for model, (retained, peak) in results.items():
+            ratio = retained / frame_bytes if frame_bytes else 0.0
+            print(f"{name:<24} {model:<10} {retained / 2**20:>15.2f} {retained / cells:>11.1f} "
+                  f"{peak / 2**20:>11.2f} {ratio:>12.0%}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
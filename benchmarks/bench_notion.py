@@ -0,0 +1,71 @@
+"""
+Notion からの読み込み（tool/notion.py）の計測．モックサーバー（mock_notion.py）に遅延を入れて，
+- 初回の読み込み
+- 変更なしでの再読み込み
+- 数十行を編集した後の再読み込み（並列数1と既定の並列数）と，半分の行を編集した後の再読み込み
+- ページ内の表の読み込みと再読み込み
+にかかる時間と API の呼び出し回数を表示する．結果はキャッシュなしで読み込んだ表と一致するか確かめる．
+
+    python benchmarks/bench_notion.py
+    python benchmarks/bench_notion.py --pages 3000 --latency 0.2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.notion import WORKERS, NotionClient, PageCache, import_notion  # noqa: E402
+from mock_notion import MockNotion, serve  # noqa: E402
+
+
+def run(url, target, cache, workers):
+    with NotionClient("dummy", base_url=url, workers=workers) as client:
+        start = time.perf_counter()
+        tables, stats = import_notion(client, target, cache)
+        return time.perf_counter() - start, tables, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000, help="データベースの行数")
+    parser.add_argument("--latency", type=float, default=0.05, help="1リクエストあたりの遅延（秒）")
+    parser.add_argument("--property-cost", type=float, default=0.0002, help="返すプロパティの値1つあたりの遅延（秒）")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--edited", type=int, default=40, help="数十行の編集で編集する行数")
+    args = parser.parse_args(argv)
+
+    mock = MockNotion(latency=args.latency, property_cost=args.property_cost)
+    database_id = mock.add_database(args.pages)
+    page_id = mock.add_page_with_tables()
+    server, url = serve(mock)
+    print(f"{args.pages}行のデータベース，遅延 {args.latency * 1000:.0f} ms/リクエスト")
+    print(f"{'case':<34} {'time [s]':>9} {'requests':>9} {'fetched':>8}")
+
+    def report(name, target, cache, workers=args.workers):
+        elapsed, tables, stats = run(url, target, cache, workers)
+        print(f"{name:<34} {elapsed:>9.2f} {stats['requests']:>9} {stats['fetched']:>8}", flush=True)
+        # キャッシュを使った結果が，キャッシュなしで読み込んだ表と同じか
+        _, fresh, _ = run(url, target, PageCache(), args.workers)
+        assert [(t, table.columns, table.cells) for t, table in tables] == \
+               [(t, table.columns, table.cells) for t, table in fresh], name
+
+    try:
+        cache = PageCache()
+        report("database, first import", database_id, cache)
+        report("reimport, unchanged", database_id, cache)
+        mock.touch(database_id, args.edited)
+        report(f"reimport, {args.edited} edited, workers=1", database_id, cache, workers=1)
+        mock.touch(database_id, args.edited)
+        report(f"reimport, {args.edited} edited, workers={args.workers}", database_id, cache)
+        mock.touch(database_id, args.pages // 2)
+        report(f"reimport, {args.pages // 2} edited", database_id, cache)
+        report("page tables", page_id, cache)
+        report("page tables, unchanged", page_id, cache)
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
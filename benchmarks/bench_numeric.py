@@ -0,0 +1,60 @@
+"""
+数値の列の書式（tool/numeric.py）の処理量の計測．
+列数の多い表で，書式なしの dataframe_to_latex と，列の判定・書き直し・太字を加えた場合を比べる．
+
+    python benchmarks/bench_numeric.py
+    python benchmarks/bench_numeric.py --rows 2000 --cols 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.numeric import classify_column  # noqa: E402
+from tool.utils import parse_table, dataframe_to_latex  # noqa: E402
+from synthetic import make_paste, make_repeated_paste  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    numbers = parse_table(make_paste(args.rows, args.cols, ragged=0.0))
+    # "○" "×" が混ざった文字列の列ばかりの表（判定は最初の数文字で打ち切られる）
+    texts = parse_table(make_repeated_paste(args.rows, args.cols))
+    n = numbers.n_cols
+
+    cases = [
+        ("書式なし", lambda: dataframe_to_latex(numbers)),
+        ("列の判定のみ", lambda: [classify_column(numbers.cells[j::n]) for j in range(n)]),
+        ("右揃え（r）", lambda: dataframe_to_latex(numbers, align_numbers="r")),
+        ("右揃え（文字列の列）", lambda: dataframe_to_latex(texts, align_numbers="r")),
+        ("小数点揃え（S）", lambda: dataframe_to_latex(numbers, align_numbers="S")),
+        ("有効数字3桁＋3桁区切り", lambda: dataframe_to_latex(numbers, sig_digits=3, thousands=True)),
+        ("最大値・最小値の太字", lambda: dataframe_to_latex(numbers, align_numbers="r", bold_max=True, bold_min=True)),
+    ]
+    base = None
+    cells = args.rows * args.cols
+    print(f"{args.rows}x{args.cols} = {cells} cells")
+    for name, fn in cases:
+        seconds = best_of(fn, args.repeat)
+        base = base or seconds
+        print(f"{name:<24} {seconds * 1000:>9.2f} ms  {cells / seconds / 1e6:>6.2f} Mcells/s  x{seconds / base:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
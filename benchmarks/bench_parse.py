@@ -0,0 +1,74 @@
+"""
+parse_tab_separated_text のスループット計測．
+以前の実装（Pythonでの行分割＋whileでの列埋め）と現在の csv モジュールによる実装を比較する．
+
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --rows 100000 --cols 10
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.utils import parse_tab_separated_text  # noqa: E402
+from synthetic import make_paste  # noqa: E402
+
+
+def legacy_parse_tab_separated_text(text, use_first_row_as_header=True, use_first_column_as_index=False):
+    """ 比較用：変更前の実装 """
+    if not text.strip():
+        return pd.DataFrame()
+
+    lines = text.strip().split('\n')
+    data = []
+    for line in lines:
+        cells = line.split('\t')
+        cells = [c.strip() for c in cells]
+        data.append(cells)
+
+    max_cols = max(len(row) for row in data)
+    for i in range(len(data)):
+        row = data[i]
+        while len(row) < max_cols:
+            row.append("")
+        data[i] = row
+
+    df = pd.DataFrame(data)
+    if use_first_row_as_header:
+        header = list(df.iloc[0])
+        df = df.iloc[1:].reset_index(drop=True)
+        df.columns = header
+    if use_first_column_as_index:
+        df = df.set_index(df.columns[0])
+    return df
+
+
+def bench(fn, text, repeat):
+    return min(timeit.repeat(lambda: fn(text), number=1, repeat=repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="*", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'cells':>10} {'legacy [s]':>12} {'current [s]':>12} {'Mcells/s':>10} {'speedup':>8}")
+    for rows in args.rows:
+        text = make_paste(rows, args.cols)
+        # 引用符を含まないデータでは出力が一致することを確認しておく
+        expected, actual = legacy_parse_tab_separated_text(text), parse_tab_separated_text(text)
+        assert list(expected.columns) == list(actual.columns)
+        assert expected.values.tolist() == actual.values.tolist()
+        legacy = bench(legacy_parse_tab_separated_text, text, args.repeat)
+        current = bench(parse_tab_separated_text, text, args.repeat)
+        cells = rows * args.cols
+        print(f"{cells:>10} {legacy:>12.4f} {current:>12.4f} {cells / current / 1e6:>10.2f} {legacy / current:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+計測フック（tool/perf.py）の負荷の計測．
+計測していないとき・しているときの1呼び出しあたりの追加時間と，
+小さな表の dataframe_to_latex に対する割合を表示する．
+
+    python benchmarks/bench_perf.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool import perf  # noqa: E402
+from tool.utils import parse_table, dataframe_to_latex  # noqa: E402
+from synthetic import make_paste  # noqa: E402
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    def noop():
+        return None
+
+    hooked = perf.timed("noop")(noop)
+
+    def in_stage():
+        with perf.stage("noop"):
+            pass
+
+    base = per_call(noop, args.calls)
+    print(f"{'素の関数':<24} {base * 1e9:>8.1f} ns/call")
+    for enabled in (False, True):
+        if enabled:
+            perf.start_run()
+        else:
+            perf.cancel_run()
+        state = "計測中" if enabled else "計測なし"
+        print(f"{'@timed（' + state + '）':<24} {(per_call(hooked, args.calls) - base) * 1e9:>8.1f} ns/call（追加分）")
+        print(f"{'stage()（' + state + '）':<24} {(per_call(in_stage, args.calls) - base) * 1e9:>8.1f} ns/call（追加分）")
+    perf.cancel_run()
+
+    table = parse_table(make_paste(10, 5, ragged=0.0))
+    latex = per_call(lambda: dataframe_to_latex(table), 20_000)
+    perf.start_run()
+    latex_on = per_call(lambda: dataframe_to_latex(table), 20_000)
+    perf.cancel_run()
+    print(f"10x5 の dataframe_to_latex  計測なし {latex * 1e6:.1f} µs  計測中 {latex_on * 1e6:.1f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
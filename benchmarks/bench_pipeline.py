@@ -0,0 +1,153 @@
+"""
+変換パイプライン全体のベンチマークと性能の回帰チェック．
+合成した表（10^2〜10^6セル，列数の揃わない行，多段ヘッダー，横長の表）で
+parse → dataframe_to_latex / generate_preview_html / generate_complex_latex の
+実行時間とピークメモリを計測する．
+
+    # 計測してベースラインを保存
+    python benchmarks/bench_pipeline.py --save benchmarks/baseline.json
+    # ベースラインと比較し，20%以上遅く（大きく）なったら終了コード1
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.utils import (  # noqa: E402
+    parse_tab_separated_text, dataframe_to_latex, generate_preview_html, generate_complex_latex,
+)
+from synthetic import make_paste, make_header, make_body  # noqa: E402
+
+
+def build_cases(max_cells):
+    """ (ケース名, セル数, 計測する処理の辞書) を順に返す．max_cells を超えるケースはデータも作らない """
+    # 縦長の表：10^2〜10^6セル（列数の揃わない行を含む貼り付け）
+    for exp in range(2, 7):
+        rows = 10 ** exp // 10
+        if rows * 10 > max_cells:
+            continue
+        text = make_paste(rows, 10, ragged=0.2)
+        df = parse_tab_separated_text(text)
+        yield f"tall-{rows}x10", rows * 10, {
+            "parse": lambda text=text: parse_tab_separated_text(text),
+            "dataframe_to_latex": lambda df=df: dataframe_to_latex(df, caption="c", label="tab:c"),
+            "longtable": lambda df=df: dataframe_to_latex(df, longtable=True),
+        }
+
+    # 横長の表
+    for rows, cols in ((10, 1_000), (100, 1_000), (100, 10_000)):
+        if rows * cols > max_cells:
+            continue
+        text = make_paste(rows, cols, ragged=0.0)
+        df = parse_tab_separated_text(text)
+        yield f"wide-{rows}x{cols}", rows * cols, {
+            "parse": lambda text=text: parse_tab_separated_text(text),
+            "dataframe_to_latex": lambda df=df: dataframe_to_latex(df),
+        }
+
+    # 多段ヘッダー付きの表（Tab 3）
+    for depth, rows, cols in ((2, 10, 8), (6, 1_000, 64), (8, 10_000, 100), (10, 1_000, 1_000)):
+        if (rows + depth) * cols > max_cells * 1.01:
+            continue
+        header_df = pd.DataFrame(make_header(depth, cols))
+        body_df = pd.DataFrame(make_body(rows, cols))
+        yield f"header{depth}-{rows}x{cols}", (rows + depth) * cols, {
+            "generate_preview_html": lambda h=header_df, b=body_df: generate_preview_html(h, b),
+            # Tab 3 のページ表示（1ページ50行）
+            "preview_page": lambda h=header_df, b=body_df: generate_preview_html(h, b, start=0, stop=50),
+            "generate_complex_latex": lambda h=header_df, b=body_df: generate_complex_latex(h, b, "c", "tab:c", "h"),
+        }
+
+
+def measure(fn, repeat):
+    """ 最良の実行時間（秒）とピークメモリ（バイト）を返す """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    # tracemalloc は処理を遅くするので時間とは別に1回だけ計測する
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(max_cells, repeat, only=None):
+    results = {}
+    for name, cells, stages in build_cases(max_cells):
+        for stage, fn in stages.items():
+            key = f"{name}/{stage}"
+            if only and only not in key:
+                continue
+            # 大きな表は繰り返し回数を減らす
+            seconds, peak = measure(fn, repeat if cells <= 100_000 else 1)
+            results[key] = {"cells": cells, "seconds": seconds, "peak_bytes": peak}
+            print(f"{key:<45} {cells:>9} cells {seconds * 1000:>10.2f} ms {peak / 2**20:>9.2f} MiB", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """ ベースラインより threshold 以上悪化したケースのリストを返す """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # ごく短い処理は計測の揺れが大きいので，min_seconds 以下の差は無視する
+        if (current["seconds"] > base["seconds"] * (1 + threshold)
+                and current["seconds"] - base["seconds"] > min_seconds):
+            regressions.append(f"{key}: time {base['seconds'] * 1000:.2f} ms -> {current['seconds'] * 1000:.2f} ms")
+        if current["peak_bytes"] > base["peak_bytes"] * (1 + threshold) and current["peak_bytes"] - base["peak_bytes"] > 2**20:
+            regressions.append(f"{key}: memory {base['peak_bytes'] / 2**20:.2f} MiB -> {current['peak_bytes'] / 2**20:.2f} MiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-cells", type=int, default=10 ** 6, help="計測する表の最大セル数")
+    parser.add_argument("--repeat", type=int, default=3, help="時間を計測する回数（最良値を使う）")
+    parser.add_argument("--only", help="名前にこの文字列を含むケースだけを計測する")
+    parser.add_argument("--save", help="計測結果をベースラインとして保存するJSONファイル")
+    parser.add_argument("--compare", help="比較するベースラインのJSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2, help="許容する悪化の割合（0.2 = 20%%）")
+    parser.add_argument("--min-seconds", type=float, default=0.002, help="これより小さい時間差は無視する")
+    args = parser.parse_args(argv)
+
+    results = run(args.max_cells, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"ベースラインを保存しました: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 件の性能低下を検出しました（閾値 {args.threshold:.0%}）:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\n✅ 性能低下はありません（閾値 {args.threshold:.0%}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
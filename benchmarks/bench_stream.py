@@ -0,0 +1,65 @@
+"""
+大きな TSV ファイルの変換の時間とピークメモリ（最大RSS）の計測．
+通常の変換（ファイル全体を読み込んで Table にする）とストリーミング変換（tool/stream.py）を，
+それぞれ別プロセスで実行して比べる．
+
+    python benchmarks/bench_stream.py
+    python benchmarks/bench_stream.py --rows 2000000 --cols 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import make_paste  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# 子プロセスで実行するコード．変換して (秒, 最大RSS[KiB]) を表示する
+CHILD = """
+import resource, sys, time
+sys.path.insert(0, {root!r})
+from tool.cli import convert_file
+start = time.perf_counter()
+convert_file({source!r}, {destination!r}, {{"stream_threshold": {threshold}}})
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def run_child(source, destination, threshold):
+    code = CHILD.format(root=ROOT, source=source, destination=destination, threshold=threshold)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    seconds, rss = out.split()
+    return float(seconds), int(rss) / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cols", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "large.tsv")
+        start = time.perf_counter()
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(make_paste(args.rows, args.cols))
+        size = os.path.getsize(source) / 2**20
+        print(f"{args.rows}x{args.cols} cells, {size:.1f} MiB (generated in {time.perf_counter() - start:.1f} s)")
+
+        outputs = {}
+        for name, threshold in (("通常の変換", 2**62), ("ストリーミング", 0)):
+            destination = os.path.join(tmp, f"{threshold}.tex")
+            seconds, rss = run_child(source, destination, threshold)
+            outputs[name] = destination
+            print(f"{name:<10} {seconds:>7.2f} s  {size / seconds:>7.1f} MiB/s  peak RSS {rss:>8.1f} MiB")
+        with open(outputs["通常の変換"], "rb") as a, open(outputs["ストリーミング"], "rb") as b:
+            print("出力は同じ" if a.read() == b.read() else "⚠️ 出力が異なります")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+監視モード（tool/watch.py）の計測．一時ディレクトリに多数の入力ファイルを置いて監視し，
+ランダムな1ファイルに短い間隔で何度か書き込む（保存の連打・結果の追記を真似る）たびに
+- 最後の書き込みから .tex が書き換わるまでの時間（p50・p95・最大）
+- 1回の書き込みの連続に対して変換し直した回数（1回のはず）と，書き換えられた他の .tex の数（0のはず）
+を表示する．比較として，全ファイルを変換し直す時間も表示する．
+
+    python benchmarks/bench_watch.py
+    python benchmarks/bench_watch.py --files 500 --rows 1000 --trials 30
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tool.cli import collect_sources, convert_file, output_path_for  # noqa: E402
+from tool.watch import POLL_INTERVAL, Watcher, regenerate_sources, run  # noqa: E402
+from synthetic import make_paste  # noqa: E402
+
+
+def outputs_mtime(sources, output_dir):
+    return {source: os.stat(output_path_for(source, output_dir)).st_mtime_ns for source in sources}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=3, help="1回の更新での書き込み回数")
+    parser.add_argument("--gap", type=float, default=0.05, help="書き込みの間隔（秒）")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    options = {"position": "t"}
+    with tempfile.TemporaryDirectory() as root:
+        source_dir = os.path.join(root, "results")
+        output_dir = os.path.join(root, "tables")
+        os.makedirs(source_dir)
+        for i in range(args.files):
+            with open(os.path.join(source_dir, f"run{i:04d}.tsv"), "w", encoding="utf-8") as f:
+                f.write(make_paste(args.rows, args.cols, ragged=0.0, seed=i))
+        sources = collect_sources([source_dir])
+
+        start = time.perf_counter()
+        for source in sources:
+            convert_file(source, output_path_for(source, output_dir), options)
+        full = time.perf_counter() - start
+        print(f"{args.files} ファイル（{args.rows}x{args.cols}）を全部変換し直すと {full * 1000:.0f} ms")
+
+        regenerated = []
+        watcher = Watcher(lambda: collect_sources([source_dir]))
+        watcher.poll()
+        stop = threading.Event()
+        thread = threading.Thread(target=run, args=(watcher, lambda changed: regenerated.extend(
+            regenerate_sources(changed, output_dir, options))), kwargs={"stop": stop})
+        thread.start()
+
+        latencies = []
+        extra_writes = 0
+        try:
+            for trial in range(args.trials):
+                source = rng.choice(sources)
+                destination = output_path_for(source, output_dir)
+                before = outputs_mtime(sources, output_dir)
+                regenerated.clear()
+                for n in range(args.burst):
+                    with open(source, "w", encoding="utf-8") as f:
+                        f.write(make_paste(args.rows, args.cols, ragged=0.0, seed=10**6 + trial * args.burst + n))
+                    if n + 1 < args.burst:
+                        time.sleep(args.gap)
+                saved = time.perf_counter()
+                while os.stat(destination).st_mtime_ns == before[source]:
+                    time.sleep(0.002)
+                latencies.append(time.perf_counter() - saved)
+                # 遅れて2回目の変換が走らないか，次の更新の前に少し待って確かめる
+                time.sleep(POLL_INTERVAL * 4)
+                after = outputs_mtime(sources, output_dir)
+                extra_writes += sum(after[s] != before[s] for s in sources if s != source)
+                assert len(regenerated) == 1, regenerated
+        finally:
+            stop.set()
+            thread.join()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"最後の書き込みから .tex の更新まで: p50 {statistics.median(latencies) * 1000:.0f} ms"
+          f"  p95 {p95 * 1000:.0f} ms  最大 {latencies[-1] * 1000:.0f} ms（{args.trials} 回）")
+    print(f"1回の更新あたりの変換 1 回，他の .tex の書き換え {extra_writes} 件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
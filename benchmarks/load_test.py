@@ -0,0 +1,167 @@
+"""
+変換サービス（python -m tool.server）の負荷試験．
+同時接続数ぶんのクライアントが Keep-Alive の接続でリクエストを送り続け，
+リクエスト/秒とレイテンシ（p50 / p99 / 最大）を表示する．
+
+    # サーバーを起動して計測（終わったら停止する）
+    python benchmarks/load_test.py --requests 2000 --concurrency 32
+    # 起動済みのサーバーに対して，キャッシュが効かないよう毎回キャプションを変えて計測
+    python benchmarks/load_test.py --url http://127.0.0.1:8765 --unique
+    # 1リクエストで20表ずつ送るバッチの計測
+    python benchmarks/load_test.py --batch 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import make_paste  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+async def read_response(reader):
+    """ (ステータスコード, 本文) を読む．Content-Length とチャンク転送の両方に対応 """
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return status, b"".join(chunks)
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    return await read_response(reader)
+
+
+def make_payload(i, text, args):
+    """ i 番目のリクエストの本文．--unique のときはキャプションを変えてキャッシュを効かなくする """
+    caption = f"表{i}" if args.unique else "表"
+    table = {"text": text, "caption": caption, "label": "tab:load", "longtable": args.longtable}
+    if args.batch > 1:
+        return "/batch", {"tables": [dict(table, caption=f"{caption}-{j}") for j in range(args.batch)],
+                          "stream": args.stream}
+    return "/convert", dict(table, stream=args.stream)
+
+
+async def run_load(host, port, args, text):
+    latencies = []
+    errors = 0
+    counter = iter(range(args.requests))
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                path, payload = make_payload(i, text, args)
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, host, "POST", path, payload)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await request(reader, writer, host, "GET", "/health")
+    writer.close()
+    return latencies, errors, elapsed, json.loads(body)["cache"]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def start_server(workers):
+    """ 空いているポートでサーバーを起動し，(プロセス, ポート) を返す """
+    proc = subprocess.Popen([sys.executable, "-m", "tool.server", "--port", "0", "--workers", str(workers)],
+                            cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    line = proc.stderr.readline()
+    if "listening on" not in line:
+        proc.kill()
+        raise RuntimeError(f"サーバーを起動できませんでした: {line}")
+    return proc, int(line.rsplit(":", 1)[1])
+
+
+def stop_server(proc, timeout=30):
+    """ Ctrl+C と同じ SIGINT で止め，ワーカーを片付けて終了するまで待つ """
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    proc.stderr.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="起動済みのサーバー（省略時はサーバーを起動して計測する）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="起動するサーバーのワーカー数")
+    parser.add_argument("--requests", type=int, default=1000, help="送るリクエストの総数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時接続数")
+    parser.add_argument("--rows", type=int, default=100, help="1表の行数")
+    parser.add_argument("--cols", type=int, default=10, help="1表の列数")
+    parser.add_argument("--batch", type=int, default=1, help="1リクエストに含める表の数（2以上で /batch）")
+    parser.add_argument("--unique", action="store_true", help="リクエストごとに内容を変えてキャッシュを効かなくする")
+    parser.add_argument("--longtable", action="store_true", help="longtableで出力させる")
+    parser.add_argument("--stream", action="store_true", help="ストリーミングで応答させる")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        proc, port = start_server(args.workers)
+        host = "127.0.0.1"
+
+    try:
+        text = make_paste(args.rows, args.cols)
+        latencies, errors, elapsed, cache = asyncio.run(run_load(host, port, args, text))
+    finally:
+        if proc is not None:
+            stop_server(proc)
+
+    n = len(latencies)
+    print(f"requests     {n}  (errors {errors}, concurrency {args.concurrency}, "
+          f"{args.batch} table(s)/request, {args.rows}x{args.cols} cells)")
+    print(f"throughput   {n / elapsed:.1f} req/s  ({n * args.batch / elapsed:.1f} tables/s)")
+    print(f"latency      p50 {statistics.median(latencies) * 1000:.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms  max {max(latencies) * 1000:.2f} ms")
+    print(f"server cache hits {cache['hits']}  misses {cache['misses']}  hit rate {cache['hit_rate']:.1%}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
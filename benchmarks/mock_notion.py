@@ -0,0 +1,240 @@
+"""
+Notion API のモックサーバー（tool/notion.py の動作確認・ベンチマーク用）．
+データベースのページ送り・filter_properties・ページ単体の取得・ページ内の表（table ブロック）に対応し，
+1リクエストごとに latency 秒待って，ネットワーク越しの API を真似る．
+さらに返したプロパティの値1つごとに property_cost 秒待つ（実際の API も返す行・プロパティが多いほど遅い）．
+
+    python benchmarks/mock_notion.py --port 8766 --pages 2000 --latency 0.05
+    NOTION_API_URL=http://127.0.0.1:8766/v1 NOTION_TOKEN=dummy python -m tool.notion <表示されたID> -o out/
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 最終編集日時の基準（キャッシュが使えるように，十分に過去の時刻にする）
+_EPOCH = datetime(2024, 4, 1, tzinfo=timezone.utc)
+METHODS = ["提案手法", "ベースライン", "アブレーション"]
+TAGS = ["GPU", "再現", "予備実験", "本番"]
+
+
+def _iso(minutes):
+    return (_EPOCH + timedelta(minutes=minutes)).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _text(value):
+    return [{"type": "text", "plain_text": value, "text": {"content": value}}]
+
+
+class MockNotion:
+    """ モックのデータ（データベース・ページ・ブロック）と，受けたリクエストの数 """
+
+    def __init__(self, latency=0.0, property_cost=0.0, seed=0):
+        self.latency = latency
+        self.property_cost = property_cost
+        self.requests = 0
+        self.rng = random.Random(seed)
+        self.databases = {}
+        self.pages = {}
+        self.children = {}
+        self._lock = threading.Lock()
+        self._clock = 0
+
+    def _tick(self):
+        self._clock += 1
+        return _iso(self._clock)
+
+    def add_database(self, n_pages, title="実験ログ"):
+        database_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        schema = {
+            "名前": {"id": "title", "type": "title", "title": {}},
+            "手法": {"id": "p%3Am", "type": "select", "select": {}},
+            "精度": {"id": "p%3Aa", "type": "number", "number": {}},
+            "タグ": {"id": "p%3At", "type": "multi_select", "multi_select": {}},
+            "実行日": {"id": "p%3Ad", "type": "date", "date": {}},
+            "完了": {"id": "p%3Ac", "type": "checkbox", "checkbox": {}},
+            "メモ": {"id": "p%3An", "type": "rich_text", "rich_text": {}},
+        }
+        self.databases[database_id] = {"object": "database", "id": database_id, "title": _text(title),
+                                       "properties": schema, "pages": []}
+        for i in range(n_pages):
+            page_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+            self.pages[page_id] = {"object": "page", "id": page_id, "archived": False,
+                                   "parent": {"type": "database_id", "database_id": database_id},
+                                   "last_edited_time": self._tick(), "properties": self._properties(i)}
+            self.databases[database_id]["pages"].append(page_id)
+        return database_id
+
+    def _properties(self, i):
+        rng = self.rng
+        return {
+            "名前": {"id": "title", "type": "title", "title": _text(f"run-{i:05d}")},
+            "手法": {"id": "p%3Am", "type": "select", "select": {"name": rng.choice(METHODS)}},
+            "精度": {"id": "p%3Aa", "type": "number", "number": round(rng.random(), 4)},
+            "タグ": {"id": "p%3At", "type": "multi_select",
+                   "multi_select": [{"name": tag} for tag in rng.sample(TAGS, rng.randint(0, 2))]},
+            "実行日": {"id": "p%3Ad", "type": "date", "date": {"start": f"2024-03-{i % 28 + 1:02d}", "end": None}},
+            "完了": {"id": "p%3Ac", "type": "checkbox", "checkbox": rng.random() < 0.5},
+            "メモ": {"id": "p%3An", "type": "rich_text", "rich_text": _text(f"seed={i} & lr=1e-{i % 5}")},
+        }
+
+    def add_page_with_tables(self, table_rows=(3, 150), title="結果のまとめ"):
+        """ 表（table ブロック）を含むページ．2つ目以降の表はページ送りが必要な行数にできる """
+        page_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        self.pages[page_id] = {"object": "page", "id": page_id, "archived": False, "parent": {"type": "workspace"},
+                               "last_edited_time": self._tick(),
+                               "properties": {"title": {"id": "title", "type": "title", "title": _text(title)}}}
+        blocks = [{"object": "block", "id": str(uuid.uuid4()), "type": "paragraph", "paragraph": {"rich_text": []}}]
+        for n_rows in table_rows:
+            table_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+            blocks.append({"object": "block", "id": table_id, "type": "table",
+                           "table": {"table_width": 3, "has_column_header": True, "has_row_header": False}})
+            self.children[table_id] = [
+                {"object": "block", "id": str(uuid.uuid4()), "type": "table_row",
+                 "table_row": {"cells": [_text(f"列{c}" if r == 0 else f"{r}-{c}") for c in range(3)]}}
+                for r in range(n_rows)]
+        self.children[page_id] = blocks
+        return page_id
+
+    def touch(self, database_id, n):
+        """ データベースの n 行を編集する（精度を変えて最終編集日時を進める）．編集したページIDを返す """
+        page_ids = self.rng.sample(self.databases[database_id]["pages"], n)
+        for page_id in page_ids:
+            page = self.pages[page_id]
+            page["properties"]["精度"]["number"] = round(self.rng.random(), 4)
+            page["last_edited_time"] = self._tick()
+        return page_ids
+
+    # --- API ---
+
+    def handle(self, method, path, query, body):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parts = path.strip("/").split("/")
+        if parts[:1] != ["v1"]:
+            return 404, _error("object_not_found", "unknown path")
+        parts = parts[1:]
+        if parts[0] == "databases" and len(parts) == 2 and method == "GET":
+            database = self.databases.get(parts[1])
+            if database is None:
+                return 404, _error("object_not_found", f"Could not find database with ID: {parts[1]}")
+            return 200, {key: value for key, value in database.items() if key != "pages"}
+        if parts[0] == "databases" and len(parts) == 3 and parts[2] == "query" and method == "POST":
+            database = self.databases.get(parts[1])
+            if database is None:
+                if parts[1] in self.pages:
+                    return 400, _error("validation_error", f"Provided ID {parts[1]} is a page, not a database.")
+                return 404, _error("object_not_found", f"Could not find database with ID: {parts[1]}")
+            wanted = query.get("filter_properties")
+            results, cursor = _paginate(database["pages"], body)
+            return 200, _list(self._pages(results, wanted), cursor)
+        if parts[0] == "pages" and len(parts) == 2 and method == "GET":
+            if parts[1] not in self.pages:
+                return 404, _error("object_not_found", f"Could not find page with ID: {parts[1]}")
+            return 200, self._pages([parts[1]])[0]
+        if parts[0] == "blocks" and len(parts) == 3 and parts[2] == "children" and method == "GET":
+            children = self.children.get(parts[1])
+            if children is None:
+                return 404, _error("object_not_found", f"Could not find block with ID: {parts[1]}")
+            results, cursor = _paginate(children, {key: values[0] for key, values in query.items()})
+            return 200, _list(results, cursor)
+        return 404, _error("object_not_found", "unknown path")
+
+    def _pages(self, page_ids, wanted=None):
+        pages = []
+        for page_id in page_ids:
+            page = dict(self.pages[page_id])
+            if wanted is not None:
+                page["properties"] = {name: prop for name, prop in page["properties"].items() if prop["id"] in wanted}
+            pages.append(page)
+        if self.property_cost:
+            time.sleep(self.property_cost * sum(len(page["properties"]) for page in pages))
+        return pages
+
+
+def _error(code, message):
+    return {"object": "error", "code": code, "message": message}
+
+
+def _paginate(items, body):
+    start = int(body.get("start_cursor") or 0)
+    size = min(int(body.get("page_size") or 100), 100)
+    stop = start + size
+    return items[start:stop], (str(stop) if stop < len(items) else None)
+
+
+def _list(results, cursor):
+    return {"object": "list", "results": results, "next_cursor": cursor, "has_more": cursor is not None}
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # ヘッダーと本文を別々に送るので，Nagle のアルゴリズムで応答が遅れないようにする
+        disable_nagle_algorithm = True
+
+        def _dispatch(self, method):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                status, data = 401, _error("unauthorized", "API token is invalid.")
+            else:
+                status, data = mock.handle(method, url.path, parse_qs(url.query), body)
+            payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(mock, port=0):
+    """ 別スレッドでモックサーバーを起動する．(サーバー, API の URL) を返す（終了は server.shutdown()） """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--pages", type=int, default=1000, help="データベースの行数")
+    parser.add_argument("--latency", type=float, default=0.05, help="1リクエストあたりの遅延（秒）")
+    parser.add_argument("--property-cost", type=float, default=0.0002, help="返すプロパティの値1つあたりの遅延（秒）")
+    args = parser.parse_args(argv)
+
+    mock = MockNotion(latency=args.latency, property_cost=args.property_cost)
+    database_id = mock.add_database(args.pages)
+    page_id = mock.add_page_with_tables()
+    server, url = serve(mock, args.port)
+    print(f"API: {url}\nデータベース: {database_id}（{args.pages}行）\n表のあるページ: {page_id}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
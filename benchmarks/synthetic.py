@@ -0,0 +1,43 @@
+"""
+ベンチマーク用の合成データ．
+Excelからの貼り付けを模したタブ区切りテキストと，結合セルを含む多段ヘッダーを作る．
+"""
+import random
+
+
+def make_paste(rows, cols, ragged=0.2, seed=0):
+    """ タブ区切りテキスト（1行目はヘッダー．ragged の割合の行は列数が少ない） """
+    rng = random.Random(seed)
+    lines = ["\t".join(f"列{j}" for j in range(cols))]
+    for _ in range(rows):
+        n = cols - rng.randint(1, cols - 1) if cols > 1 and rng.random() < ragged else cols
+        lines.append("\t".join(f"{rng.random() * 1000:.2f}" for _ in range(n)))
+    return "\n".join(lines)
+
+
+def make_repeated_paste(rows, cols, distinct=20, seed=0):
+    """ 同じ値が繰り返し現れるタブ区切りテキスト（評価結果やカテゴリの表を想定） """
+    rng = random.Random(seed)
+    values = [f"{v * 0.5:.1f}" for v in range(distinct - 2)] + ["○", "×"]
+    lines = ["\t".join(f"列{j}" for j in range(cols))]
+    for _ in range(rows):
+        lines.append("\t".join(rng.choice(values) for _ in range(cols)))
+    return "\n".join(lines)
+
+
+def make_header(depth, cols):
+    """
+    depth 段のヘッダー．上の段ほど広い範囲が同じ文字になり，
+    左端の列は全段が同じ文字（縦結合）になる
+    """
+    header = []
+    for level in range(depth):
+        width = 2 ** (depth - level - 1)
+        row = ["項目"] + [f"L{level}-{(j - 1) // width}" for j in range(1, cols)]
+        header.append(row)
+    return header
+
+
+def make_body(rows, cols, seed=0):
+    rng = random.Random(seed)
+    return [[f"{rng.random() * 1000:.2f}" for _ in range(cols)] for _ in range(rows)]
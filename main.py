@@ -1,5 +1,8 @@
+import importlib
+
 import streamlit as st
-from tool import tab1, tab2, tab3
+
+from tool import perf, perf_panel
 
 st.set_page_config(page_title="LaTeX表作成ツール", layout="wide")
 
@@ -11,41 +14,60 @@ st.markdown("""
 """)
 
 # 入力モードの選択
-tab1_render, tab2_render, tab3_render = st.tabs(["📋 Notion貼り付け", "🎨 インタラクティブ表作成", "📉 高度表作成"])
-
-with tab1_render:
-    tab1.render_tab1()
-
-with tab2_render:
-    tab2.render_tab2()
-
-with tab3_render:
-    tab3.render_tab3()
-
-# 使い方の説明
-with st.expander("📚 使い方"):
-    st.markdown("""
-    ## 📋 Notion表の貼り付け
-    1. NotionやExcelで表を選択してコピー（Ctrl+C）
-    2. 上のテキストエリアに貼り付けてください．タブ区切りで自動認識します．
-    3. 自動的にLaTeX形式に変換されます
-
-    ## 🎨 インタラクティブ作成
-    1. **表のサイズを設定**: 行数と列数を指定
-    2. **列名を設定**: 各列に名前を付ける
-    3. **新しい表を作成**: 「新しい表を作成」ボタンをクリック
-    4. **表を編集**: 各セルをクリックして値を入力
-    5. **LaTeXコードを確認**: 表の下にリアルタイムでLaTeX形式のコードが生成されます
-    6. **コードをコピー**: 下のテキストエリアからLaTeXコードをコピーして使用
-
-    **LaTeXでの使用例:**
-    ```latex
-    \\documentclass{article}
-    \\begin{document}
-    [LaTeXコードをここに挿入]
-    \\end{document}
-    ```
-    """)
-
-st.markdown("---")
-st.caption("💡 表の値を変更すると，LaTeXコードが自動的に更新されます．")
+# 各タブのモジュールは，そのタブが初めて開かれたときに読み込む
+TABS = [("📋 Notion貼り付け", "tab1"), ("🎨 インタラクティブ表作成", "tab2"), ("📉 高度表作成", "tab3")]
+
+
+def render_page():
+    """ タブと説明を描画し，開いたことのあるタブの名前を返す """
+    tab_containers = st.tabs([title for title, _ in TABS], on_change="rerun", key="main_tabs")
+
+    # 一度開いたタブは，入力内容を保つため以降も描画し続ける
+    opened_tabs = st.session_state.setdefault("opened_tabs", set())
+    for (_, name), container in zip(TABS, tab_containers):
+        if container.open:
+            opened_tabs.add(name)
+        if name in opened_tabs:
+            with container, perf.stage(f"render_{name}"):
+                module = importlib.import_module(f"tool.{name}")
+                getattr(module, f"render_{name}")()
+
+    # 使い方の説明
+    with st.expander("📚 使い方"):
+        st.markdown("""
+        ## 📋 Notion表の貼り付け
+        1. NotionやExcelで表を選択してコピー（Ctrl+C）
+        2. 上のテキストエリアに貼り付けてください．タブ区切りで自動認識します．
+        3. 自動的にLaTeX形式に変換されます
+
+        ## 🎨 インタラクティブ作成
+        1. **表のサイズを設定**: 行数と列数を指定
+        2. **列名を設定**: 各列に名前を付ける
+        3. **新しい表を作成**: 「新しい表を作成」ボタンをクリック
+        4. **表を編集**: 各セルをクリックして値を入力
+        5. **LaTeXコードを確認**: 表の下にリアルタイムでLaTeX形式のコードが生成されます
+        6. **コードをコピー**: 下のテキストエリアからLaTeXコードをコピーして使用
+
+        **LaTeXでの使用例:**
+        ```latex
+        \\documentclass{article}
+        \\begin{document}
+        [LaTeXコードをここに挿入]
+        \\end{document}
+        ```
+        """)
+
+    st.markdown("---")
+    st.caption("💡 表の値を変更すると，LaTeXコードが自動的に更新されます．")
+    return opened_tabs
+
+
+# サイドバーで有効にしたときだけ，処理段階ごとの時間を計測する
+perf_panel.start_measuring()
+try:
+    opened_tabs = render_page()
+    perf_panel.finish_measuring(label=",".join(sorted(opened_tabs)))
+finally:
+    # st.rerun() やセッションの終了で再実行が途中で打ち切られても，計測中のまま残さない
+    # （残すと，どのセッションも計測していないときの速い経路が使われなくなる）
+    perf.cancel_run()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from tool.build import build, unresolved_inputs
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def make_project(tmp_path):
+    (tmp_path / "results").mkdir()
+    write(tmp_path / "results" / "acc.tsv", "a\tb\n1\t2\n")
+    write(tmp_path / "results" / "sum.csv", "x,y\n3,4\n")
+    write(tmp_path / "tables.toml", 'output_dir = "tables"\naggregate = "all_tables.tex"\n'
+                                    '[[tables]]\nsource = "results/acc.tsv"\ncaption = "精度"\n'
+                                    '[[tables]]\nsource = "results/sum.csv"\n')
+    return str(tmp_path / "tables.toml")
+
+
+def test_second_build_skips_unchanged_tables(tmp_path):
+    manifest = make_project(tmp_path)
+    first = build(manifest)
+    assert len(first["rendered"]) == 2 and not first["failed"]
+    acc = tmp_path / "tables" / "acc.tex"
+    mtime = os.stat(acc).st_mtime_ns
+
+    second = build(manifest)
+    assert second["rendered"] == [] and second["written"] == []
+    assert len(second["unchanged"]) == 2
+    assert os.stat(acc).st_mtime_ns == mtime
+
+
+def test_touched_but_identical_input_is_not_rewritten(tmp_path):
+    manifest = make_project(tmp_path)
+    build(manifest)
+    acc = tmp_path / "tables" / "acc.tex"
+    mtime = os.stat(acc).st_mtime_ns
+    write(tmp_path / "results" / "acc.tsv", "a\tb\n1\t2\n")
+    result = build(manifest)
+    assert result["written"] == []
+    assert os.stat(acc).st_mtime_ns == mtime
+
+
+def test_changed_input_rewrites_only_that_table(tmp_path):
+    manifest = make_project(tmp_path)
+    build(manifest)
+    write(tmp_path / "results" / "sum.csv", "x,y\n3,5\n")
+    result = build(manifest)
+    assert [os.path.basename(p) for p in result["rendered"]] == ["sum.tex"]
+    assert "3 & 5" in (tmp_path / "tables" / "sum.tex").read_text(encoding="utf-8")
+
+
+def test_force_renders_everything(tmp_path):
+    manifest = make_project(tmp_path)
+    build(manifest)
+    assert len(build(manifest, force=True)["rendered"]) == 2
+
+
+def test_aggregate_inputs_resolve_from_the_manuscript_directory(tmp_path):
+    manifest = make_project(tmp_path)
+    result = build(manifest)
+    assert not result["failed"]
+    aggregate = tmp_path / "tables" / "all_tables.tex"
+    assert "\\input{tables/acc}" in aggregate.read_text(encoding="utf-8")
+    assert unresolved_inputs(str(aggregate), str(tmp_path)) == []
+
+
+def test_aggregate_uses_tex_root(tmp_path):
+    manifest = make_project(tmp_path)
+    (tmp_path / "paper").mkdir()
+    text = (tmp_path / "tables.toml").read_text(encoding="utf-8")
+    write(tmp_path / "tables.toml", 'tex_root = "paper"\n' + text)
+    assert not build(manifest)["failed"]
+    aggregate = tmp_path / "tables" / "all_tables.tex"
+    assert "\\input{../tables/sum}" in aggregate.read_text(encoding="utf-8")
+    assert unresolved_inputs(str(aggregate), str(tmp_path / "paper")) == []
+
+
+@pytest.mark.skipif(shutil.which("pdflatex") is None, reason="pdflatex がありません")
+def test_aggregate_compiles_from_the_manuscript_directory(tmp_path):
+    manifest = make_project(tmp_path)
+    build(manifest)
+    write(tmp_path / "main.tex", "\\documentclass{article}\\begin{document}\\input{tables/all_tables}\\end{document}\n")
+    subprocess.run(["pdflatex", "-interaction=nonstopmode", "-halt-on-error", "main.tex"], cwd=tmp_path,
+                   check=True, capture_output=True, timeout=120)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from tool.cache import RenderCache, content_hash, memoize
+from tool.table import Table
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RenderCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_hit_and_miss_counters():
+    cache = RenderCache(maxsize=4)
+    calls = []
+    double = memoize(lambda x: calls.append(x) or x * 2, cache)
+    assert [double(1), double(1), double(2), double(1)] == [2, 2, 4, 2]
+    assert calls == [1, 2]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0, "maxsize": 4}
+
+
+def test_content_hash_equal_for_equal_contents():
+    a = pd.DataFrame([["1", "x"], ["2", "y"]], columns=["p", "q"])
+    assert content_hash(a, caption="c") == content_hash(a.copy(), caption="c")
+    assert content_hash(Table(["1", "x"], 1, 2, ["p", "q"])) == content_hash(Table(["1", "x"], 1, 2, ["p", "q"]))
+    assert content_hash({"b": 1, "a": 2}) == content_hash({"a": 2, "b": 1})
+
+
+def test_content_hash_differs_for_different_contents():
+    assert content_hash(Table(["a\x1fb", "c"], 1, 2)) != content_hash(Table(["a", "b\x1fc"], 1, 2))
+    assert content_hash([["ab", "c"]]) != content_hash([["a", "bc"]])
+    assert content_hash(pd.DataFrame([["1"]])) != content_hash(pd.DataFrame([[1]]))
+    assert content_hash(Table(["1", "2"], 1, 2)) != content_hash(Table(["1", "2"], 2, 1))
+    assert content_hash("x", caption="a") != content_hash("x", caption="b")
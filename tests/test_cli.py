@@ -0,0 +1,53 @@
+import os
+
+from tool.cli import main, output_collisions
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_output_collisions():
+    sources = ["a/x.csv", "b/x.csv", "a/x.tsv", "a/y.tsv"]
+    collisions = output_collisions(sources, "out")
+    assert collisions == {os.path.normpath("out/x.tex"): ["a/x.csv", "b/x.csv", "a/x.tsv"]}
+    # 出力先を省略すると入力と同じディレクトリなので，a/x.* だけが重なる
+    assert output_collisions(sources) == {os.path.normpath("a/x.tex"): ["a/x.csv", "a/x.tsv"]}
+
+
+def test_main_refuses_colliding_outputs(tmp_path, capsys):
+    write(tmp_path / "a" / "x.csv", "p,q\n1,2\n")
+    write(tmp_path / "b" / "x.csv", "p,q\n3,4\n")
+    out = tmp_path / "out"
+    assert main([str(tmp_path / "a"), str(tmp_path / "b"), "-o", str(out), "-q"]) == 2
+    assert "x.tex" in capsys.readouterr().err
+    assert not out.exists()
+
+
+def test_main_converts_distinct_outputs(tmp_path):
+    write(tmp_path / "a" / "x.csv", "p,q\n1,2\n")
+    write(tmp_path / "a" / "y.tsv", "p\tq\n3\t4\n")
+    out = tmp_path / "out"
+    assert main([str(tmp_path / "a"), "-o", str(out), "-q", "-j", "1"]) == 0
+    assert "1 & 2" in (out / "x.tex").read_text(encoding="utf-8")
+    assert "3 & 4" in (out / "y.tex").read_text(encoding="utf-8")
+
+
+def test_streamed_output_is_not_rewritten_when_unchanged(tmp_path):
+    source = tmp_path / "big.tsv"
+    write(source, "p\tq\n" + "".join(f"{i}\t{i * 2}\n" for i in range(200)))
+    out = tmp_path / "out"
+    args = [str(source), "-o", str(out), "-q", "-j", "1", "--stream-mb", "0"]
+    assert main(args) == 0
+    tex = out / "big.tex"
+    os.utime(tex, ns=(0, 0))
+    assert main(args) == 0
+    assert tex.stat().st_mtime_ns == 0
+    assert sorted(p.name for p in out.iterdir()) == ["big.tex"]
+
+    write(source, "p\tq\n1\t3\n")
+    assert main(args) == 0
+    assert tex.stat().st_mtime_ns != 0
+    assert "1 & 3" in tex.read_text(encoding="utf-8")
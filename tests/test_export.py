@@ -0,0 +1,73 @@
+import csv
+import io
+import zipfile
+from html.parser import HTMLParser
+
+import pandas as pd
+
+from tool.export import build_exports, export_zip, standalone_document
+from tool.utils import dataframe_to_latex
+
+DF = pd.DataFrame([["X01", "5.1", "a&b"], ["X02", "<4.9>", 'say "hi", ok']], columns=["観測", "水温", "備考"])
+
+
+class _Cells(HTMLParser):
+    """ HTMLの表のセルの文字を行ごとに集める """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self.rows.append([])
+        elif tag in ("td", "th"):
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self.rows[-1].append("".join(self._cell))
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def test_csv_and_html_agree_with_table():
+    exports = build_exports(DF)
+    expected = [list(DF.columns)] + DF.values.tolist()
+    assert list(csv.reader(io.StringIO(exports["csv"]))) == expected
+    parser = _Cells()
+    parser.feed(exports["html"])
+    assert parser.rows == expected
+
+
+def test_tex_matches_dataframe_to_latex():
+    options = {"caption": "表", "label": "tab:a", "longtable": True, "raw_columns": [2]}
+    assert build_exports(DF, latex_options=options)["tex"] == dataframe_to_latex(DF, **options)
+    assert build_exports(DF)["tex"] == dataframe_to_latex(DF)
+    # 描画済みのコードを渡せばそれを使う
+    assert build_exports(DF, latex_code="% 表")["tex"] == "% 表"
+    # 行のリスト（1行目がヘッダー）も同じ
+    rows = [list(DF.columns)] + DF.values.tolist()
+    assert build_exports(rows) == build_exports(DF)
+
+
+def test_standalone_document_packages():
+    document = standalone_document(dataframe_to_latex(DF, longtable=True))
+    assert "\\documentclass{ltjsarticle}" in document
+    assert "\\usepackage{longtable}" in document and "\\usepackage{amsmath}" in document
+    assert "\\documentclass{article}" in standalone_document("\\begin{tabular}{S}\\end{tabular}")
+    assert "\\usepackage{siunitx}" in standalone_document("\\begin{tabular}{lS}\\end{tabular}")
+
+
+def test_zip_contains_all_exports():
+    exports = build_exports(DF)
+    with zipfile.ZipFile(io.BytesIO(export_zip(exports, name="result"))) as zf:
+        assert sorted(zf.namelist()) == ["result.csv", "result.html", "result.tex", "result_standalone.tex"]
+        assert zf.read("result.csv").decode() == exports["csv"]
+        assert zf.read("result.html").decode() == exports["html"]
+        assert zf.read("result.tex").decode() == exports["tex"]
+        assert zf.read("result_standalone.tex").decode() == exports["standalone"]
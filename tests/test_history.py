@@ -0,0 +1,82 @@
+from tool.history import EditHistory, TableState
+from tool.table import Table
+
+
+def make_state(history=None):
+    return TableState(Table.from_rows([["a", "b"], ["c", "d"]]), history)
+
+
+def test_undo_redo_cells():
+    state = make_state()
+    state.set_cells({(0, 0): "x", (1, 1): "y"})
+    assert state.table.to_rows() == [["x", "b"], ["c", "y"]]
+    assert state.history.undo()
+    assert state.table.to_rows() == [["a", "b"], ["c", "d"]]
+    assert state.history.redo()
+    assert state.table.to_rows() == [["x", "b"], ["c", "y"]]
+    assert not state.history.redo()
+
+
+def test_resize_keeps_cells_and_is_undoable():
+    state = make_state()
+    state.resize(3, 3)
+    assert state.table.to_rows() == [["a", "b", ""], ["c", "d", ""], ["", "", ""]]
+    state.resize(1, 1)
+    assert state.table.to_rows() == [["a"]]
+    state.history.undo()
+    assert state.table.to_rows() == [["a", "b", ""], ["c", "d", ""], ["", "", ""]]
+    state.history.undo()
+    assert state.table.to_rows() == [["a", "b"], ["c", "d"]]
+    state.history.redo()
+    state.history.redo()
+    assert state.table.to_rows() == [["a"]]
+
+
+def test_new_edit_clears_redo():
+    state = make_state()
+    state.set_cells({(0, 0): "x"})
+    state.history.undo()
+    state.set_cells({(0, 1): "y"})
+    assert not state.history.can_redo
+    assert state.table.to_rows() == [["a", "y"], ["c", "d"]]
+
+
+def test_transaction_undoes_both_tables_at_once():
+    history = EditHistory()
+    header, body = make_state(history), make_state(history)
+    with history.transaction():
+        header.replace(Table.from_rows([["h"]]))
+        body.resize(1, 2)
+    assert len(history) == 1
+    history.undo()
+    assert header.table.to_rows() == [["a", "b"], ["c", "d"]]
+    assert body.table.to_rows() == [["a", "b"], ["c", "d"]]
+
+
+def test_max_steps_evicts_oldest():
+    state = make_state(EditHistory(max_steps=3))
+    for i in range(5):
+        state.set_cells({(0, 0): str(i)})
+    assert len(state.history) == 3
+    assert state.history.evicted == 2
+    while state.history.undo():
+        pass
+    assert state.table.row(0)[0] == "1"
+
+
+def test_changed_rows():
+    state = make_state()
+    version = state.version
+    state.set_cells({(1, 0): "z"})
+    assert state.changed_rows(version) == {1}
+    version = state.version
+    state.resize(3, 2)
+    assert state.changed_rows(version) is None
+
+
+def test_replace_counts_both_tables():
+    state = make_state()
+    before = state.history.nbytes
+    old, new = state.table, Table.from_rows([[str(i) * 50 for i in range(20)]] * 20)
+    state.replace(new)
+    assert state.history.nbytes - before >= old.memory_usage() + new.memory_usage()
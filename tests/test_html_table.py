@@ -0,0 +1,65 @@
+from tool.html_table import HtmlTableParser, parse_html_tables
+
+EXCEL = """Version:0.9
+<html><head><style>td { color: red }</style></head><body><table>
+<tr><td rowspan=2>観測</td><td colspan=2>水温</td><td rowspan=2>深度</td></tr>
+<tr><td>A</td><td>B</td></tr>
+<tr><td>X01</td><td>5.1</td><td>1.3</td><td>98&nbsp;m</td></tr>
+<tr><td rowspan=2>G</td><td colspan=2>合計</td><td>1</td></tr>
+<tr><td>x</td><td>y</td><td>z</td></tr>
+</table></body></html>"""
+
+
+def test_spans_are_expanded_and_header_detected():
+    [result] = parse_html_tables(EXCEL)
+    assert result.header_rows == 2
+    assert result.header.to_rows() == [["観測", "水温", "水温", "深度"], ["観測", "A", "B", "深度"]]
+    # データ行の結合セルは左上にだけ文字を入れる
+    assert result.body.to_rows() == [["X01", "5.1", "1.3", "98 m"], ["G", "合計", "", "1"], ["", "x", "y", "z"]]
+    assert not result.truncated
+
+
+def test_thead_decides_header_and_implicit_end_tags():
+    [result] = parse_html_tables("<table><thead><tr><th>a<th>b<tbody><tr><td>1<td>2<tr><td>3<td>4</table>")
+    assert result.header_rows == 1
+    assert result.table.to_rows() == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_first_row_is_header_without_markup():
+    [result] = parse_html_tables("<table><tr><td>A</td><td>B</td></tr><tr><td rowspan=2>g</td><td>1</td></tr>"
+                                 "<tr><td>2</td></tr></table>")
+    assert result.header_rows == 1
+    assert result.body.to_rows() == [["g", "1"], ["", "2"]]
+
+
+def test_truncation():
+    html = "<table>" + "<tr><td colspan=5>x</td><td>y</td></tr>" * 10 + "</table>"
+    [result] = parse_html_tables(html, max_rows=3, max_cols=4)
+    assert result.truncated
+    assert result.table.shape == (3, 4)
+
+
+def contents(tables):
+    return [(t.table.cells, t.table.shape, t.header_rows) for t in tables]
+
+
+def test_bytes_and_small_chunks_give_same_result():
+    expected = contents(parse_html_tables(EXCEL))
+    assert contents(parse_html_tables(EXCEL.encode("utf-8"))) == expected
+    parser = HtmlTableParser()
+    for i in range(0, len(EXCEL), 3):
+        parser.feed(EXCEL[i:i + 3])
+    assert contents(parser.close()) == expected
+
+
+def test_no_table():
+    assert parse_html_tables("<p>no table</p>") == []
+
+
+def test_block_tags_separate_text():
+    [result] = parse_html_tables("<table><tr><td><p>a</p><p>b</p></td><td>c<br>d</td><td><div>e</div>f</td>"
+                                 "<td>g<table><tr><td>h</td><td>i</td></tr></table></td></tr></table>")
+    assert result.table.to_rows() == [["a b", "c d", "e f", "g h i"]]
+    # インライン要素では区切らない
+    [result] = parse_html_tables("<table><tr><td>1<b>2</b><span>3</span></td></tr></table>")
+    assert result.table.to_rows() == [["123"]]
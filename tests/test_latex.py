@@ -0,0 +1,74 @@
+import io
+
+import pandas as pd
+
+from tool.table import Table
+from tool.utils import dataframe_to_latex, iter_dataframe_latex, write_dataframe_latex
+
+DF = pd.DataFrame([["X01", "5.1", "1.3"], ["X02", "4.9", "2.0"]], columns=["観測", "水温", "深度"])
+
+# 行ごとの出力にする前の dataframe_to_latex の出力
+PREVIOUS = (
+    "\\begin{table}[h]\n"
+    "    \\centering\n"
+    "    \\caption{表}\n"
+    "    \\begin{tabular}{lcc}\n"
+    "        \\hline\n"
+    "         & \\text{観測} & \\text{水温} \\\\\n"
+    "        \\hline\n"
+    "        X01 & 5.1 & 1.3 \\\\\n"
+    "        X02 & 4.9 & 2.0 \\\\\n"
+    "        \\hline\n"
+    "    \\end{tabular}\n"
+    "    \\label{tab:a}\n"
+    "\\end{table}"
+)
+
+
+def test_small_table_output_is_unchanged():
+    assert dataframe_to_latex(DF, caption="表", label="tab:a") == PREVIOUS
+    # DataFrame と Table で同じ出力
+    table = Table(DF.to_numpy().ravel().tolist(), 2, 3, list(DF.columns))
+    assert dataframe_to_latex(table, caption="表", label="tab:a") == PREVIOUS
+
+
+def test_caption_below():
+    latex = dataframe_to_latex(DF, caption="表", label="tab:a", caption_position="下", position="t")
+    assert latex.startswith("\\begin{table}[t]\n    \\centering\n    \\begin{tabular}")
+    assert latex.endswith("    \\end{tabular}\n    \\caption{表}\n    \\label{tab:a}\n\\end{table}")
+
+
+def test_longtable():
+    latex = dataframe_to_latex(DF, caption="表", label="tab:a", longtable=True)
+    lines = latex.split("\n")
+    assert lines[0] == "\\begin{longtable}{lcc}"
+    assert lines[1] == "    \\caption{表}\\label{tab:a} \\\\"
+    # ヘッダーは最初のページと2ページ目以降の2回
+    assert lines.count("     & \\text{観測} & \\text{水温} \\\\") == 2
+    assert lines.index("    \\endfirsthead") < lines.index("    \\endhead") < lines.index("    \\endlastfoot")
+    assert lines[-3:] == ["    X01 & 5.1 & 1.3 \\\\", "    X02 & 4.9 & 2.0 \\\\", "\\end{longtable}"]
+    assert "\\begin{table}" not in latex and "tabular" not in latex
+
+
+def test_longtable_label_without_caption_and_caption_below():
+    lines = dataframe_to_latex(DF, label="tab:a", longtable=True).split("\n")
+    # キャプションが無ければ最初のページのヘッダーの左上にラベルを置く
+    assert "    \\label{tab:a} & \\text{観測} & \\text{水温} \\\\" in lines
+    lines = dataframe_to_latex(DF, caption="表", longtable=True, caption_position="下").split("\n")
+    assert lines[lines.index("    \\endlastfoot") - 1] == "    \\caption{表}"
+
+
+def test_writer_matches_string_output():
+    for longtable in (False, True):
+        buffer = io.StringIO()
+        written = write_dataframe_latex(DF, buffer, caption="表", label="tab:a", longtable=longtable)
+        expected = dataframe_to_latex(DF, caption="表", label="tab:a", longtable=longtable)
+        assert buffer.getvalue() == expected
+        assert written == len(expected)
+        assert "".join(iter_dataframe_latex(DF, caption="表", label="tab:a", longtable=longtable)) == expected
+
+
+def test_empty_table_writes_nothing():
+    buffer = io.StringIO()
+    assert write_dataframe_latex(DF.iloc[:0], buffer) == 0
+    assert dataframe_to_latex(DF.iloc[:0]) == ""
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+from tool.notion import NotionClient, PageCache, import_notion, parse_notion_id, property_text
+
+pytest.importorskip("requests")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from mock_notion import MockNotion, serve  # noqa: E402
+
+
+@pytest.fixture
+def notion():
+    mock = MockNotion()
+    server, url = serve(mock)
+    client = NotionClient("dummy", base_url=url, workers=4)
+    yield mock, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def expected_rows(mock, database_id):
+    columns = ["名前", "手法", "精度", "タグ", "実行日", "完了", "メモ"]
+    return [[property_text(mock.pages[page_id]["properties"][name]) for name in columns]
+            for page_id in mock.databases[database_id]["pages"]]
+
+
+def test_parse_notion_id():
+    raw = "0123456789abcdef0123456789abcdef"
+    assert parse_notion_id(f"https://www.notion.so/ws/実験ログ-{raw}?v=1") == "01234567-89ab-cdef-0123-456789abcdef"
+    assert parse_notion_id(raw) == parse_notion_id("01234567-89ab-cdef-0123-456789abcdef")
+
+
+def test_database_is_read_across_pages(notion):
+    mock, client = notion
+    database_id = mock.add_database(250)
+    [(title, table)], stats = import_notion(client, database_id, PageCache())
+    assert title == "実験ログ"
+    assert table.columns[0] == "名前"
+    assert table.to_rows() == expected_rows(mock, database_id)
+    # スキーマ1回と，100件ずつのページ送り3回
+    assert stats == {"pages": 250, "fetched": 250, "requests": 4}
+
+
+def test_unchanged_pages_come_from_cache(notion):
+    mock, client = notion
+    database_id = mock.add_database(250)
+    cache = PageCache()
+    import_notion(client, database_id, cache)
+
+    [(_, table)], stats = import_notion(client, database_id, cache)
+    # 最終編集日時だけを問い合わせ，ページは取得し直さない
+    assert stats == {"pages": 250, "fetched": 0, "requests": 4}
+    assert table.to_rows() == expected_rows(mock, database_id)
+
+    mock.touch(database_id, 3)
+    [(_, table)], stats = import_notion(client, database_id, cache)
+    assert stats == {"pages": 250, "fetched": 3, "requests": 4 + 3}
+    assert table.to_rows() == expected_rows(mock, database_id)
+
+
+def test_page_id_falls_back_to_page_tables(notion):
+    mock, client = notion
+    page_id = mock.add_page_with_tables(table_rows=(3, 150), title="まとめ")
+    cache = PageCache()
+    tables, stats = import_notion(client, page_id, cache)
+    assert [name for name, _ in tables] == ["まとめ (1)", "まとめ (2)"]
+    small, large = (table for _, table in tables)
+    assert small.columns == ["列0", "列1", "列2"]
+    assert small.to_rows() == [["1-0", "1-1", "1-2"], ["2-0", "2-1", "2-2"]]
+    # 150行の表は子ブロックのページ送りで読む
+    assert large.n_rows == 149 and large.row(148) == ["149-0", "149-1", "149-2"]
+    assert stats["fetched"] == 1
+
+    # ページの最終編集日時が同じなら，ページ1回の問い合わせだけで済む
+    again, stats = import_notion(client, page_id, cache)
+    assert stats == {"pages": 1, "fetched": 0, "requests": 1}
+    assert [table.to_rows() for _, table in again] == [table.to_rows() for _, table in tables]
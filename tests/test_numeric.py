@@ -0,0 +1,35 @@
+from tool.numeric import NUMERIC, PERCENT, TEXT, classify_column, format_numbers, format_values, parse_values
+from tool.table import Table
+
+
+def column(cells):
+    return format_numbers(Table(list(cells), len(cells), 1, ["x"]), sig_digits=3)[0].cells
+
+
+def test_significant_figures_per_value():
+    assert column(["1234.5", "-0.0001", "0.012345", "9.996", "0"]) == ["1230", "-0.000100", "0.0123", "10.0", "0.00"]
+
+
+def test_significant_figures_with_thousands_and_percent():
+    assert format_values([1234567.0, 0.5], "", NUMERIC, sig_digits=4, thousands=True) == ["1,235,000", "0.5000"]
+    assert format_values([12.345, None], "", PERCENT, sig_digits=2) == ["12%", ""]
+    # 丸めると 0 になる負の数
+    assert format_values([-0.0], "", NUMERIC, sig_digits=2) == ["0.0"]
+
+
+def test_without_sig_digits_keeps_the_longest_decimals():
+    values = [1.5, -0.001, 2.0]
+    assert format_values(values, "1.5\x1f-0.001\x1f2", NUMERIC) == ["1.500", "-0.001", "2.000"]
+
+
+def test_commas_only_as_thousands_separators():
+    assert parse_values(["1,234", "12,345.6", "-1,000,000"]) == [1234.0, 12345.6, -1000000.0]
+    assert parse_values(["1,5"]) is None
+    assert parse_values(["1,5", ""]) is None
+    assert parse_values(["1234,567"]) is None
+    assert classify_column(["1,5", "2,25"]) == TEXT
+    assert classify_column(["1,234", "5"]) == NUMERIC
+
+
+def test_decimal_comma_column_is_left_untouched():
+    assert column(["1,5", "2,25"]) == ["1,5", "2,25"]
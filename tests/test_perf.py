@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+from tool import perf
+
+MAIN = os.path.join(os.path.dirname(__file__), "..", "main.py")
+
+
+@perf.timed("work")
+def work(rows):
+    return len(rows)
+
+
+@pytest.fixture(autouse=True)
+def no_run():
+    perf.cancel_run()
+    yield
+    perf.cancel_run()
+
+
+def test_nothing_is_recorded_without_a_run():
+    assert perf._active == 0
+    assert work([[1, 2]]) == 1
+    assert perf.stage("noop") is perf._NULL
+    assert perf.finish_run() is None
+
+
+def test_timed_and_stage_record_during_a_run():
+    perf.start_run("label")
+    assert perf._active == 1
+    work([[1, 2], [3, 4]])
+    work([[1, 2, 3]])
+    with perf.stage("block", [[1]]):
+        pass
+    record = perf.finish_run({"session": "s"})
+    assert perf._active == 0
+    stages = {stage["stage"]: stage for stage in record["stages"]}
+    assert (stages["work"]["calls"], stages["work"]["rows"], stages["work"]["cols"]) == (2, 2, 3)
+    assert stages["block"]["calls"] == 1
+    assert record["label"] == "label" and record["session"] == "s"
+    # 計測を終えたあとは記録しない
+    work([[1]])
+    assert perf.finish_run() is None
+
+
+def test_only_the_measuring_thread_records():
+    perf.start_run()
+    other = threading.Thread(target=lambda: work([[1]]))
+    other.start()
+    other.join()
+    assert perf.finish_run()["stages"] == []
+
+
+def test_restarting_and_cancelling_keep_the_count():
+    perf.start_run()
+    perf.start_run()
+    assert perf._active == 1
+    perf.cancel_run()
+    perf.cancel_run()
+    assert perf._active == 0
+
+
+def test_interrupted_rerun_does_not_leave_a_run_active(monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    import tool.tab1
+
+    def interrupted():
+        raise RuntimeError("再実行の途中で打ち切り")
+
+    monkeypatch.setattr(tool.tab1, "render_tab1", interrupted)
+    at = AppTest.from_file(MAIN, default_timeout=60)
+    at.session_state["perf_enabled"] = True
+    at.run()
+    assert at.exception
+    assert perf._active == 0
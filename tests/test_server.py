@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import pytest
+
+from tool.server import ConversionService, HTTPError, parse_job
+
+
+def test_parse_job_accepts_valid_options():
+    text, options, delimiter = parse_job({"text": "a\tb", "caption": "表", "header_rows": 2, "sig_digits": None,
+                                          "raw_columns": [0, 2], "position": "tb", "complex": True})
+    assert text == "a\tb" and delimiter is None
+    assert options == {"caption": "表", "header_rows": 2, "sig_digits": None, "raw_columns": [0, 2],
+                       "position": "tb", "complex": True}
+
+
+@pytest.mark.parametrize("key, value", [
+    ("header_rows", "x"),
+    ("header_rows", 0),
+    ("header_rows", True),
+    ("sig_digits", 2.5),
+    ("sig_digits", 99),
+    ("escape", "no"),
+    ("caption", 1),
+    ("position", "x"),
+    ("caption_position", "中"),
+    ("align_numbers", "c"),
+    ("raw_columns", [0, -1]),
+    ("raw_columns", "0"),
+])
+def test_parse_job_rejects_invalid_options(key, value):
+    with pytest.raises(HTTPError) as info:
+        parse_job({"text": "a", key: value})
+    assert info.value.status == 400
+    assert f'"{key}"' in str(info.value)
+
+
+def test_invalid_option_is_a_400_response():
+    class Writer:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += data
+
+        async def drain(self):
+            pass
+
+    service = ConversionService()
+    writer = Writer()
+    body = json.dumps({"text": "a\tb\n1\t2", "header_rows": "x"}).encode()
+    with pytest.raises(HTTPError) as info:
+        asyncio.run(service.dispatch("POST", "/convert", body, writer))
+    assert info.value.status == 400
+
+    result = asyncio.run(service.convert_item({"text": "a", "sig_digits": "3"}))
+    assert result == {"error": '"sig_digits" は1〜15 の整数か null で指定してください'}
@@ -0,0 +1,36 @@
+from tool.spans import Span, merge_plan
+
+
+def test_horizontal_and_vertical_merge():
+    plan = merge_plan([
+        ["観測", "水温", "水温", "深度"],
+        ["観測", "A", "B", "深度"],
+    ])
+    assert plan[0] == (
+        Span(0, 0, 2, 1, "観測"),
+        Span(0, 1, 1, 2, "水温"),
+        Span(0, 3, 2, 1, "深度"),
+    )
+    assert plan[1] == (
+        Span(1, 0, 2, 1, "観測", covered=True),
+        Span(1, 1, 1, 1, "A"),
+        Span(1, 2, 1, 1, "B"),
+        Span(1, 3, 2, 1, "深度", covered=True),
+    )
+
+
+def test_rectangular_merge():
+    plan = merge_plan([["x", "x"], ["x", "x"]])
+    assert plan[0] == (Span(0, 0, 2, 2, "x"),)
+    assert plan[1] == (Span(1, 0, 2, 2, "x", covered=True),)
+
+
+def test_no_vertical_merge_when_ranges_differ():
+    plan = merge_plan([["x", "x", "y"], ["x", "z", "z"]])
+    assert plan[0][0] == Span(0, 0, 1, 2, "x")
+    assert plan[1][0] == Span(1, 0, 1, 1, "x")
+
+
+def test_none_cells_are_empty_and_empty_header():
+    assert merge_plan([[None, ""]]) == ((Span(0, 0, 1, 2, ""),),)
+    assert merge_plan([]) == ()
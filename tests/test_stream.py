@@ -0,0 +1,27 @@
+import pytest
+
+from tool.cli import render_text
+from tool.stream import iter_file_latex
+
+CASES = [
+    "a\tb\tc\n1\t2\t3\n4\t5\n",
+    "  名前 , 値 \n x , 1 \n y , 2 \n\n",
+    'a,b\n"x, y",2\n"改行\nあり",3\n',
+    "x;y\n1,5;2\n3;4\n",
+    "h1\th2\n" + "".join(f"r{i}\t{i} & {i}%\n" for i in range(500)),
+]
+OPTIONS = [
+    {},
+    {"caption": "表", "label": "tab:x", "position": "t"},
+    {"escape": False, "left_centered": True},
+    {"longtable": True, "use_header": False},
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+@pytest.mark.parametrize("options", OPTIONS)
+@pytest.mark.parametrize("chunk_size", [7, 64, 2**20])
+def test_streaming_matches_in_memory_conversion(text, options, chunk_size):
+    data = text.encode("utf-8")
+    streamed = "".join(iter_file_latex(data, options, chunk_size=chunk_size))
+    assert streamed == render_text(text, options)
@@ -0,0 +1,98 @@
+from tool.table import Table
+from tool.utils import (dataframe_to_latex, detect_delimiter, escape_column, escape_latex, escape_row, escape_table,
+                        parse_table, preview_header_html, preview_row_html)
+
+
+def test_detect_delimiter_prefers_tab():
+    assert detect_delimiter("a\tb,c\n1\t2,3") == "\t"
+
+
+def test_detect_delimiter_comma_and_semicolon():
+    assert detect_delimiter("a,b\n1,2") == ","
+    assert detect_delimiter("x;y\n1,5;2") == ";"
+
+
+def test_detect_delimiter_markdown():
+    assert detect_delimiter("| a | b |\n|---|---|\n| 1 | 2 |") == "|"
+
+
+def test_thousands_separated_single_column_is_not_split():
+    assert detect_delimiter("値\n1,234\n5,678") != ","
+    table = parse_table("値\n1,234\n-12,345.6")
+    assert table.columns == ["値"]
+    assert table.to_rows() == [["1,234"], ["-12,345.6"]]
+
+
+def test_comma_header_still_wins_over_thousands():
+    table = parse_table("a,b\n1,234")
+    assert table.columns == ["a", "b"]
+    assert table.to_rows() == [["1", "234"]]
+
+
+def test_parse_table_pads_ragged_rows_and_strips():
+    table = parse_table("a\tb\tc\n 1 \t2\n3")
+    assert table.columns == ["a", "b", "c"]
+    assert table.to_rows() == [["1", "2", ""], ["3", "", ""]]
+
+
+def test_parse_table_quoted_cells_with_newlines():
+    table = parse_table('a\tb\n"x\ny"\t2')
+    assert table.to_rows() == [["x\ny", "2"]]
+
+
+def test_parse_table_without_header():
+    table = parse_table("1,2\n3,4", use_first_row_as_header=False)
+    assert table.columns is None
+    assert table.shape == (2, 2)
+
+
+def test_preview_html_escapes_cells():
+    import pandas as pd
+
+    header = pd.DataFrame([["<b>x</b>", "a & b"]])
+    assert preview_header_html(header) == ["<tr><th>&lt;b&gt;x&lt;/b&gt;</th><th>a &amp; b</th></tr>"]
+    assert preview_row_html(["<script>", "1"]) == "<tr><td>&lt;script&gt;</td><td>1</td></tr>"
+
+
+def test_escape_latex_special_characters():
+    assert escape_latex("a&b%c$d#e_f{g}h") == r"a\&b\%c\$d\#e\_f\{g\}h"
+    assert escape_latex("~^") == r"\textasciitilde{}\textasciicircum{}"
+    # "\" は1回だけ置き換え，置き換え後の { } をさらにエスケープしない
+    assert escape_latex("\\") == r"\textbackslash{}"
+    assert escape_latex(r"\alpha_1") == r"\textbackslash{}alpha\_1"
+    assert escape_latex("普通の文字 1.5") == "普通の文字 1.5"
+
+
+def test_escape_latex_with_placeholder_character():
+    # 退避用の "\x00" を含むセルは1文字ずつ置き換える（"\x00" はそのまま残る）
+    assert escape_latex("a\x00b\\c&") == "a\x00b" + r"\textbackslash{}c\&"
+
+
+def test_escape_column_matches_per_cell():
+    cells = ["a&b", "", "\\", "x_y", "plain"]
+    assert escape_column(cells) == list(map(escape_latex, cells))
+    # 連結の区切り "\x1f" を含むセルがあっても列の長さが変わらない
+    cells = ["a\x1fb&", "c%", "d"]
+    assert escape_column(cells) == ["a\x1fb" + r"\&", r"c\%", "d"]
+    # 文字列以外のセルは文字列にしてから
+    assert escape_column([1, None, "$"]) == ["1", "", r"\$"]
+
+
+def test_escape_raw_columns_are_left_untouched():
+    assert escape_row(["$x$", "$y$"], raw_columns={1}) == [r"\$x\$", "$y$"]
+    table = escape_table(Table(["$a$", "a_b", "$c$", "c&d"], 2, 2, ["$p$", "q_r"]), raw_columns=[0])
+    assert table.columns == ["$p$", r"q\_r"]
+    assert table.cells == ["$a$", r"a\_b", "$c$", r"c\&d"]
+    latex = dataframe_to_latex(Table(["$\\alpha$", "50%"], 1, 2, ["式", "率"]), raw_columns=[0])
+    assert "$\\alpha$ & 50\\%" in latex
+    assert "50%" in dataframe_to_latex(Table(["1", "50%"], 1, 2, ["a", "b"]), escape=False)
+
+
+def test_leading_tab_of_empty_top_left_cell_decides_delimiter():
+    text = "\ta b\n127,5a"
+    assert detect_delimiter(text) == "\t"
+    table = parse_table(text)
+    assert table.columns == ["a b"]
+    assert table.to_rows() == [["127,5a"]]
+    # 先頭の空行は飛ばして数える
+    assert detect_delimiter("\n\n\ta\nb,c") == "\t"
@@ -0,0 +1,78 @@
+import os
+
+from tool.watch import Watcher, regenerate_sources
+
+
+def write(path, text, mtime_ns):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def make_watcher(tmp_path):
+    return Watcher(lambda: sorted(str(p) for p in tmp_path.glob("*.tsv")), debounce=0.25, rescan_interval=1.0)
+
+
+def test_first_poll_only_records_state(tmp_path):
+    write(tmp_path / "a.tsv", "x", 10**18)
+    watcher = make_watcher(tmp_path)
+    assert watcher.poll(now=0.0) == []
+    assert watcher.poll(now=5.0) == []
+
+
+def test_change_is_reported_once_after_debounce(tmp_path):
+    path = tmp_path / "a.tsv"
+    write(path, "x", 10**18)
+    watcher = make_watcher(tmp_path)
+    watcher.poll(now=0.0)
+    write(path, "xy", 2 * 10**18)
+    assert watcher.poll(now=1.0) == []
+    assert watcher.poll(now=1.2) == []
+    assert watcher.poll(now=1.25) == [(str(path), 2 * 10**18)]
+    assert watcher.poll(now=2.0) == []
+
+
+def test_waits_until_writes_stop(tmp_path):
+    path = tmp_path / "a.tsv"
+    write(path, "x", 10**18)
+    watcher = make_watcher(tmp_path)
+    watcher.poll(now=0.0)
+    # 書き込みが続く間は，最後の変化から debounce 秒たつまで報告しない
+    for i, now in enumerate((1.0, 1.2, 1.4, 1.6), start=1):
+        write(path, "x" * (i + 1), (i + 1) * 10**18)
+        assert watcher.poll(now=now) == []
+    assert watcher.poll(now=1.8) == []
+    assert watcher.poll(now=1.85) == [(str(path), 5 * 10**18)]
+
+
+def test_new_and_deleted_files(tmp_path):
+    a, b = tmp_path / "a.tsv", tmp_path / "b.tsv"
+    write(a, "x", 10**18)
+    watcher = make_watcher(tmp_path)
+    watcher.poll(now=0.0)
+    # 増えたファイルは調べ直し（rescan_interval 秒ごと）で見つける
+    write(b, "y", 10**18)
+    assert watcher.poll(now=0.5) == []
+    assert watcher.poll(now=1.0) == []
+    assert watcher.poll(now=1.3) == [(str(b), 10**18)]
+
+    # 変化を待っている間に消えたファイルは報告しない
+    write(a, "xx", 2 * 10**18)
+    assert watcher.poll(now=1.4) == []
+    a.unlink()
+    assert watcher.poll(now=1.5) == []
+    assert watcher.poll(now=2.5) == []
+    # 作り直されたら，次の調べ直しで見つけて変換する
+    write(a, "xx", 2 * 10**18)
+    assert watcher.poll(now=3.0) == []
+    assert watcher.poll(now=3.5) == []
+    assert watcher.poll(now=3.75) == [(str(a), 2 * 10**18)]
+
+
+def test_regenerate_sources_writes_only_on_change(tmp_path):
+    source = tmp_path / "a.tsv"
+    write(source, "p\tq\n1\t2\n", 10**18)
+    out = tmp_path / "out"
+    [(_, destination, written, _, _)] = regenerate_sources([(str(source), 10**18)], str(out), {})
+    assert written and "1 & 2" in open(destination, encoding="utf-8").read()
+    [(_, _, written, _, _)] = regenerate_sources([(str(source), 10**18)], str(out), {})
+    assert not written
@@ -0,0 +1,289 @@
+"""
+論文・卒論用の複数の表をマニフェストからまとめてLaTeXにするビルダー．
+入力ファイルと変換オプションのハッシュを状態ファイルに記録し，
+変わった表だけを描き直す．中身が変わらない .tex は書き換えないので，
+latexmk が不要な再コンパイルをしない．
+
+    python -m tool.build tables.toml
+    python -m tool.build tables.json --force -j 4
+    python -m tool.build tables.toml --watch   # 入力が変わるたびにビルドし直す
+
+マニフェスト（TOML または JSON，パスはマニフェストのあるディレクトリから）:
+    output_dir = "tables"          # .tex の出力先
+    aggregate = "all_tables.tex"   # \\input をまとめたファイル（output_dir 内．省略可）
+    tex_root = "."                 # 本文の .tex をコンパイルするディレクトリ（aggregate の \\input はここからのパス）
+    [defaults]                     # 全表に共通のオプション（python -m tool.cli と同じ）
+    position = "t"
+    [[tables]]
+    source = "results/accuracy.tsv"
+    caption = "精度"
+    label = "tab:accuracy"
+    [[tables]]
+    source = "results/summary.tsv"
+    output = "summary.tex"         # 省略時は入力のファイル名から
+    complex = true
+    header_rows = 2
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+from .cache import content_hash
+from .cli import render_text, write_atomic, write_if_changed
+
+# 状態ファイルの名前（output_dir に置く）
+STATE_FILE = ".autolatex-build.json"
+# 出力の形式が変わったときに上げる（上げると全表が描き直される）
+BUILD_VERSION = 1
+_INPUT = re.compile(r"^\\input\{([^}]*)\}", re.MULTILINE)
+# 表ごとの設定のうち，変換オプションではないキー
+_TABLE_KEYS = ("source", "output", "delimiter", "encoding")
+
+
+def load_manifest(path):
+    """ マニフェスト（.toml / .json）を読み込む """
+    with open(path, "rb") as f:
+        if path.lower().endswith(".toml"):
+            import tomllib
+            manifest = tomllib.load(f)
+        else:
+            manifest = json.load(f)
+    if not isinstance(manifest.get("tables"), list):
+        raise ValueError(f"{path}: tables（表のリスト）が必要です")
+    return manifest
+
+
+def plan_tables(manifest, base_dir):
+    """
+    マニフェストから表ごとの設定を作る．
+    [{"source", "output", "options", "delimiter", "encoding"}, ...] を返す
+    """
+    output_dir = os.path.join(base_dir, manifest.get("output_dir", "."))
+    defaults = dict(manifest.get("defaults", {}))
+    plans = []
+    seen = set()
+    for i, entry in enumerate(manifest["tables"]):
+        if not isinstance(entry, dict) or not entry.get("source"):
+            raise ValueError(f"tables[{i}]: source が必要です")
+        settings = {**defaults, **entry}
+        source = os.path.join(base_dir, settings["source"])
+        stem = os.path.splitext(os.path.basename(source))[0]
+        output = os.path.normpath(os.path.join(output_dir, settings.get("output") or stem + ".tex"))
+        if output in seen:
+            raise ValueError(f"tables[{i}]: 出力先 {output} が重複しています")
+        seen.add(output)
+        delimiter = settings.get("delimiter")
+        if delimiter is None and source.lower().endswith(".csv"):
+            delimiter = ","
+        plans.append({
+            "source": source,
+            "output": output,
+            "options": {key: value for key, value in settings.items() if key not in _TABLE_KEYS},
+            "delimiter": delimiter,
+            "encoding": settings.get("encoding", "utf-8-sig"),
+        })
+    return output_dir, plans
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def load_state(path):
+    """ 前回のビルドの状態．無いか壊れていれば空 """
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("version") != BUILD_VERSION:
+        return {}
+    return state.get("tables", {})
+
+
+def render_plan(plan, source_bytes):
+    """ 1表分のLaTeXコード（ワーカープロセスでも実行できる） """
+    text = source_bytes.decode(plan["encoding"])
+    latex_code = render_text(text, plan["options"], delimiter=plan["delimiter"])
+    return latex_code + "\n" if latex_code else ""
+
+
+def aggregate_text(tex_root, plans):
+    """
+    全表を \\input するファイルの中身（マニフェストの順）．
+    LaTeX は入れ子の \\input も本文をコンパイルするディレクトリから探すので，パスは tex_root からの相対パスにする
+    """
+    lines = ["% python -m tool.build が生成したファイルです．直接編集しないでください"]
+    for target in aggregate_inputs(tex_root, plans):
+        lines.append(f"\\input{{{target}}}")
+    return "\n".join(lines) + "\n"
+
+
+def aggregate_inputs(tex_root, plans):
+    """ aggregate に書く \\input の引数（拡張子なし，区切りは "/"） """
+    return [os.path.splitext(os.path.relpath(plan["output"], tex_root))[0].replace(os.sep, "/") for plan in plans]
+
+
+def unresolved_inputs(aggregate_path, tex_root):
+    """ aggregate の \\input のうち，tex_root から見つからないもの（LaTeX と同じく .tex を補う） """
+    missing = []
+    with open(aggregate_path, encoding="utf-8") as f:
+        for target in _INPUT.findall(f.read()):
+            path = os.path.join(tex_root, target)
+            if not (os.path.isfile(path) or os.path.isfile(path + ".tex")):
+                missing.append(target)
+    return missing
+
+
+def build(manifest_path, force=False, workers=1, dry_run=False, report=None):
+    """
+    マニフェストの表をビルドする．
+    {"rendered": [...], "written": [...], "unchanged": [...], "failed": [(出力, 例外), ...]} を返す
+    - 入力の (mtime, サイズ) が前回と同じ表は読み込みもしない
+    - 入力の中身とオプションのハッシュが前回と同じで，出力が残っていれば描き直さない
+    - 描き直しても中身が同じ .tex は書き換えない
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    manifest = load_manifest(manifest_path)
+    output_dir, plans = plan_tables(manifest, base_dir)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    previous = {} if force else load_state(state_path)
+
+    result = {"rendered": [], "written": [], "unchanged": [], "failed": []}
+    state = {}
+    dirty = []
+    for plan in plans:
+        key = os.path.relpath(plan["output"], output_dir)
+        options_hash = content_hash(plan["options"], plan["delimiter"], plan["encoding"])
+        record = previous.get(key, {})
+        try:
+            stat = os.stat(plan["source"])
+        except OSError as e:
+            result["failed"].append((plan["output"], e))
+            continue
+        entry = {"source": os.path.relpath(plan["source"], output_dir), "options": options_hash,
+                 "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        up_to_date = (record.get("options") == options_hash and os.path.exists(plan["output"])
+                      and record.get("source") == entry["source"])
+        if up_to_date and (record.get("mtime_ns"), record.get("size")) == (stat.st_mtime_ns, stat.st_size):
+            # 入力を読まずに済む（touch されただけのファイルは下で中身を比べる）
+            state[key] = dict(record, **entry)
+            result["unchanged"].append(plan["output"])
+            continue
+        try:
+            with open(plan["source"], "rb") as f:
+                source_bytes = f.read()
+        except OSError as e:
+            result["failed"].append((plan["output"], e))
+            continue
+        entry["input"] = _digest(source_bytes)
+        if up_to_date and record.get("input") == entry["input"]:
+            state[key] = entry
+            result["unchanged"].append(plan["output"])
+            continue
+        dirty.append((key, plan, source_bytes, entry))
+
+    for key, plan, entry, outcome in _render_all(dirty, workers):
+        if isinstance(outcome, Exception):
+            result["failed"].append((plan["output"], outcome))
+            # 失敗した表は次回も描き直す
+            if key in previous:
+                state[key] = dict(previous[key], input=None)
+        else:
+            result["rendered"].append(plan["output"])
+            if dry_run or write_if_changed(plan["output"], outcome):
+                result["written"].append(plan["output"])
+            state[key] = entry
+        if report is not None:
+            report(plan, outcome)
+
+    if not dry_run:
+        if manifest.get("aggregate"):
+            aggregate_path = os.path.join(output_dir, manifest["aggregate"])
+            tex_root = os.path.join(base_dir, manifest.get("tex_root", "."))
+            if write_if_changed(aggregate_path, aggregate_text(tex_root, plans)):
+                result["written"].append(aggregate_path)
+            for target in unresolved_inputs(aggregate_path, tex_root):
+                result["failed"].append((aggregate_path, FileNotFoundError(
+                    f"\\input{{{target}}} が {tex_root} から見つかりません")))
+        if state != previous:
+            write_atomic(state_path, json.dumps({"version": BUILD_VERSION, "tables": state},
+                                                ensure_ascii=False, indent=1, sort_keys=True) + "\n")
+    return result
+
+
+def _render_all(dirty, workers):
+    """ (key, plan, entry, LaTeXコードか例外) を順に返す．2表以上なら並列に描く """
+    if workers == 1 or len(dirty) <= 1:
+        for key, plan, source_bytes, entry in dirty:
+            try:
+                yield key, plan, entry, render_plan(plan, source_bytes)
+            except Exception as e:
+                yield key, plan, entry, e
+        return
+
+    # multiprocessing の読み込みは重いので，並列に変換するときだけ読み込む
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_plan, plan, source_bytes): (key, plan, entry)
+                   for key, plan, source_bytes, entry in dirty}
+        for future in as_completed(futures):
+            key, plan, entry = futures[future]
+            try:
+                yield key, plan, entry, future.result()
+            except Exception as e:
+                yield key, plan, entry, e
+
+
+def _print_progress(plan, outcome):
+    # 失敗は main でまとめて表示する
+    if not isinstance(outcome, Exception):
+        print(f"🔄 {plan['source']} -> {plan['output']}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tool.build",
+                                     description="マニフェストの表をまとめてLaTeXにします（変わった表だけを描き直します）．")
+    parser.add_argument("manifest", help="マニフェスト（.toml / .json）")
+    parser.add_argument("--force", action="store_true", help="前回の状態を無視してすべて描き直す")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="並列数（既定は1）")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="描き直す表を表示するだけで書き込まない")
+    parser.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="ビルドしたあともマニフェストと入力を監視し，変わるたびにビルドし直す（Ctrl+C で終了）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    watcher = None
+    if args.watch and not args.dry_run:
+        from .watch import manifest_watcher
+        # ビルド中に書き換えられた入力も見逃さないように，ビルドの前に状態を覚えておく
+        watcher = manifest_watcher(args.manifest)
+        watcher.poll()
+    start = time.perf_counter()
+    try:
+        result = build(args.manifest, force=args.force, workers=args.jobs, dry_run=args.dry_run,
+                       report=None if args.quiet else _print_progress)
+    except (OSError, ValueError) as e:
+        print(f"マニフェストを読み込めません: {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+    for output, error in result["failed"]:
+        print(f"❌ {output}: {error}", file=sys.stderr)
+    print(f"描き直し {len(result['rendered'])}・書き込み {len(result['written'])}・変更なし {len(result['unchanged'])}"
+          f"・失敗 {len(result['failed'])} ({elapsed:.2f} s)", file=sys.stderr)
+    if watcher is not None:
+        from .watch import watch_build
+        return watch_build(watcher, args.manifest, workers=args.jobs)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Streamlitの再実行をまたいで変換結果を使い回すためのキャッシュ．
+入力（DataFrameの中身と描画オプション）のハッシュをキーにし，
+プロセス内のすべてのセッションで共有する．
+
+貼り付けタブ・ダウンロードでは utils / export の同名関数の代わりにこのモジュールの関数を使う:
+    from .cache import parse_tab_separated_text, dataframe_to_latex
+（高度表作成タブのプレビューとLaTeXは，incremental.RowRenderCache で変わった行だけを描き直すので使わない）
+
+戻り値は複数のセッションで共有されるので，呼び出し側で変更しないこと．
+"""
+import hashlib
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from functools import wraps
+
+from . import export, utils
+from .table import Table
+
+
+class RenderCache:
+    """ 件数上限つきのLRUキャッシュ．スレッドセーフでヒット・ミス数を数える """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+# すべてのセッションで共有するキャッシュ
+render_cache = RenderCache(maxsize=256)
+
+_MISSING = object()
+
+
+def _hash_cells(h, cells):
+    """
+    セルの並びをハッシュに加える．すべてのセルを "\x1f" で1回の join で連結し，セルの数・バイト数と一緒に加える．
+    "\x1f" を含むセルがあると ["a\x1fb", "c"] と ["a", "b\x1fc"] が同じになるので，そのときだけ各セルの長さも加える
+    """
+    try:
+        joined = "\x1f".join(cells)
+    except TypeError:
+        # 数値などが混ざる場合は型も区別できる repr で連結する
+        cells = list(map(repr, cells))
+        joined = "\x1f".join(cells)
+    data = joined.encode("utf-8", "surrogatepass")
+    h.update(len(cells).to_bytes(8, "little"))
+    h.update(len(data).to_bytes(8, "little"))
+    if joined.count("\x1f") == max(len(cells) - 1, 0):
+        h.update(b"\x00")
+    else:
+        h.update(b"\x01")
+        h.update(array("Q", map(len, cells)).tobytes())
+    h.update(data)
+
+
+def _update_hash(h, value):
+    # pandas がまだ読み込まれていなければ，value が DataFrame であることはない
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        h.update(b"DataFrame")
+        h.update(repr((value.shape, list(map(str, value.dtypes)))).encode())
+        _hash_cells(h, list(value.columns))
+        if not isinstance(value.index, pd.RangeIndex):
+            _hash_cells(h, value.index.tolist())
+        else:
+            h.update(repr(value.index).encode())
+        # pd.util.hash_pandas_object より，文字列の表では連結してハッシュする方がずっと速い
+        _hash_cells(h, value.to_numpy().ravel().tolist())
+    elif isinstance(value, Table):
+        h.update(f"Table{value.shape}".encode())
+        h.update(b"-" if value.columns is None else b"+")
+        _hash_cells(h, value.columns or [])
+        _hash_cells(h, value.cells)
+    elif isinstance(value, str):
+        h.update(b"str")
+        h.update(value.encode("utf-8", "surrogatepass"))
+    elif isinstance(value, list) and value and all(isinstance(row, (list, tuple)) for row in value):
+        # 行のリスト（list of list）は行ごとにまとめてハッシュする
+        h.update(f"rows{len(value)}".encode())
+        for row in value:
+            _hash_cells(h, row)
+            h.update(b"\x1e")
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        h.update(f"dict{len(value)}".encode())
+        for k in sorted(value, key=repr):
+            _update_hash(h, k)
+            _update_hash(h, value[k])
+    else:
+        h.update(repr(value).encode())
+    h.update(b"\x00")
+
+
+def content_hash(*args, **kwargs):
+    """ 引数の内容から決まるハッシュ値．同じ中身のDataFrameは別オブジェクトでも同じ値になる """
+    h = hashlib.blake2b(digest_size=16)
+    _update_hash(h, args)
+    _update_hash(h, kwargs)
+    return h.hexdigest()
+
+
+def memoize(fn, cache=render_cache):
+    """ 引数の内容ハッシュをキーに fn の結果を cache に保存するデコレータ """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, content_hash(*args, **kwargs))
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = fn(*args, **kwargs)
+            cache.put(key, result)
+        return result
+
+    return wrapper
+
+
+parse_tab_separated_text = memoize(utils.parse_tab_separated_text)
+dataframe_to_latex = memoize(utils.dataframe_to_latex)
+build_exports = memoize(export.build_exports)
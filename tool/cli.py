@@ -0,0 +1,383 @@
+"""
+コマンドラインから表ファイルをまとめてLaTeXに変換するツール．
+Streamlitを読み込まないため，ビルド用のサーバーでもすぐに起動できる．
+
+使用例:
+    python -m tool.cli results/ -o tables/
+    python -m tool.cli "results/**/*.tsv" --complex --header-rows 2 -j 8
+    python -m tool.cli results/ -o tables/ --watch    # 変わったファイルだけを変換し直し続ける
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from .stream import MarkdownTableError, can_stream, write_file_latex
+from .utils import parse_table, dataframe_to_latex, generate_complex_latex
+
+# ディレクトリ指定時に変換対象とする拡張子
+SOURCE_SUFFIXES = (".tsv", ".csv", ".txt")
+# この大きさ以上のファイルはストリーミングで変換する（バイト）
+STREAM_THRESHOLD = 32 * 2**20
+
+
+def collect_sources(inputs):
+    """ ファイル・ディレクトリ・globパターンの指定から変換対象のファイル一覧を作る """
+    sources = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = []
+            for root, _, files in os.walk(item):
+                candidates.extend(os.path.join(root, f) for f in files)
+            candidates = [p for p in candidates if p.lower().endswith(SOURCE_SUFFIXES)]
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for path in sorted(candidates):
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                sources.append(path)
+    return sources
+
+
+def output_path_for(source, output_dir=None):
+    """ 入力ファイルに対応する .tex の出力先 """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    directory = output_dir if output_dir else os.path.dirname(source)
+    return os.path.join(directory, stem + ".tex")
+
+
+def output_collisions(sources, output_dir=None):
+    """
+    出力先が同じになる入力（x.tsv と x.csv，a/x.csv と b/x.csv を同じ -o に出すなど）．
+    {出力先: [入力, ...]} を返す．どちらかが黙って上書きされ，並列変換では書き込みが競合するので変換の前に調べる
+    """
+    claimed = {}
+    for source in sources:
+        claimed.setdefault(os.path.normpath(output_path_for(source, output_dir)), []).append(source)
+    return {destination: group for destination, group in claimed.items() if len(group) > 1}
+
+
+def _print_collisions(collisions):
+    print("出力先が同じになる入力があります（入力のファイル名を変えるか，別々に変換してください）:", file=sys.stderr)
+    for destination, group in collisions.items():
+        print(f"  {destination} <- {', '.join(group)}", file=sys.stderr)
+
+
+def render_text(text, options, delimiter=None):
+    """
+    テキストをオプションに従ってLaTeXコードに変換する．
+    DataFrame を経由せず Table のまま変換するので，pandas を読み込まない
+    """
+    if options.get("complex"):
+        table = parse_table(text, use_first_row_as_header=False, delimiter=delimiter)
+        n_header = options.get("header_rows", 1)
+        return generate_complex_latex(table.slice(0, n_header), table.slice(n_header), options.get("caption", ""),
+                                      options.get("label", ""), options.get("position", "h"),
+                                      escape=options.get("escape", True), raw_columns=options.get("raw_columns", ()))
+
+    use_header = options.get("use_header", True)
+    table = parse_table(text, use_first_row_as_header=use_header, delimiter=delimiter)
+    if not use_header:
+        # parse_tab_separated_text と同じく，列名は 0, 1, 2, ...
+        table.columns = [str(i) for i in range(table.n_cols)]
+    return dataframe_to_latex(table, caption=options.get("caption", ""), label=options.get("label", ""),
+                              position=options.get("position", "h"),
+                              caption_position=options.get("caption_position", "上"),
+                              left_centered=options.get("left_centered", False),
+                              longtable=options.get("longtable", False),
+                              escape=options.get("escape", True), raw_columns=options.get("raw_columns", ()),
+                              align_numbers=options.get("align_numbers"), sig_digits=options.get("sig_digits"),
+                              thousands=options.get("thousands", False), bold_max=options.get("bold_max", False),
+                              bold_min=options.get("bold_min", False))
+
+
+def _create_temp(directory, suffix):
+    """
+    directory に一時ファイルを作る．mkstemp（0600 で作る）と違い open() と同じく 0666 から umask を引いた権限になる
+    （umask を読むために os.umask で書き換えると，他のスレッドが作るファイルに影響する）
+    """
+    for _ in range(100):
+        tmp = os.path.join(directory, f".tmp-{os.urandom(6).hex()}{suffix}")
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), tmp
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"{directory} に一時ファイルを作れません")
+
+
+def _replace(tmp, path):
+    # 置き換えるファイルがあれば，その権限を引き継ぐ
+    try:
+        os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    except FileNotFoundError:
+        pass
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _temp_for(path):
+    """ path と同じディレクトリに一時ファイルを作り，(書き込み用のファイル, 一時ファイルのパス) を渡す．失敗したら消す """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = _create_temp(directory, os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            yield f, tmp
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def atomic_open(path):
+    """ 一時ファイルに書き，閉じたあとで path と置き換える（途中で止まっても壊れたファイルを残さない） """
+    with _temp_for(path) as (f, tmp):
+        yield f
+    try:
+        _replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _same_contents(a, b, chunk_size=1 << 20):
+    """ 2つのファイルの中身が同じか．chunk_size ずつ比べるので大きなファイルでもメモリを使わない """
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            while True:
+                chunk = fa.read(chunk_size)
+                if chunk != fb.read(chunk_size):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+def write_stream_if_changed(path, write):
+    """
+    write(f) で一時ファイルに書き，中身が path と同じなら置き換えない（mtime を変えない）．書いたら True．
+    write_if_changed と違い，書く中身も今の中身もメモリに載せない
+    """
+    with _temp_for(path) as (f, tmp):
+        write(f)
+    try:
+        if _same_contents(tmp, path):
+            os.unlink(tmp)
+            return False
+        _replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return True
+
+
+def write_atomic(path, text):
+    """ text を path に書く（atomic_open を使う） """
+    with atomic_open(path) as f:
+        f.write(text)
+
+
+def write_if_changed(path, text):
+    """ 中身が同じなら書かない（mtime を変えない）．書いたら True """
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    write_atomic(path, text)
+    return True
+
+
+def write_file(source, destination, options):
+    """
+    1ファイルを変換して書き出す．書き出しは一時ファイルからの置き換えで行い，
+    中身が前と同じなら .tex を書き換えない（latexmk などに不要な再コンパイルをさせない）．書いたら True
+    """
+    # .csv 以外は区切り文字を自動判別する
+    delimiter = "," if source.lower().endswith(".csv") else None
+    file_options = dict(options)
+    if options.get("label_prefix"):
+        file_options["label"] = options["label_prefix"] + os.path.splitext(os.path.basename(source))[0]
+
+    large = os.path.getsize(source) >= options.get("stream_threshold", STREAM_THRESHOLD)
+    if large and can_stream(file_options, delimiter):
+        # 大きなファイルは mmap して少しずつ書き出す（ファイル全体を文字列や DataFrame にしない）
+        def write(f):
+            if write_file_latex(source, f, file_options, delimiter=delimiter,
+                                encoding=options.get("encoding", "utf-8-sig")):
+                f.write("\n")
+
+        try:
+            return write_stream_if_changed(destination, write)
+        except MarkdownTableError:
+            pass
+
+    with open(source, encoding=options.get("encoding", "utf-8-sig")) as f:
+        text = f.read()
+    latex_code = render_text(text, file_options, delimiter=delimiter)
+    return write_if_changed(destination, latex_code + "\n" if latex_code else "")
+
+
+def convert_file(source, destination, options):
+    """
+    1ファイルを変換して書き出す．ワーカープロセスで実行される．
+    経過時間（秒）を返す．
+    """
+    start = time.perf_counter()
+    write_file(source, destination, options)
+    return time.perf_counter() - start
+
+
+def convert_all(jobs, options, workers=None, report=None):
+    """
+    (入力, 出力) の組を並列に変換する．
+    1ファイルの失敗は他のファイルに影響せず，(入力, 例外) のリストとして返す．
+    """
+    failures = []
+    total = len(jobs)
+
+    def _report(done, source, destination, elapsed, error):
+        if report is not None:
+            report(done, total, source, destination, elapsed, error)
+
+    if workers == 1 or total <= 1:
+        for done, (source, destination) in enumerate(jobs, start=1):
+            try:
+                elapsed = convert_file(source, destination, options)
+            except Exception as e:
+                failures.append((source, e))
+                _report(done, source, destination, None, e)
+            else:
+                _report(done, source, destination, elapsed, None)
+        return failures
+
+    # multiprocessing の読み込みは重いので，並列に変換するときだけ読み込む
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_file, source, destination, options): (source, destination)
+                   for source, destination in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            source, destination = futures[future]
+            try:
+                elapsed = future.result()
+            except Exception as e:
+                failures.append((source, e))
+                _report(done, source, destination, None, e)
+            else:
+                _report(done, source, destination, elapsed, None)
+    return failures
+
+
+def _print_progress(done, total, source, destination, elapsed, error):
+    if error is None:
+        print(f"[{done}/{total}] ✅ {source} -> {destination} ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+    else:
+        print(f"[{done}/{total}] ❌ {source}: {error}", file=sys.stderr)
+
+
+def _column_numbers(value):
+    try:
+        return tuple(int(v) for v in value.split(",") if v.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"列番号をカンマ区切りで指定してください: {value}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tool.cli", description="TSV/CSVの表をまとめてLaTeXに変換します．")
+    parser.add_argument("inputs", nargs="+", help="入力ファイル・ディレクトリ・globパターン")
+    parser.add_argument("-o", "--output-dir", help="出力先ディレクトリ（省略時は入力と同じ場所）")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="並列数（省略時はCPUコア数）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    parser.add_argument("--encoding", default="utf-8-sig", help="入力ファイルの文字コード")
+    parser.add_argument("--caption", default="", help="キャプション")
+    parser.add_argument("--label-prefix", default="", help="ラベルの接頭辞（ファイル名を付けてラベルにする，例: tab:）")
+    parser.add_argument("--position", default="h", choices=["h", "t", "b", "p"], help="表の配置位置")
+    parser.add_argument("--caption-position", default="上", choices=["上", "下"], help="キャプションの位置")
+    parser.add_argument("--left-centered", action="store_true", help="左端も中央寄せにする")
+    parser.add_argument("--longtable", action="store_true", help="longtableで出力する")
+    parser.add_argument("--no-header", action="store_true", help="最初の行をヘッダーとして扱わない")
+    parser.add_argument("--no-escape", action="store_true", help="LaTeXの特殊文字（& %% $ # _ など）をエスケープしない")
+    parser.add_argument("--raw-columns", type=_column_numbers, default=(),
+                        help="エスケープしない列（0から数えた列番号をカンマ区切りで，例: 0,2）")
+    parser.add_argument("--align-numbers", choices=["r", "S"], default=None,
+                        help="数値の列を右揃え（r）か siunitx の小数点揃え（S）にする")
+    parser.add_argument("--sig-digits", type=int, default=None, help="数値の列を有効数字の桁数でそろえる")
+    parser.add_argument("--thousands", action="store_true", help="数値に3桁区切りを入れる")
+    parser.add_argument("--bold-max", action="store_true", help="数値の列の最大値を太字にする")
+    parser.add_argument("--bold-min", action="store_true", help="数値の列の最小値を太字にする")
+    parser.add_argument("--stream-mb", type=float, default=STREAM_THRESHOLD / 2**20,
+                        help="この大きさ（MB）以上のファイルはメモリに読み込まずに少しずつ変換する")
+    parser.add_argument("--complex", action="store_true", help="セル結合付きの複雑な表として出力する")
+    parser.add_argument("--header-rows", type=int, default=1, help="--complex 時のヘッダー段数")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="変換したあとも入力を監視し，変わったファイルだけを変換し直す（Ctrl+C で終了）")
+    return parser
+
+
+def options_from_args(args):
+    return {
+        "encoding": args.encoding,
+        "caption": args.caption,
+        "label_prefix": args.label_prefix,
+        "position": args.position,
+        "caption_position": args.caption_position,
+        "left_centered": args.left_centered,
+        "longtable": args.longtable,
+        "use_header": not args.no_header,
+        "escape": not args.no_escape,
+        "raw_columns": args.raw_columns,
+        "align_numbers": args.align_numbers,
+        "sig_digits": args.sig_digits,
+        "thousands": args.thousands,
+        "bold_max": args.bold_max,
+        "bold_min": args.bold_min,
+        "complex": args.complex,
+        "header_rows": args.header_rows,
+        "stream_threshold": int(args.stream_mb * 2**20),
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    watcher = None
+    if args.watch:
+        from .watch import Watcher
+        # 変換中に書き換えられたファイルも見逃さないように，変換の前に状態を覚えておく
+        watcher = Watcher(lambda: collect_sources(args.inputs))
+        watcher.poll()
+    sources = collect_sources(args.inputs)
+    if not sources and watcher is None:
+        print("変換対象のファイルが見つかりませんでした．", file=sys.stderr)
+        return 2
+
+    collisions = output_collisions(sources, args.output_dir)
+    if collisions:
+        _print_collisions(collisions)
+        return 2
+
+    jobs = [(source, output_path_for(source, args.output_dir)) for source in sources]
+    start = time.perf_counter()
+    failures = convert_all(jobs, options_from_args(args), workers=args.jobs,
+                           report=None if args.quiet else _print_progress)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(jobs) - len(failures)}/{len(jobs)} ファイルを変換しました ({elapsed:.2f} s)", file=sys.stderr)
+    if watcher is not None:
+        from .watch import watch_sources
+        return watch_sources(watcher, args.output_dir, options_from_args(args))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
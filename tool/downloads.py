@@ -0,0 +1,55 @@
+"""
+タブ共通のダウンロードボタン．
+"""
+import streamlit as st
+
+from .cache import build_exports
+from .export import export_zip
+
+
+def render_downloads(df, latex_code, name, key_prefix=""):
+    """
+    CSV・LaTeX・HTML・zip（全形式＋単体でコンパイルできる .tex）のダウンロードボタン．
+    data に関数を渡すので，変換は再実行のたびではなくボタンが押されたときだけ行われる
+    """
+    def exports():
+        return build_exports(df, latex_code=latex_code)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.download_button(
+            label="📊 CSVダウンロード",
+            data=lambda: exports()["csv"],
+            file_name=f"{name}.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key=f"{key_prefix}csv_download"
+        )
+    with col2:
+        st.download_button(
+            label="📄 LaTeXファイルダウンロード",
+            data=latex_code,
+            file_name=f"{name}.tex",
+            mime="text/plain",
+            on_click="ignore",
+            key=f"{key_prefix}latex_download"
+        )
+    with col3:
+        st.download_button(
+            label="🌐 HTMLダウンロード",
+            data=lambda: exports()["html"],
+            file_name=f"{name}.html",
+            mime="text/html",
+            on_click="ignore",
+            key=f"{key_prefix}html_download"
+        )
+    with col4:
+        st.download_button(
+            label="📦 まとめてダウンロード",
+            data=lambda: export_zip(exports(), name=name),
+            file_name=f"{name}.zip",
+            mime="application/zip",
+            on_click="ignore",
+            help="CSV・HTML・.tex と，そのままコンパイルできる .tex をzipにまとめます",
+            key=f"{key_prefix}zip_download"
+        )
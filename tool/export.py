@@ -0,0 +1,114 @@
+"""
+表のエクスポート（CSV・HTML・.tex・単体でコンパイルできる .tex とそれらをまとめたzip）．
+表を1回走査するだけで全形式を作る．タブではダウンロードボタンが押されたときだけ呼び出す．
+"""
+import csv
+import html
+import io
+import re
+import zipfile
+
+from . import perf
+from .utils import as_table, escape_row, latex_frame, latex_row, _cell_text
+
+# 単体の .tex で，LaTeXコードに現れる命令ごとに必要なパッケージ
+_PACKAGES = (
+    ("\\text{", "amsmath"),
+    ("\\begin{longtable}", "longtable"),
+    ("\\toprule", "booktabs"),
+    ("\\multirow", "multirow"),
+)
+# 列指定に siunitx の S 列があるか
+_SIUNITX_COLUMN = re.compile(r"\\begin\{(?:tabular|longtable)\}\{[^}\n]*S")
+
+
+def standalone_document(latex_code):
+    """
+    LaTeXコードをそのままコンパイルできる文書にする．
+    日本語を含む場合は LuaLaTeX 用の ltjsarticle を使う
+    """
+    ascii_only = latex_code.isascii()
+    lines = []
+    if ascii_only:
+        lines.append("\\documentclass{article}")
+    else:
+        lines.append("% lualatex でコンパイルしてください")
+        lines.append("\\documentclass{ltjsarticle}")
+    for command, package in _PACKAGES:
+        if command in latex_code:
+            lines.append(f"\\usepackage{{{package}}}")
+    if _SIUNITX_COLUMN.search(latex_code):
+        lines.append("\\usepackage{siunitx}")
+        if "\\bfseries" in latex_code:
+            # S 列の太字（\bfseries）を数値にも反映させる
+            lines.append("\\sisetup{detect-weight=true, detect-inline-weight=math}")
+    lines += ["", "\\begin{document}", "", latex_code, "", "\\end{document}", ""]
+    return "\n".join(lines)
+
+
+@perf.timed("export")
+def build_exports(table, latex_code=None, latex_options=None):
+    """
+    CSV・HTML・LaTeX・単体の .tex を1回の走査で作り，
+    {"csv": ..., "html": ..., "tex": ..., "standalone": ...} を返す．
+    - table には DataFrame・行のリスト（1行目がヘッダー）・Table を渡せる
+    - latex_code を渡すとLaTeXは作り直さずにそれを使う（画面に表示済みのコードなど）
+    - 渡さない場合は latex_options（dataframe_to_latex の引数）で同じ走査の中で作る
+    """
+    table = as_table(table)
+    if table.columns is None:
+        columns, rows = (table.row(0), table.rows(1)) if table.n_rows else ([], iter(()))
+    else:
+        columns, rows = list(table.columns), table.rows()
+    header = [str(col) for col in columns]
+
+    csv_buffer = io.StringIO()
+    writer = csv.writer(csv_buffer, lineterminator="\n")
+    writer.writerow(header)
+
+    html_parts = ['<html><head><meta charset="utf-8"></head><body>\n<table border="1">\n<thead>\n',
+                  '<tr style="text-align: center;">',
+                  *(f"<th>{html.escape(col)}</th>" for col in header),
+                  "</tr>\n</thead>\n<tbody>\n"]
+
+    render_latex = latex_code is None
+    latex_parts, indent, foot = [], "", []
+    if render_latex:
+        latex_options = dict(latex_options or {})
+        escape = latex_options.pop("escape", True)
+        raw = frozenset(latex_options.pop("raw_columns", ()))
+        latex_columns = escape_row(header, raw) if escape else columns
+        latex_parts, indent, foot = latex_frame(latex_columns, **latex_options)
+        latex_parts = list(latex_parts)
+
+    n_rows = 0
+    for row in rows:
+        n_rows += 1
+        texts = [_cell_text(value) for value in row]
+        writer.writerow(texts)
+        html_parts.append("<tr>" + "".join(f"<td>{html.escape(text)}</td>" for text in texts) + "</tr>\n")
+        if render_latex:
+            latex_parts.append(latex_row(escape_row(texts, raw) if escape else texts, indent))
+    html_parts.append("</tbody>\n</table>\n</body></html>\n")
+
+    if render_latex:
+        # dataframe_to_latex と同じく，列名かデータ行が無ければ空
+        latex_code = "".join(latex_parts + foot) if columns and n_rows else ""
+
+    return {
+        "csv": csv_buffer.getvalue(),
+        "html": "".join(html_parts),
+        "tex": latex_code,
+        "standalone": standalone_document(latex_code),
+    }
+
+
+def export_zip(exports, name="table"):
+    """ build_exports の結果をzipにまとめたバイト列 """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{name}.csv", exports["csv"])
+        zf.writestr(f"{name}.html", exports["html"])
+        zf.writestr(f"{name}.tex", exports["tex"])
+        zf.writestr(f"{name}_standalone.tex", exports["standalone"])
+    return buffer.getvalue()
@@ -0,0 +1,372 @@
+"""
+表の編集履歴（元に戻す・やり直す）とセッションのメモリ使用量．
+
+表の中身は TableState に1つだけ持ち，編集はセル単位の差分として EditHistory に積む．
+DataFrame のコピーを履歴に残さないので，1セルの編集で増えるメモリは変わったセルの分だけで済む．
+履歴は手数とバイト数の上限を超えると古いものから捨てる．
+
+data_editor とは次のようにつなぐ:
+    st.data_editor(state.to_frame(), key=state.editor_key("table_editor"),
+                   on_change=commit_editor, args=(state, state.editor_key("table_editor")))
+on_change で編集を TableState に取り込むと版番号が上がり，エディタの key が変わって差分が空に戻る．
+"""
+import sys
+from collections import deque
+from contextlib import contextmanager
+
+from .table import Table
+from .utils import _cell_text
+
+# 1つの履歴に残す差分の合計の上限（バイト）と手数の上限
+HISTORY_BUDGET = 2 * 2**20
+MAX_STEPS = 200
+# 変更された行を覚えておく版の数（これより古い版からは全行を描き直す）
+_JOURNAL_SIZE = 64
+# 差分1件あたりのおおよその大きさ（タプル・リスト・位置の整数の分）
+_OP_OVERHEAD = 200
+
+
+def _values_size(values):
+    return sum(map(sys.getsizeof, values))
+
+
+def _op_size(op):
+    """ 差分が履歴の中で使うおおよそのバイト数（表と共有している文字列も数える） """
+    kind = op[0]
+    if kind == "cells":
+        _, indices, old, new = op
+        return _OP_OVERHEAD + 16 * len(indices) + _values_size(old) + _values_size(new)
+    if kind == "rows":
+        _, deleted, added = op
+        return (_OP_OVERHEAD + sum(_values_size(row) + 64 for _, row in deleted)
+                + sum(_values_size(row) + 64 for row in added))
+    if kind == "resize":
+        dropped, columns = op[3], op[4]
+        return _OP_OVERHEAD + 100 * len(dropped) + _values_size(dropped.values()) + _values_size(columns or ())
+    # replace（元に戻す用の前の表と，やり直す用の新しい表の両方を持つ）
+    return _OP_OVERHEAD + op[1].memory_usage() + op[2].memory_usage()
+
+
+class EditHistory:
+    """
+    元に戻す・やり直すための差分の履歴．複数の TableState で共有できる（Tab 3 のヘッダーとデータなど）．
+    1手は [(TableState, 差分), ...] で，transaction() の中の変更は1手にまとまる
+    """
+
+    def __init__(self, budget=HISTORY_BUDGET, max_steps=MAX_STEPS):
+        self.budget = budget
+        self.max_steps = max_steps
+        self.nbytes = 0
+        # 上限を超えて捨てた手数
+        self.evicted = 0
+        self._undo = deque()
+        self._redo = []
+        self._pending = None
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def __len__(self):
+        return len(self._undo)
+
+    @contextmanager
+    def transaction(self):
+        """ with の中の変更を1手として記録する（入れ子にした場合は一番外側でまとめる） """
+        if self._pending is not None:
+            yield
+            return
+        self._pending = []
+        try:
+            yield
+        finally:
+            steps, self._pending = self._pending, None
+            if steps:
+                self._push(steps)
+
+    def record(self, state, op):
+        if self._pending is not None:
+            self._pending.append((state, op))
+        else:
+            self._push([(state, op)])
+
+    def _push(self, steps):
+        for _, size in self._redo:
+            self.nbytes -= size
+        self._redo.clear()
+        size = sum(_op_size(op) for _, op in steps)
+        self._undo.append((steps, size))
+        self.nbytes += size
+        while self._undo and (len(self._undo) > self.max_steps or self.nbytes > self.budget):
+            _, dropped = self._undo.popleft()
+            self.nbytes -= dropped
+            self.evicted += 1
+
+    def undo(self):
+        """ 直前の1手を取り消す．取り消せたら True """
+        if not self._undo:
+            return False
+        entry = self._undo.pop()
+        for state, op in reversed(entry[0]):
+            state._apply(op, forward=False)
+        self._redo.append(entry)
+        return True
+
+    def redo(self):
+        """ 取り消した1手をやり直す．やり直せたら True """
+        if not self._redo:
+            return False
+        entry = self._redo.pop()
+        for state, op in entry[0]:
+            state._apply(op, forward=True)
+        self._undo.append(entry)
+        return True
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.nbytes = 0
+
+
+class TableState:
+    """
+    セッションに1つだけ持つ表（Table）と，その変更の記録．
+    変更のたびに version が上がり，changed_rows(version) で前の版から変わった行が分かる
+    """
+
+    def __init__(self, table, history=None):
+        self.table = table
+        self.history = history if history is not None else EditHistory()
+        self.version = 0
+        self._frame = None
+        self._journal = deque(maxlen=_JOURNAL_SIZE)
+
+    @classmethod
+    def empty(cls, n_rows, n_cols, columns=None, history=None):
+        """ 空文字で埋めた n_rows x n_cols の表 """
+        return cls(Table([""] * (n_rows * n_cols), n_rows, n_cols, columns), history)
+
+    @property
+    def shape(self):
+        return self.table.shape
+
+    def __repr__(self):
+        return f"<TableState {self.table.n_rows}x{self.table.n_cols} v{self.version}>"
+
+    def editor_key(self, prefix):
+        """ data_editor の key（版ごとに変わるので，取り込み済みの差分がエディタに残らない） """
+        return f"{prefix}_v{self.version}"
+
+    def to_frame(self):
+        """ data_editor に渡す DataFrame．同じ版の間は同じオブジェクトを返す（文字列は表と共有する） """
+        if self._frame is None:
+            self._frame = self.table.to_frame()
+        return self._frame
+
+    def memory_usage(self):
+        """ 表（と作成済みの DataFrame の参照の配列）のおおよそのバイト数 """
+        total = self.table.memory_usage()
+        if self._frame is not None:
+            total += 8 * len(self.table.cells)
+        return total
+
+    def changed_rows(self, since):
+        """ 版 since から変わった行番号の集合．行の追加・削除や表の大きさの変更を含む場合と，古すぎる版では None """
+        if since == self.version:
+            return set()
+        if since > self.version or not self._journal or self._journal[0][0] > since + 1:
+            return None
+        rows = set()
+        for version, changed in self._journal:
+            if version <= since:
+                continue
+            if changed is None:
+                return None
+            rows |= changed
+        return rows
+
+    # --- 変更（差分を作って適用し，履歴に記録する） ---
+
+    def set_cells(self, changes):
+        """ {(行, 列): 値} のセルを書き換える．変わったセルがあれば True """
+        cells, n_cols = self.table.cells, self.table.n_cols
+        indices, old, new = [], [], []
+        for (r, c), value in sorted(changes.items()):
+            i = r * n_cols + c
+            if 0 <= c < n_cols and 0 <= i < len(cells) and cells[i] != value:
+                indices.append(i)
+                old.append(cells[i])
+                new.append(value)
+        return self._do(("cells", indices, old, new)) if indices else False
+
+    def resize(self, n_rows, n_cols):
+        """ 表の大きさを変える．残る範囲のセルはそのまま，増えた部分は空文字にする """
+        table = self.table
+        if (n_rows, n_cols) == table.shape:
+            return False
+        dropped = {}
+        for r in range(table.n_rows):
+            row = table.row(r)
+            for c, value in enumerate(row):
+                if (r >= n_rows or c >= n_cols) and value != "":
+                    dropped[(r, c)] = value
+        columns = list(table.columns) if table.columns is not None else None
+        return self._do(("resize", table.shape, (n_rows, n_cols), dropped, columns))
+
+    def replace(self, table):
+        """ 表全体を置き換える（テンプレートの読み込みや新しい表の作成．元に戻せる） """
+        return self._do(("replace", self.table, table))
+
+    def apply_editor_state(self, editor_state):
+        """
+        data_editor の差分（edited_rows / added_rows / deleted_rows）を表に取り込む．
+        差分の行番号はエディタに渡した版の表のもの．変わったところがあれば True
+        """
+        if not editor_state:
+            return False
+        positions = self._column_positions()
+        edits = {}
+        for row, changes in editor_state.get("edited_rows", {}).items():
+            for col, value in changes.items():
+                pos = positions.get(col)
+                if pos is not None:
+                    edits[(int(row), pos)] = _cell_text(value)
+        added = []
+        for values in editor_state.get("added_rows", []):
+            row = [""] * self.table.n_cols
+            for col, value in values.items():
+                pos = positions.get(col)
+                if pos is not None:
+                    row[pos] = _cell_text(value)
+            added.append(row)
+        deleted = sorted({int(i) for i in editor_state.get("deleted_rows", []) if 0 <= int(i) < self.table.n_rows})
+
+        changed = False
+        with self.history.transaction():
+            if edits:
+                changed = self.set_cells(edits)
+            if deleted or added:
+                # 削除する行の中身は，元に戻すときのために取っておく
+                changed = self._do(("rows", [(i, self.table.row(i)) for i in deleted], added)) or changed
+        return changed
+
+    def _column_positions(self):
+        # 差分のキーは列名の文字列なので，列の位置に変換する表を作る（列名の無い表の列名は 0, 1, 2, ...）
+        columns = self.table.columns if self.table.columns is not None else range(self.table.n_cols)
+        positions = {}
+        for i, col in enumerate(columns):
+            positions.setdefault(col, i)
+            positions.setdefault(str(col), i)
+        return positions
+
+    def _do(self, op):
+        self._apply(op, forward=True)
+        self.history.record(self, op)
+        return True
+
+    def _apply(self, op, forward):
+        """ 差分を適用する（forward=False なら取り消す） """
+        kind = op[0]
+        table = self.table
+        changed = None
+        if kind == "cells":
+            _, indices, old, new = op
+            values = new if forward else old
+            cells = table.cells
+            for i, value in zip(indices, values):
+                cells[i] = value
+            n_cols = table.n_cols
+            changed = {i // n_cols for i in indices}
+        elif kind == "rows":
+            _, deleted, added = op
+            rows = table.to_rows()
+            if forward:
+                for i, _ in reversed(deleted):
+                    del rows[i]
+                rows.extend(list(row) for row in added)
+            else:
+                del rows[len(rows) - len(added):]
+                for i, row in deleted:
+                    rows.insert(i, list(row))
+            self.table = _from_rows(rows, table.n_cols, table.columns)
+        elif kind == "resize":
+            _, old_shape, new_shape, dropped, columns = op
+            if forward:
+                self.table = _reshape(table, *new_shape, {}, _resized_columns(columns, new_shape[1]))
+            else:
+                self.table = _reshape(table, *old_shape, dropped, columns)
+        else:
+            # 差分に残した表はセルの書き換えで変わらないように，コピーを使う
+            _, old, new = op
+            source = new if forward else old
+            self.table = Table(list(source.cells), source.n_rows, source.n_cols,
+                               None if source.columns is None else list(source.columns))
+        self.version += 1
+        self._frame = None
+        self._journal.append((self.version, changed))
+
+
+def _from_rows(rows, n_cols, columns):
+    cells = []
+    for row in rows:
+        cells.extend(row)
+    return Table(cells, len(rows), n_cols, columns)
+
+
+def _resized_columns(columns, n_cols):
+    # 増えた列の列名は列番号にする
+    if columns is None:
+        return None
+    return columns[:n_cols] + [str(i) for i in range(len(columns), n_cols)]
+
+
+def _reshape(table, n_rows, n_cols, fill, columns):
+    """ 左上をそろえて n_rows x n_cols にした新しい Table．増えたセルは fill（{(行, 列): 値}）か空文字 """
+    cells = []
+    old_rows, old_cols = table.shape
+    for r in range(n_rows):
+        if r < old_rows:
+            row = table.row(r)
+            if n_cols <= old_cols:
+                cells.extend(row[:n_cols])
+                continue
+            cells.extend(row)
+            start = old_cols
+        else:
+            start = 0
+        if fill:
+            cells.extend(fill.get((r, c), "") for c in range(start, n_cols))
+        else:
+            cells.extend([""] * (n_cols - start))
+    return Table(cells, n_rows, n_cols, columns)
+
+
+def commit_editor(state, key):
+    """ data_editor の on_change 用．st.session_state[key] の差分を state に取り込む """
+    import streamlit as st
+    state.apply_editor_state(st.session_state.get(key))
+
+
+def session_memory(values):
+    """
+    セッションステートの値のうち TableState と EditHistory が使うメモリ．
+    {"tables": 表のバイト数, "history": 履歴のバイト数, "steps": 元に戻せる手数, "evicted": 捨てた手数}
+    """
+    tables = histories = 0
+    steps = evicted = 0
+    seen = set()
+    for value in values:
+        if not isinstance(value, TableState):
+            continue
+        tables += value.memory_usage()
+        history = value.history
+        if id(history) not in seen:
+            seen.add(id(history))
+            histories += history.nbytes
+            steps += len(history)
+            evicted += history.evicted
+    return {"tables": tables, "history": histories, "steps": steps, "evicted": evicted}
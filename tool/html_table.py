@@ -0,0 +1,293 @@
+"""
+HTMLの表（Excel・Notion・ブラウザからコピーした表や，「Webページとして保存」したファイル）を読み込む．
+タブ区切りのテキストでは失われる colspan / rowspan を，標準ライブラリの html.parser で先頭から1回読むだけで展開する．
+DOM も行のリストも作らず，セルは1つのリストに行優先で追加していく（table.Table と同じ形）．
+ほかに保持するのは組み立て中の1行と，下の行へ続く縦結合（列ごとに1つ）だけ．
+
+ヘッダーの結合セルは覆う範囲すべてに同じ文字を入れる（高度表作成タブの「同じ文字が隣り合えば結合」と同じ表し方）．
+データ行の結合セルは左上のセルだけに文字を入れ，残りは空にする（Excel からタブ区切りでコピーした場合と同じ）．
+
+ヘッダーの段数は次のように決める．
+- <thead> があれば，その中の行
+- 無ければ1行目と，それに続く「すべて <th> の行」「colspan のあるセルを含む行」「ヘッダーの行から縦に結合されている行」
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import NamedTuple
+
+from .table import Table, intern_cells
+
+# 1度にパーサーに渡す文字数
+CHUNK_SIZE = 64 * 1024
+# HTML の仕様上の colspan / rowspan の上限
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+# rowspan="0"（行グループの終わりまで）の残り行数
+_TO_END = float("inf")
+# HTML で詰められる空白（Excel はセル内の空白を &nbsp; にする）
+_SPACES = re.compile(r"[ \t\r\n\f\xa0]+")
+_SECTIONS = ("thead", "tbody", "tfoot")
+# セルの中で前後の文字を区切るタグ（<p>a</p><p>b</p> や表の中の表のセルが "ab" とつながらないようにする）
+_BREAKS = frozenset((
+    "br", "p", "div", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "hr", "section", "article", "header", "footer", "table", "caption",
+    "thead", "tbody", "tfoot", "tr", "td", "th",
+))
+
+
+class HtmlTable(NamedTuple):
+    """ 読み込んだ表．table の先頭 header_rows 行がヘッダー．truncated は行数・列数の上限で切った場合 True """
+    table: Table
+    header_rows: int
+    truncated: bool = False
+
+    @property
+    def header(self):
+        return self.table.slice(0, self.header_rows)
+
+    @property
+    def body(self):
+        return self.table.slice(self.header_rows)
+
+
+def _span(value, limit):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return min(value, limit) if value >= 0 else 1
+
+
+class _Grid:
+    """ 1つの <table> の組み立て中の状態 """
+
+    def __init__(self, max_rows, max_cols):
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+        # 行優先に並べたセル（幅 width）
+        self.flat = []
+        self.width = 0
+        self.n_rows = 0
+        self.header_rows = 0
+        self.header_open = True
+        self.has_thead = False
+        self.section = None
+        self.truncated = False
+        # 列 -> [残りの行数, 文字, ヘッダーのセルか]
+        self.carry = {}
+        # 組み立て中の行のセル [(文字, rowspan, colspan, <th>か)]．行の外なら None
+        self.cells = None
+
+    def _is_header(self, cells):
+        if not self.header_open:
+            return False
+        if not self.n_rows:
+            return True
+        if self.has_thead:
+            return self.section == "thead"
+        return (all(is_th for _, _, _, is_th in cells) and bool(cells)
+                or any(colspan > 1 for _, _, colspan, _ in cells)
+                or any(header and remaining != _TO_END for remaining, _, header in self.carry.values()))
+
+    def end_row(self):
+        cells, self.cells = self.cells, None
+        if cells is None or not (cells or self.carry):
+            # 行の外か，セルの無い行
+            return
+        is_header = self._is_header(cells)
+        if not is_header:
+            self.header_open = False
+
+        row = []
+        carry, added = self.carry, {}
+        max_cols = self.max_cols
+
+        def take_carried():
+            # 上の行から縦に結合されている列を埋める
+            while len(row) in carry:
+                col = len(row)
+                remaining, text, header = carry[col]
+                row.append(text if header else "")
+                if remaining <= 1:
+                    del carry[col]
+                else:
+                    carry[col][0] = remaining - 1
+
+        for text, rowspan, colspan, _ in cells:
+            take_carried()
+            for k in range(colspan or 1):
+                if max_cols is not None and len(row) >= max_cols:
+                    self.truncated = True
+                    break
+                if rowspan != 1:
+                    added[len(row)] = [rowspan - 1 if rowspan else _TO_END, text, is_header]
+                row.append(text if k == 0 or is_header else "")
+        take_carried()
+        # 行のセルより右にある縦結合
+        for col in sorted(col for col in carry if col >= len(row)):
+            row.extend([""] * (col - len(row)))
+            take_carried()
+        carry.update(added)
+
+        if self.max_rows is not None and self.n_rows >= self.max_rows:
+            self.truncated = True
+            return
+        self._append(row)
+        if is_header:
+            self.header_rows = self.n_rows
+
+    def _append(self, row):
+        width = self.width
+        if len(row) > width:
+            # 前の行より長い行．それまでの行を新しい幅に詰め直す（幅が広がるたびに1回だけ）
+            pad = [""] * (len(row) - width)
+            if width:
+                flat = []
+                for start in range(0, self.n_rows * width, width):
+                    flat.extend(self.flat[start:start + width])
+                    flat.extend(pad)
+                self.flat = flat
+            else:
+                self.flat = pad * self.n_rows
+            self.width = width = len(row)
+        self.flat.extend(row)
+        if len(row) < width:
+            self.flat.extend([""] * (width - len(row)))
+        self.n_rows += 1
+
+    def end_section(self):
+        # 縦結合は行グループ（thead / tbody / tfoot）を越えない
+        self.end_row()
+        self.carry.clear()
+
+    def result(self):
+        self.end_section()
+        return HtmlTable(Table(intern_cells(self.flat), self.n_rows, self.width), self.header_rows, self.truncated)
+
+
+class HtmlTableParser(HTMLParser):
+    """
+    feed() で少しずつ HTML を渡し，close() で読み込んだ表（HtmlTable）のリストを受け取る．
+    表の中の表は外側のセルの文字として扱う
+    """
+
+    def __init__(self, max_rows=None, max_cols=None):
+        super().__init__(convert_charrefs=True)
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+        self.tables = []
+        self._grid = None
+        self._depth = 0
+        self._text = None
+        self._cell = None
+        self._skip = 0
+
+    def _end_cell(self):
+        if self._cell is not None:
+            text = _SPACES.sub(" ", "".join(self._text)).strip(" ")
+            self._grid.cells.append((text,) + self._cell)
+            self._cell = self._text = None
+
+    def _start_row(self):
+        self._end_cell()
+        self._grid.end_row()
+        self._grid.cells = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BREAKS and self._cell is not None:
+            self._text.append(" ")
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "table":
+            self._depth += 1
+            if self._depth == 1:
+                self._grid = _Grid(self.max_rows, self.max_cols)
+        elif self._depth != 1:
+            pass
+        elif tag in _SECTIONS:
+            self._end_cell()
+            self._grid.end_section()
+            self._grid.section = tag
+            self._grid.has_thead |= tag == "thead"
+        elif tag == "tr":
+            self._start_row()
+        elif tag in ("td", "th"):
+            if self._grid.cells is None:
+                self._start_row()
+            self._end_cell()
+            attrs = dict(attrs)
+            self._cell = (_span(attrs.get("rowspan", 1), MAX_ROWSPAN),
+                          max(_span(attrs.get("colspan", 1), MAX_COLSPAN), 1), tag == "th")
+            self._text = []
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag == "table":
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _BREAKS and self._cell is not None:
+            self._text.append(" ")
+        if tag in ("script", "style"):
+            self._skip = max(self._skip - 1, 0)
+        elif tag == "table":
+            if self._depth == 1:
+                self._end_cell()
+                table = self._grid.result()
+                if table.table.n_rows:
+                    self.tables.append(table)
+                self._grid = None
+            self._depth = max(self._depth - 1, 0)
+        elif self._depth != 1:
+            pass
+        elif tag in ("td", "th"):
+            self._end_cell()
+        elif tag == "tr":
+            self._end_cell()
+            self._grid.end_row()
+        elif tag in _SECTIONS:
+            self._end_cell()
+            self._grid.end_section()
+            self._grid.section = None
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._skip:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        # 閉じられていない表も返す
+        while self._depth:
+            self.handle_endtag("table")
+        return self.tables
+
+
+def _chunks(source, encoding):
+    """ 文字列・バイト列・ファイルを CHUNK_SIZE 文字ずつに分ける（バイト列は少しずつデコードする） """
+    if isinstance(source, str):
+        for start in range(0, len(source), CHUNK_SIZE):
+            yield source[start:start + CHUNK_SIZE]
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        view = memoryview(source)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield decoder.decode(view[start:start + CHUNK_SIZE])
+        yield decoder.decode(b"", final=True)
+    else:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def parse_html_tables(source, max_rows=None, max_cols=None, encoding="utf-8-sig"):
+    """
+    HTML（文字列・バイト列・read() できるファイル）の中の表をすべて読み込み，HtmlTable のリストを返す．
+    max_rows / max_cols を超えた部分は捨てる（巨大な表を貼り付けてもメモリを使い切らない）
+    """
+    parser = HtmlTableParser(max_rows, max_cols)
+    for chunk in _chunks(source, encoding):
+        parser.feed(chunk)
+    return parser.close()
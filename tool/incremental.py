@@ -0,0 +1,32 @@
+"""
+表の変更のあった行だけを描き直す仕組み．
+
+RowRenderCache は行ごとの描画結果を覚えておき，history.TableState の変更の記録から描き直す行を決めるので，
+1セルの編集にかかる時間が表の大きさにほとんど依存しない．
+"""
+
+
+class RowRenderCache:
+    """ 行ごとの描画結果のキャッシュ．render_row はセルのリストを受け取って1行分の文字列を返す """
+
+    def __init__(self, render_row):
+        self.render_row = render_row
+        # 直近の sync_state で描き直した行数（計測用）
+        self.rendered = 0
+        self._state = None
+        self._version = None
+        self._lines = []
+
+    def sync_state(self, state):
+        """ history.TableState の現在の全行の描画結果をリストで返す．前回の sync_state から変わった行だけ描き直す """
+        rows = state.changed_rows(self._version) if state is self._state else None
+        if rows is None:
+            self._lines = [self.render_row(row) for row in state.table.rows()]
+            self.rendered = len(self._lines)
+        else:
+            for i in rows:
+                self._lines[i] = self.render_row(state.table.row(i))
+            self.rendered = len(rows)
+        self._state = state
+        self._version = state.version
+        return self._lines.copy()
@@ -0,0 +1,473 @@
+"""
+Notion のデータベースとページ内の表を API から直接読み込む．
+
+- HTTP の接続は requests.Session で使い回し，ページの取得はスレッドで並列に行う
+- 読み込んだ行は「ページID・最終編集日時」をキーにキャッシュし，2回目以降は編集されたページだけを取得する
+  （データベースはまず最終編集日時だけを問い合わせ，変わったページの数に応じて個別取得か一括取得を選ぶ）
+- API の URL は環境変数 NOTION_API_URL で変えられる（benchmarks/mock_notion.py のモックサーバーで試せる）
+
+    python -m tool.notion https://www.notion.so/xxxx/実験ログ-0123456789abcdef0123456789abcdef -o results/
+    python -m tool.notion <データベースID> <ページID> -o results/ --cache .notion-cache.json
+
+.tsv に保存するので，そのまま python -m tool.cli / tool.build で変換できる．
+トークン（インテグレーションのシークレット）は環境変数 NOTION_TOKEN か --token で渡す．
+requests が必要（pip install .[notion]）．
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from .table import Table
+
+API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+TOKEN_ENV = "NOTION_TOKEN"
+API_URL_ENV = "NOTION_API_URL"
+# 1回の問い合わせで返してもらう件数（API の上限）
+PAGE_SIZE = 100
+# 並列に取得する数（Notion API の制限は平均3リクエスト/秒なので，多くしすぎない）
+WORKERS = 8
+# 429（レート制限）・5xx のときに再試行する回数
+MAX_RETRIES = 5
+# Notion の最終編集日時は分単位なので，編集から1分以内に取得した内容はキャッシュとして信用しない
+_EDITED_RESOLUTION = 60
+
+_NOTION_ID = re.compile(r"[0-9a-f]{32}(?![0-9a-f])")
+
+
+class NotionError(Exception):
+    """ API がエラーを返した（status は HTTP のステータスコード） """
+
+    def __init__(self, status, message, code=""):
+        super().__init__(f"{status} {code}: {message}" if code else f"{status}: {message}")
+        self.status = status
+        self.code = code
+
+
+def parse_notion_id(text):
+    """ Notion のURLかIDから，ハイフン付きのID（UUID形式）を取り出す．見つからなければ ValueError """
+    path = text.strip().split("?")[0].split("#")[0].lower().replace("-", "")
+    found = _NOTION_ID.findall(path)
+    if not found:
+        raise ValueError(f"NotionのURLかIDではありません: {text}")
+    raw = found[-1]
+    return f"{raw[:8]}-{raw[8:12]}-{raw[12:16]}-{raw[16:20]}-{raw[20:]}"
+
+
+def _edited_timestamp(value):
+    return datetime.fromisoformat(value).timestamp() if value else 0.0
+
+
+class PageCache:
+    """
+    ページごとの読み込み結果のキャッシュ（件数上限つきのLRU，スレッドセーフ）．
+    キーごとに (最終編集日時, 取得した時刻, 値) を持ち，最終編集日時が同じなら取得し直さない
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, edited):
+        """ 最終編集日時が edited のときの値．無い・古い・取得が編集の直後すぎる場合は None """
+        with self._lock:
+            entry = self._data.get(key)
+            if (entry is not None and entry[0] == edited
+                    and entry[1] - _edited_timestamp(edited) >= _EDITED_RESOLUTION):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, key, edited, value, fetched=None):
+        with self._lock:
+            self._data[key] = (edited, time.time() if fetched is None else fetched, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def load(self, path):
+        """ save() で保存したファイルを読み込む．無いか壊れていれば何もしない """
+        import json
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, edited, fetched, value in entries:
+            # JSON ではタプルのキーがリストになる
+            self.put(tuple(key), edited, value, fetched)
+
+    def save(self, path):
+        import json
+        with self._lock:
+            entries = [[key, *entry] for key, entry in self._data.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, separators=(",", ":"))
+
+
+# すべてのセッションで共有するキャッシュ（ページIDは Notion 全体で一意）
+page_cache = PageCache()
+
+
+class NotionClient:
+    """ Notion API のクライアント．接続を使い回し，複数のスレッドから同時に使える """
+
+    def __init__(self, token=None, base_url=None, workers=WORKERS, timeout=30):
+        # requests の読み込みは重いので，Notion から読み込むときだけ読み込む
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError:
+            raise ImportError("Notion から読み込むには requests が必要です（pip install .[notion]）") from None
+        token = token or os.environ.get(TOKEN_ENV)
+        if not token:
+            raise ValueError(f"Notion のトークンを指定してください（環境変数 {TOKEN_ENV}）")
+        self.base_url = (base_url or os.environ.get(API_URL_ENV) or API_URL).rstrip("/")
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": NOTION_VERSION,
+            "Content-Type": "application/json",
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def request(self, method, path, params=None, body=None):
+        """ API を呼んで JSON を返す．レート制限（429）と 5xx は待ってから再試行する """
+        for attempt in range(MAX_RETRIES + 1):
+            response = self.session.request(method, self.base_url + path, params=params, json=body,
+                                            timeout=self.timeout)
+            with self._lock:
+                self.requests += 1
+            status = response.status_code
+            if (status == 429 or status >= 500) and attempt < MAX_RETRIES:
+                time.sleep(float(response.headers.get("Retry-After") or 0.5 * 2**attempt))
+                continue
+            if status >= 400:
+                try:
+                    error = response.json()
+                except ValueError:
+                    error = {}
+                raise NotionError(status, error.get("message", response.reason), error.get("code", ""))
+            return response.json()
+
+    def paginate(self, method, path, params=None, body=None):
+        """ ページ送りのある API の結果（results）を順に返す """
+        cursor = None
+        while True:
+            if method == "GET":
+                page_params = dict(params or {}, page_size=PAGE_SIZE)
+                if cursor:
+                    page_params["start_cursor"] = cursor
+                data = self.request(method, path, params=page_params)
+            else:
+                page_body = dict(body or {}, page_size=PAGE_SIZE)
+                if cursor:
+                    page_body["start_cursor"] = cursor
+                data = self.request(method, path, params=params, body=page_body)
+            yield from data.get("results", ())
+            cursor = data.get("next_cursor")
+            if not data.get("has_more") or not cursor:
+                return
+
+    def map(self, fn, items):
+        """ fn を items に並列に適用した結果のリスト（順序は items と同じ） """
+        items = list(items)
+        if self.workers == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        # concurrent.futures の読み込みは重いので，並列に取得するときだけ読み込む
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(fn, items))
+
+
+# --- プロパティの値を文字列にする ---
+
+def _rich_text(items):
+    return "".join(item.get("plain_text", "") for item in items or ())
+
+
+def _number_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def property_text(prop):
+    """ ページのプロパティ（の値）を表のセルの文字列にする """
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if value is None:
+        return ""
+    if kind in ("title", "rich_text"):
+        return _rich_text(value)
+    if kind in ("select", "status"):
+        return value.get("name", "")
+    if kind == "multi_select":
+        return ", ".join(option.get("name", "") for option in value)
+    if kind == "number":
+        return _number_text(value)
+    if kind == "checkbox":
+        return "✓" if value else ""
+    if kind == "date":
+        start, end = value.get("start") or "", value.get("end")
+        return f"{start} → {end}" if end else start
+    if kind in ("people", "created_by", "last_edited_by"):
+        users = value if isinstance(value, list) else [value]
+        return ", ".join(user.get("name") or user.get("id", "") for user in users)
+    if kind == "files":
+        return ", ".join(f.get("name", "") for f in value)
+    if kind == "relation":
+        return ", ".join(r.get("id", "") for r in value)
+    if kind == "formula":
+        return property_text(value)
+    if kind == "rollup":
+        if value.get("type") == "array":
+            return ", ".join(filter(None, map(property_text, value.get("array", ()))))
+        return property_text(value)
+    if kind == "unique_id":
+        number = value.get("number")
+        return "" if number is None else f"{value['prefix']}-{number}" if value.get("prefix") else str(number)
+    if kind == "verification":
+        return value.get("state", "")
+    if isinstance(value, (str, int, float)):
+        # url・email・phone_number・created_time・last_edited_time など
+        return _number_text(value) if isinstance(value, float) else str(value)
+    return ""
+
+
+# --- データベース ---
+
+def _schema_columns(schema):
+    """ データベースの列 [(プロパティID, 名前), ...]．タイトルの列を先頭にする（他は API の順） """
+    columns = [(prop["id"], name) for name, prop in schema.get("properties", {}).items()]
+    columns.sort(key=lambda column: schema["properties"][column[1]].get("type") != "title")
+    return columns
+
+
+def _row_values(page):
+    """ ページのプロパティを {プロパティID: 文字列} にする（名前の変更でキャッシュが無駄にならないようにIDで持つ） """
+    return {prop["id"]: property_text(prop) for prop in page.get("properties", {}).values()}
+
+
+def import_database(client, database_id, cache=page_cache):
+    """
+    データベースを Table（列名つき）として読み込む．(タイトル, Table, 統計) を返す．
+    統計は {"pages": 行数, "fetched": 取得し直した行数, "requests": API の呼び出し回数}
+    """
+    start_requests = client.requests
+    schema = client.request("GET", f"/databases/{database_id}")
+    columns = _schema_columns(schema)
+    # 列の構成が変わったら，キャッシュした行は使わない
+    schema_key = "|".join(f"{prop_id}:{schema['properties'][name].get('type')}" for prop_id, name in columns)
+
+    if cache.get((database_id, schema_key), None) is None:
+        # 初めて読み込むデータベースは，最終編集日時を問い合わせずに全体を一度に取得する
+        pages, values = _query_all(client, database_id, schema_key, cache)
+        changed = pages
+    else:
+        pages, values, changed = _query_changed(client, database_id, schema_key, cache)
+    cache.put((database_id, schema_key), None, True)
+
+    cells = []
+    for page_id, _ in pages:
+        row = values.get(page_id, {})
+        cells.extend(row.get(prop_id, "") for prop_id, _ in columns)
+    table = Table(cells, len(pages), len(columns), [name for _, name in columns])
+    title = _rich_text(schema.get("title")) or database_id
+    return title, table, {"pages": len(pages), "fetched": len(changed), "requests": client.requests - start_requests}
+
+
+def _query_all(client, database_id, schema_key, cache):
+    """ データベース全体を問い合わせてキャッシュに入れる．([(ページID, 最終編集日時), ...], {ページID: 値}) を返す """
+    pages, values = [], {}
+    fetched = time.time()
+    for page in client.paginate("POST", f"/databases/{database_id}/query"):
+        if page.get("archived") or page.get("in_trash"):
+            continue
+        values[page["id"]] = row = _row_values(page)
+        pages.append((page["id"], page.get("last_edited_time")))
+        cache.put((page["id"], schema_key), page.get("last_edited_time"), row, fetched)
+    return pages, values
+
+
+def _query_changed(client, database_id, schema_key, cache):
+    """ 最終編集日時だけを問い合わせ，キャッシュに無いページだけを取得する．(ページ, 値, 取得したページ) を返す """
+    # プロパティはタイトルだけ返してもらう
+    pages = [(page["id"], page.get("last_edited_time"))
+             for page in client.paginate("POST", f"/databases/{database_id}/query",
+                                         params={"filter_properties": "title"})
+             if not page.get("archived") and not page.get("in_trash")]
+    values = {}
+    changed = []
+    for page_id, edited in pages:
+        cached = cache.get((page_id, schema_key), edited)
+        if cached is None:
+            changed.append(page_id)
+        else:
+            values[page_id] = cached
+    if not changed:
+        return pages, values, changed
+
+    # 変わったページが多いときは，全体をもう一度問い合わせる方が少ない回数で済む
+    # （一括取得は PAGE_SIZE 件ずつ順番に，個別取得は WORKERS 件ずつ並列に取得できる）
+    full_query_rounds = -(-len(pages) // PAGE_SIZE)
+    if -(-len(changed) // client.workers) >= full_query_rounds:
+        values.update(_query_all(client, database_id, schema_key, cache)[1])
+        return pages, values, changed
+    fetched = time.time()
+    for page in client.map(lambda page_id: client.request("GET", f"/pages/{page_id}"), changed):
+        values[page["id"]] = row = _row_values(page)
+        cache.put((page["id"], schema_key), page.get("last_edited_time"), row, fetched)
+    return pages, values, changed
+
+
+# --- ページ内の表（table ブロック） ---
+
+def _table_rows(client, block):
+    rows = []
+    for child in client.paginate("GET", f"/blocks/{block['id']}/children"):
+        if child.get("type") == "table_row":
+            rows.append([_rich_text(cell) for cell in child["table_row"].get("cells", ())])
+    return rows
+
+
+def import_page_tables(client, page_id, cache=page_cache):
+    """
+    ページの直下にある表（table ブロック）をすべて読み込む．[(タイトル, Table), ...] と統計を返す．
+    ページの最終編集日時が前回と同じなら API はページの1回だけで済む
+    """
+    start_requests = client.requests
+    page = client.request("GET", f"/pages/{page_id}")
+    edited = page.get("last_edited_time")
+    title = next((property_text(prop) for prop in page.get("properties", {}).values()
+                  if prop.get("type") == "title"), "") or page_id
+    tables = cache.get((page_id, "tables"), edited)
+    fetched = tables is None
+    if fetched:
+        fetched_at = time.time()
+        blocks = [block for block in client.paginate("GET", f"/blocks/{page_id}/children")
+                  if block.get("type") == "table"]
+        rows = client.map(lambda block: _table_rows(client, block), blocks)
+        tables = [(block["table"].get("has_column_header", False), table_rows) for block, table_rows in zip(blocks, rows)]
+        cache.put((page_id, "tables"), edited, tables, fetched_at)
+    result = []
+    for i, (has_header, rows) in enumerate(tables, start=1):
+        name = title if len(tables) == 1 else f"{title} ({i})"
+        result.append((name, Table.from_rows(rows, header=has_header)))
+    return result, {"pages": 1, "fetched": int(fetched), "requests": client.requests - start_requests}
+
+
+def import_notion(client, target, cache=page_cache):
+    """
+    データベースかページのURL・IDから表を読み込む．[(タイトル, Table), ...] と統計を返す．
+    データベースとして読めなければページとして読む
+    """
+    notion_id = parse_notion_id(target)
+    try:
+        title, table, stats = import_database(client, notion_id, cache)
+    except NotionError as e:
+        # ページのIDをデータベースとして問い合わせると 400（validation_error）か 404 になる
+        if e.status not in (400, 404):
+            raise
+        return import_page_tables(client, notion_id, cache)
+    return [(title, table)], stats
+
+
+def to_tsv(table):
+    """ Table をタブ区切りのテキストにする（改行やタブを含むセルは "..." で囲む．列名があれば1行目にする） """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter="\t", lineterminator="\n")
+    if table.columns is not None:
+        writer.writerow(table.columns)
+    writer.writerows(table.rows())
+    return buffer.getvalue()
+
+
+def _file_stem(title):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", title).strip("_") or "notion"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tool.notion",
+                                     description="Notion のデータベース・ページ内の表を .tsv として保存します．")
+    parser.add_argument("targets", nargs="+", help="データベースかページのURL・ID")
+    parser.add_argument("-o", "--output-dir", default=".", help="出力先ディレクトリ")
+    parser.add_argument("--token", help=f"インテグレーションのトークン（省略時は環境変数 {TOKEN_ENV}）")
+    parser.add_argument("--cache", help="キャッシュを保存するファイル（次回は編集されたページだけを取得する）")
+    parser.add_argument("-j", "--jobs", type=int, default=WORKERS, help="並列に取得する数")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cache = PageCache()
+    if args.cache:
+        cache.load(args.cache)
+    start = time.perf_counter()
+    failed = 0
+    try:
+        client = NotionClient(args.token, workers=args.jobs)
+    except (ImportError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    with client:
+        for target in args.targets:
+            try:
+                tables, stats = import_notion(client, target, cache)
+            except (NotionError, ValueError, OSError) as e:
+                print(f"❌ {target}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            for title, table in tables:
+                path = os.path.join(args.output_dir, _file_stem(title) + ".tsv")
+                os.makedirs(args.output_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    f.write(to_tsv(table))
+                print(f"✅ {title} -> {path}（{table.n_rows}行 × {table.n_cols}列）", file=sys.stderr)
+            print(f"   取得 {stats['fetched']}/{stats['pages']}・API {stats['requests']} 回", file=sys.stderr)
+    if args.cache:
+        cache.save(args.cache)
+    print(f"{len(args.targets) - failed}/{len(args.targets)} 件を読み込みました ({time.perf_counter() - start:.2f} s)",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
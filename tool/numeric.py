@@ -0,0 +1,228 @@
+"""
+数値の列の判定と書式（小数点揃え・有効数字・3桁区切り・最大値/最小値の太字）．
+列のセルを1つの文字列に連結し，正規表現の検索や count で列全体をまとめて判定するので，
+列数・行数の多い表でもほとんど時間がかからない．セルを数値として読むのは書式を変えるときだけ．
+"""
+import re
+
+from . import perf
+from .table import Table
+from .utils import as_table, escape_table, _cell_text
+
+# 列の種類
+NUMERIC = "numeric"
+PERCENT = "percent"
+TEXT = "text"
+# 数値のセルに現れうる文字以外（これが1文字でもあれば文字列の列）
+_NON_NUMBER_CHAR = re.compile(r"[^0-9.,+\-eE%\x1f]")
+# 小数点以下が k+1 桁以上あるセルを探す正規表現（k = 0, 1, 2, ...）
+_DECIMALS = tuple(re.compile(r"\.\d{%d}" % k) for k in range(1, 18))
+_SEP = "\x1f"
+# 3桁区切りのカンマの入った数値．カンマがこれ以外の位置にあるセル（"1,5" のような小数点のカンマ）は数値として読まない
+_GROUPED = re.compile(r"[-+]?[1-9]\d{0,2}(?:,\d{3})+(?:\.\d*)?(?:[eE][-+]?\d+)?%?")
+# 文字の種類で判定したあと，実際に数値として読んでみるセルの数
+_SAMPLE = 256
+
+
+def _column_text(cells):
+    """ 列のセルを (文字列のリスト, 区切り文字で連結した文字列) にする """
+    try:
+        return cells, _SEP.join(cells)
+    except TypeError:
+        cells = list(map(_cell_text, cells))
+        return cells, _SEP.join(cells)
+
+
+def parse_values(cells, joined=None):
+    """
+    セルを float のリストにする（空のセルは None）．数値として読めないセルがあれば None．
+    カンマは3桁区切りの位置にあるときだけ取り除く（"1,5" を 15 と読まない）
+    """
+    if joined is None:
+        joined = _SEP.join(cells)
+    if "," in joined and not all(_GROUPED.fullmatch(cell) for cell in cells if "," in cell):
+        return None
+    try:
+        if "" in cells:
+            return [float(cell.replace(",", "").rstrip("%")) if cell else None for cell in cells]
+        # 空のセルが無ければ，連結した文字列から "," と "%" をまとめて取り除いて読む
+        return list(map(float, joined.replace(",", "").replace("%", "").split(_SEP)))
+    except ValueError:
+        return None
+
+
+def classify_column(cells, joined=None):
+    """
+    列の種類（NUMERIC / PERCENT / TEXT）を返す．空のセルは無視し，すべて空なら TEXT．
+    - 列全体に数値以外の文字が無いかを1回の検索で調べる
+    - "%" は値の数と同じだけ，すべてセルの末尾にあれば PERCENT
+    - "2024-01-02" のように文字の種類だけでは区別できないものは，間引いたセルを読んで除く
+    """
+    if joined is None:
+        cells, joined = _column_text(cells)
+    if _NON_NUMBER_CHAR.search(joined):
+        return TEXT
+    n_values = len(cells) - cells.count("")
+    if n_values == 0:
+        return TEXT
+    n_percent = joined.count("%")
+    if n_percent and (n_percent != n_values or joined.count("%" + _SEP) + joined.endswith("%") != n_percent):
+        return TEXT
+    if parse_values([cell for cell in cells[::max(1, len(cells) // _SAMPLE)] if cell]) is None:
+        return TEXT
+    return PERCENT if n_percent else NUMERIC
+
+
+class _Decimals(dict):
+    """ 指数表記の末尾4文字（"e+03"，"e-04"，"+100"）→ 有効数字 sig_digits 桁にする小数点以下の桁数（負なら整数の位で丸める） """
+
+    def __init__(self, sig_digits):
+        super().__init__()
+        self.sig_digits = sig_digits
+
+    def __missing__(self, key):
+        # "1e999" は inf として読まれる（"inf" / "-inf" は桁数が無い）
+        self[key] = decimals = self.sig_digits - 1 - int(key.lstrip("e")) if key[-1].isdigit() else 0
+        return decimals
+
+
+def _significant(values, sig_digits, thousands, suffix):
+    """ 値ごとに有効数字 sig_digits 桁で書く（1234.5 → "1230"，-0.0001 → "-0.000100"） """
+    # 指数表記でまとめて丸め，指数から小数点以下の桁数を決める（9.996 → "1.00e+01" のように桁が繰り上がる場合も正しく数える）
+    rounded = (_SEP.join(["%%.%de" % (sig_digits - 1)] * len(values)) % tuple(values)).split(_SEP)
+    decimals = list(map(_Decimals(sig_digits).__getitem__, [text[-4:] for text in rounded]))
+    # 整数の位で丸める値（1234.5 → 1230）は丸めた値を，それ以外は元の値を小数点以下の桁数で書く（どちらも同じ位で丸まる）．
+    # -0.0 は "-0.00" と書かれないよう 0.0 を足す
+    values = [float(text) if d < 0 else v + 0.0 for v, d, text in zip(values, decimals, rounded)]
+    if thousands:
+        specs = {d: ",.%df" % max(d, 0) for d in set(decimals)}
+        texts = list(map(format, values, map(specs.__getitem__, decimals)))
+        return [text + suffix for text in texts] if suffix else texts
+    formats = {d: "%%.%df%s" % (max(d, 0), "%%" if suffix else "") for d in set(decimals)}
+    return (_SEP.join(map(formats.__getitem__, decimals)) % tuple(values)).split(_SEP)
+
+
+def format_values(values, joined, kind, sig_digits=None, thousands=False):
+    """
+    列の数値を書き直す（joined は元のセルを連結した文字列）．
+    - sig_digits: セルごとに有効数字の桁数をそろえる（小数点以下の桁数はセルごとに変わる）．
+      None なら，列の全セルを元の最大の小数点以下の桁数にそろえる
+    - thousands: 3桁区切りのカンマを入れる
+    """
+    present = [v for v in values if v is not None]
+    if not present:
+        return [""] * len(values)
+    suffix = "%" if kind == PERCENT else ""
+    if sig_digits:
+        texts = _significant(present, sig_digits, thousands, suffix)
+    else:
+        # 元の最大の桁数．短い方から順に探すと，最後の1回以外は最初の数セルで見つかって終わる
+        decimals = 0
+        while decimals < len(_DECIMALS) and _DECIMALS[decimals].search(joined):
+            decimals += 1
+        if min(present) < 0:
+            # 丸めると 0 になる負の数は "-0" と書かれないよう，丸めてから 0.0 を足す
+            present = [round(v, decimals) + 0.0 if v < 0 else v for v in present]
+        if thousands:
+            texts = list(map(("{:,.%df}%s" % (decimals, suffix)).format, present))
+        else:
+            # 書式の文字列を連結して % 演算子1回で書く（セルごとに format を呼ぶより速い）
+            template = "%%.%df%s" % (decimals, "%%" if suffix else "")
+            texts = (_SEP.join([template] * len(present)) % tuple(present)).split(_SEP)
+    if len(present) == len(values):
+        return texts
+    texts = iter(texts)
+    return [next(texts) if v is not None else "" for v in values]
+
+
+def format_numbers(table, align=None, sig_digits=None, thousands=False, bold_max=False, bold_min=False):
+    """
+    表（ヘッダーを除く）の列ごとに種類を判定し，数値の列の書式を整える．
+    (新しい Table, 列ごとの種類のリスト, 太字にするセルの位置（cells の添字）の集合) を返す．
+    align="S"（siunitx）のときは，カンマを小数点と解釈されないよう3桁区切りは列の指定で行う
+    """
+    n_cols = table.n_cols
+    reformat = sig_digits or thousands or align == "S"
+    cells = list(table.cells) if reformat else table.cells
+    kinds = []
+    bold = set()
+    for j in range(n_cols):
+        column, joined = _column_text(cells[j::n_cols])
+        kind = classify_column(column, joined)
+        if kind != TEXT and (reformat or bold_max or bold_min):
+            values = parse_values(column, joined)
+            if values is None:
+                # 間引いたセルは読めたが，読めないセルが混ざっていた
+                kind = TEXT
+            else:
+                if reformat:
+                    grouped = thousands and (align != "S" or kind == PERCENT)
+                    cells[j::n_cols] = format_values(values, joined, kind, sig_digits, thousands=grouped)
+                if bold_max or bold_min:
+                    bold.update(j + i * n_cols for i in _extreme_rows(values, "" in column, bold_max, bold_min))
+        kinds.append(kind)
+    return Table(cells, table.n_rows, n_cols, table.columns), kinds, bold
+
+
+def _extreme_rows(values, has_empty, maximum, minimum):
+    """ 最大値・最小値の行番号（同じ値が複数あればすべて）．list.index で探すので速い """
+    present = [v for v in values if v is not None] if has_empty else values
+    rows = []
+    for wanted, target in ((maximum, max), (minimum, min)):
+        if not wanted:
+            continue
+        value = target(present)
+        i = values.index(value)
+        while True:
+            rows.append(i)
+            try:
+                i = values.index(value, i + 1)
+            except ValueError:
+                break
+    return rows
+
+
+def column_specs(kinds, left_centered=False, align=None, thousands=False):
+    """
+    列ごとの列指定（l / c / r / S）．文字列の列は従来どおり（左端 l，ほかは c）．
+    align="r" なら数値とパーセントの列を右揃え，align="S" なら数値の列を siunitx の小数点揃えにする
+    """
+    specs = ["c" if left_centered else "l"] + ["c"] * (len(kinds) - 1)
+    if align:
+        for j, kind in enumerate(kinds):
+            if kind == NUMERIC and align == "S":
+                specs[j] = "S[group-minimum-digits=4]" if thousands else "S"
+            elif kind != TEXT:
+                specs[j] = "r"
+    return specs
+
+
+def bold_cell(text, spec):
+    """ 太字のセル．siunitx の S 列では \\bfseries を使う（detect-weight が必要） """
+    return f"\\bfseries {text}" if spec.startswith("S") else f"\\textbf{{{text}}}"
+
+
+@perf.timed("number_format")
+def number_table(table, align=None, sig_digits=None, thousands=False, bold_max=False, bold_min=False,
+                 left_centered=False, escape=True, raw_columns=()):
+    """
+    dataframe_to_latex の数値の書式の処理．(エスケープ済みの列名つき Table, 列ごとの列指定) を返す．
+    書式を整えてからエスケープし，太字の命令はエスケープのあとで付ける
+    """
+    table = as_table(table)
+    if table.columns is None:
+        # ヘッダーの無い Table は1行目を列名にする
+        n_cols = table.n_cols
+        columns = table.row(0) if table.n_rows else []
+        table = Table(table.cells[n_cols:], max(table.n_rows - 1, 0), n_cols, columns)
+    table, kinds, bold = format_numbers(table, align, sig_digits, thousands, bold_max, bold_min)
+    specs = column_specs(kinds, left_centered, align, thousands)
+    if escape:
+        table = escape_table(table, raw_columns)
+    if bold:
+        n_cols = table.n_cols
+        cells = list(table.cells)
+        for index in bold:
+            cells[index] = bold_cell(cells[index], specs[index % n_cols])
+        table = Table(cells, table.n_rows, n_cols, table.columns)
+    return table, specs
@@ -0,0 +1,164 @@
+"""
+処理段階（解析・data_editor・LaTeX生成・プレビュー・エクスポートなど）ごとの時間計測．
+Streamlit の再実行ごとに，段階ごとの時間・呼び出し回数・表の大きさを記録する．
+
+計測は start_run() を呼んだスレッド（＝そのセッションの再実行）だけで行う．
+どのセッションも計測していないときは，timed / stage はグローバル変数を1回見るだけなので，ほとんど時間がかからない．
+
+環境変数:
+    AUTOLATEX_PERF=1             サイドバーの計測を最初から有効にする
+    AUTOLATEX_PERF_LOG=perf.jsonl  再実行ごとの記録をJSON Lines形式で追記する（全ユーザー分を集計できる）
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLE_ENV = "AUTOLATEX_PERF"
+LOG_ENV = "AUTOLATEX_PERF_LOG"
+
+_local = threading.local()
+_lock = threading.Lock()
+# 計測中のスレッドの数．0 のときはスレッドローカルも見ずに済ませる
+_active = 0
+# 無効のときに stage() が返す何もしないコンテキストマネージャ（使い回す）
+_NULL = nullcontext()
+
+
+def enabled_by_default():
+    return os.environ.get(ENABLE_ENV, "") not in ("", "0")
+
+
+def table_shape(value):
+    """ DataFrame・Table・行のリスト・テキストの (行数, 列数)．分からない値は None """
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple) and len(shape) == 2:
+        return shape
+    if isinstance(value, str):
+        return (value.count("\n") + 1 if value else 0, None)
+    if isinstance(value, list):
+        return (len(value), len(value[0]) if value and isinstance(value[0], (list, tuple)) else None)
+    return None
+
+
+class Run:
+    """ 1回の再実行の記録．段階ごとに [回数, 秒, 最大行数, 最大列数] を集計する """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds, shape=None):
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = [0, 0.0, None, None]
+        entry[0] += 1
+        entry[1] += seconds
+        if shape is not None:
+            rows, cols = shape
+            if rows is not None and (entry[2] is None or rows > entry[2]):
+                entry[2] = rows
+            if cols is not None and (entry[3] is None or cols > entry[3]):
+                entry[3] = cols
+
+    def to_record(self, extra=None):
+        record = {
+            "time": round(self.started, 3),
+            "label": self.label,
+            "seconds": time.perf_counter() - self.start,
+            "stages": [{"stage": name, "calls": calls, "seconds": seconds, "rows": rows, "cols": cols}
+                       for name, (calls, seconds, rows, cols) in self.stages.items()],
+        }
+        if extra:
+            record.update(extra)
+        return record
+
+
+def _set_run(run):
+    global _active
+    with _lock:
+        _active += (run is not None) - (getattr(_local, "run", None) is not None)
+    _local.run = run
+
+
+def start_run(label=""):
+    """ このスレッドでの計測を始める（Streamlit では再実行の最初に呼ぶ） """
+    run = Run(label)
+    _set_run(run)
+    return run
+
+
+def cancel_run():
+    """ 記録せずに計測をやめる（計測しない再実行の最初に呼び，前回の残りを消す） """
+    _set_run(None)
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def finish_run(extra=None):
+    """
+    計測を終えて記録（JSONにできる辞書）を返す．計測中でなければ None．
+    AUTOLATEX_PERF_LOG が設定されていれば1行追記する
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _set_run(None)
+    record = run.to_record(extra)
+    path = os.environ.get(LOG_ENV)
+    if path:
+        line = to_json_line(record)
+        with _lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    return record
+
+
+def to_json_line(record):
+    import json
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+@contextmanager
+def _measure(run, name, value):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add(name, time.perf_counter() - start, table_shape(value) if value is not None else None)
+
+
+def stage(name, table=None):
+    """
+    with perf.stage("data_editor", df): ... の形で区間の時間を記録する．
+    計測中でなければ何もしない
+    """
+    if not _active:
+        return _NULL
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    return _measure(run, name, table)
+
+
+def timed(name):
+    """ 関数の実行時間を name の段階として記録するデコレータ．表の大きさは最初の引数から取る """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return fn(*args, **kwargs)
+            run = getattr(_local, "run", None)
+            if run is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                run.add(name, time.perf_counter() - start, table_shape(args[0]) if args else None)
+        return wrapper
+    return decorate
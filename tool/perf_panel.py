@@ -0,0 +1,56 @@
+"""
+サイドバーの処理時間パネル．tool/perf.py の計測結果を表示し，JSON Lines でダウンロードできるようにする．
+"""
+import uuid
+from collections import deque
+
+import streamlit as st
+
+from . import perf
+from .cache import render_cache
+from .history import session_memory
+
+# セッションごとに保持する再実行の記録の数
+HISTORY_SIZE = 200
+
+
+def start_measuring():
+    """ サイドバーの切り替えを表示し，有効なら今回の再実行の計測を始める．有効かどうかを返す """
+    enabled = st.sidebar.checkbox("⏱️ 処理時間を計測", value=perf.enabled_by_default(), key="perf_enabled")
+    if enabled:
+        perf.start_run()
+    else:
+        perf.cancel_run()
+    return enabled
+
+
+def finish_measuring(label=""):
+    """ 今回の再実行の計測を終え，サイドバーに表示する（パネル自体の描画は計測に含めない） """
+    if perf.current_run() is None:
+        return
+    session = st.session_state.setdefault("perf_session", uuid.uuid4().hex[:12])
+    record = perf.finish_run({"session": session, "label": label, "cache": render_cache.stats(),
+                              "memory": session_memory(st.session_state.values())})
+    history = st.session_state.setdefault("perf_history", deque(maxlen=HISTORY_SIZE))
+    history.append(record)
+
+    with st.sidebar:
+        st.subheader("⏱️ 処理時間")
+        st.caption(f"直前の再実行 {record['seconds'] * 1000:.1f} ms（各段階の時間は内側の段階を含みます）")
+        stages = sorted(record["stages"], key=lambda s: s["seconds"], reverse=True)
+        st.dataframe([{"段階": s["stage"], "ms": round(s["seconds"] * 1000, 2), "回数": s["calls"],
+                       "行": s["rows"], "列": s["cols"]} for s in stages], hide_index=True)
+        cache = record["cache"]
+        st.caption(f"変換キャッシュ: ヒット {cache['hits']}・ミス {cache['misses']}"
+                   f"（ヒット率 {cache['hit_rate']:.0%}）・{cache['size']}/{cache['maxsize']} 件")
+        memory = record["memory"]
+        st.caption(f"このセッションの表 {memory['tables'] / 1024:.1f} KiB・編集履歴 {memory['history'] / 1024:.1f} KiB"
+                   f"（{memory['steps']} 件，上限を超えて捨てた操作 {memory['evicted']} 件）")
+        st.download_button(
+            label="📥 記録をダウンロード（JSON Lines）",
+            data=lambda: "".join(map(perf.to_json_line, list(history))),
+            file_name="perf.jsonl",
+            mime="application/x-ndjson",
+            on_click="ignore",
+            key="perf_download"
+        )
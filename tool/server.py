@@ -0,0 +1,333 @@
+"""
+表→LaTeX変換のローカルHTTP/JSONサービス．
+Notebook・ドキュメント生成・CIのボットなどから，Streamlit を使わずに変換できる．
+
+    python -m tool.server --port 8765 --workers 4
+
+エンドポイント:
+    GET  /health   状態とキャッシュの利用状況
+    POST /convert  {"text": "...", "caption": "...", ...} → {"latex": "..."}
+                   "stream": true のときはLaTeXコードを JSON にせずチャンク転送で返す
+                   （変換は一度に行うので，LaTeXコード全体はサーバーのメモリに載る．少しずつ変換はしない）
+    POST /batch    {"tables": [{"text": ...}, ...]} → {"results": [{"latex": ...} | {"error": ...}, ...]}
+                   "stream": true のときは変換が終わった順に1行1件のJSON（NDJSON）で返す
+
+変換オプションは python -m tool.cli と同じ（caption, label, position, caption_position,
+left_centered, longtable, use_header, complex, header_rows, escape, raw_columns, align_numbers,
+sig_digits, thousands, bold_max, bold_min, delimiter）．
+変換はワーカープロセスで行い，結果はサーバーの render_cache で全リクエストに共有する．
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+from .cache import render_cache, content_hash
+from .cli import render_text
+
+# 変換オプションとして受け付けるキー
+OPTION_KEYS = ("caption", "label", "position", "caption_position", "left_centered", "longtable",
+               "use_header", "complex", "header_rows", "escape", "raw_columns", "align_numbers", "sig_digits",
+               "thousands", "bold_max", "bold_min")
+# true / false で受け付けるオプション
+_BOOL_OPTIONS = ("left_centered", "longtable", "use_header", "complex", "escape", "thousands", "bold_max", "bold_min")
+# header_rows / sig_digits の範囲
+MAX_HEADER_ROWS = 100
+MAX_SIG_DIGITS = 15
+# リクエスト本文の上限
+MAX_BODY = 64 * 2**20
+# チャンク転送で1回に送る大きさ
+STREAM_CHUNK = 64 * 1024
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """ 指定したステータスコードとメッセージ（JSON）で応答させる例外 """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _option_error(key, value):
+    """ オプションの値が不正ならメッセージを返す """
+    if key in ("caption", "label"):
+        return None if isinstance(value, str) else "文字列で指定してください"
+    if key in _BOOL_OPTIONS:
+        return None if isinstance(value, bool) else "true / false で指定してください"
+    if key == "position":
+        ok = isinstance(value, str) and value and all(c in "htbpH!" for c in value)
+        return None if ok else 'h・t・b・p・H・! の組み合わせで指定してください'
+    if key == "caption_position":
+        return None if value in ("上", "下") else '"上" か "下" で指定してください'
+    if key == "header_rows":
+        ok = _is_int(value) and 1 <= value <= MAX_HEADER_ROWS
+        return None if ok else f"1〜{MAX_HEADER_ROWS} の整数で指定してください"
+    if key == "sig_digits":
+        ok = value is None or _is_int(value) and 1 <= value <= MAX_SIG_DIGITS
+        return None if ok else f"1〜{MAX_SIG_DIGITS} の整数か null で指定してください"
+    if key == "align_numbers":
+        return None if value in (None, "r", "S") else '"r"・"S"・null のいずれかで指定してください'
+    if key == "raw_columns":
+        ok = isinstance(value, list) and all(_is_int(i) and i >= 0 for i in value)
+        return None if ok else "0以上の列番号のリストで指定してください"
+    return None
+
+
+def parse_job(item):
+    """ リクエストの1表分を (text, options, delimiter) に変換する """
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+        raise HTTPError(400, '"text"（文字列）が必要です')
+    delimiter = item.get("delimiter")
+    if delimiter is not None and not (isinstance(delimiter, str) and len(delimiter) == 1):
+        raise HTTPError(400, '"delimiter" は1文字で指定してください')
+    options = {key: item[key] for key in OPTION_KEYS if key in item}
+    for key, value in options.items():
+        error = _option_error(key, value)
+        if error:
+            raise HTTPError(400, f'"{key}" は{error}')
+    return item["text"], options, delimiter
+
+
+class ConversionService:
+    """
+    変換の受付．同じ内容の変換はキャッシュから返し，
+    処理中の同じ変換には相乗りするので，ワーカーには1回しか送らない
+    """
+
+    def __init__(self, executor=None, cache=render_cache):
+        self.executor = executor
+        self.cache = cache
+        self._pending = {}
+
+    async def convert(self, text, options, delimiter=None):
+        key = ("tool.cli.render_text", content_hash(text, options, delimiter))
+        latex = self.cache.get(key)
+        if latex is not None:
+            return latex
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, render_text, text, options, delimiter)
+            self._pending[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+        # 接続が切れて待つ側が取り消されても，ほかの待ち手のために変換は続ける
+        return await asyncio.shield(future)
+
+    def _finish(self, key, future):
+        del self._pending[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    async def convert_item(self, item):
+        """ バッチの1件分．失敗してもほかの表に影響しないよう，結果の辞書で返す """
+        try:
+            return {"latex": await self.convert(*parse_job(item))}
+        except HTTPError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        """ 1つの接続を処理する．Keep-Alive で複数のリクエストを続けて受け付ける """
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self.dispatch(method, path, body, writer, keep_alive)
+                except HTTPError as e:
+                    await send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except Exception as e:
+                    await send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body, writer, keep_alive=True):
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "GET で呼び出してください")
+            await send_json(writer, 200, {"status": "ok", "cache": self.cache.stats()}, keep_alive)
+            return
+        if path not in ("/convert", "/batch"):
+            raise HTTPError(404, f"{path} はありません")
+        if method != "POST":
+            raise HTTPError(405, "POST で呼び出してください")
+
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"JSONとして読み込めません: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "JSONオブジェクトを送ってください")
+        stream = bool(payload.get("stream"))
+
+        if path == "/convert":
+            latex = await self.convert(*parse_job(payload))
+            if stream:
+                # 変換済みのコード全体を STREAM_CHUNK ずつ送る（JSON のエスケープと，送信バッファへの丸ごとのコピーを避ける）
+                await start_chunked(writer, "text/x-tex; charset=utf-8", keep_alive)
+                data = latex.encode("utf-8")
+                for offset in range(0, len(data), STREAM_CHUNK):
+                    await send_chunk(writer, data[offset:offset + STREAM_CHUNK])
+                await end_chunked(writer)
+            else:
+                await send_json(writer, 200, {"latex": latex}, keep_alive)
+            return
+
+        tables = payload.get("tables")
+        if not isinstance(tables, list):
+            raise HTTPError(400, '"tables"（リスト）が必要です')
+        if stream:
+            # 終わった順に返す．どの表の結果かは "index" で分かる
+            await start_chunked(writer, "application/x-ndjson; charset=utf-8", keep_alive)
+
+            async def indexed(i, item):
+                return i, await self.convert_item(item)
+
+            for next_done in asyncio.as_completed([indexed(i, item) for i, item in enumerate(tables)]):
+                i, result = await next_done
+                line = json.dumps({"index": i, **result}, ensure_ascii=False) + "\n"
+                await send_chunk(writer, line.encode("utf-8"))
+            await end_chunked(writer)
+        else:
+            results = await asyncio.gather(*(self.convert_item(item) for item in tables))
+            await send_json(writer, 200, {"results": results}, keep_alive)
+
+
+async def read_request(reader):
+    """ HTTP/1.1 のリクエストを1つ読む．接続が閉じられていれば None """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "リクエスト行が不正です")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Content-Length が不正です")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"リクエストが大きすぎます（上限 {MAX_BODY // 2**20} MiB）")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+def _status_line(status, content_type, keep_alive):
+    connection = "keep-alive" if keep_alive else "close"
+    return (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nConnection: {connection}\r\n")
+
+
+async def send_json(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = _status_line(status, "application/json; charset=utf-8", keep_alive)
+    writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+
+
+async def start_chunked(writer, content_type, keep_alive=True):
+    head = _status_line(200, content_type, keep_alive)
+    writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+
+
+async def send_chunk(writer, data):
+    if data:
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        # 受け手が読み終わるのを待ってから次を送る（送信バッファに出力を溜め込まない）
+        await writer.drain()
+
+
+async def end_chunked(writer):
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def make_executor(workers):
+    """ workers=0 のときはサーバーのプロセス内のスレッドで変換する """
+    if workers == 0:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+async def serve(host="127.0.0.1", port=8765, workers=None):
+    executor = make_executor(workers)
+    service = ConversionService(executor)
+    server = await asyncio.start_server(service.handle, host, port)
+    port = server.sockets[0].getsockname()[1]
+    # load_test.py はこの行から実際のポート番号を読み取る
+    print(f"listening on http://{host}:{port}", file=sys.stderr, flush=True)
+    # SIGTERM（kill・systemd・subprocess の terminate()）でも Ctrl+C と同じく止め，ワーカーを終了させる．
+    # 既定の動作で親だけが終了すると，ワーカーが孤児として残り続ける
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, server.close)
+        except (NotImplementedError, RuntimeError):
+            # Windows のイベントループはシグナルハンドラに対応していない
+            pass
+    try:
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        # server.close() で serve_forever が取り消された
+        pass
+    finally:
+        server.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tool.server", description="表→LaTeX変換のHTTP/JSONサービスを起動します．")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=8765, help="待ち受けるポート（0 なら空いているポート）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="変換を行うワーカープロセス数（0 ならサーバーのプロセス内で変換）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
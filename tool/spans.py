@@ -0,0 +1,92 @@
+"""
+ヘッダーのセル結合（rowspan / colspan）を検出するエンジン．
+同じ文字が隣り合うセルを結合した「結合プラン」をヘッダーごとに一度だけ計算し，
+HTMLプレビューとLaTeX出力の両方がこのプランから描画する．
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class Span(NamedTuple):
+    """ 結合プランの1要素．covered=True は上の行から縦に結合されて隠れる部分 """
+    row: int
+    col: int
+    rowspan: int
+    colspan: int
+    text: str
+    covered: bool = False
+
+
+def header_key(header):
+    """
+    ヘッダー（DataFrame・行のリスト・table.Table）をキャッシュのキーにできる形に変換する．
+    None（data_editorで消去されたセル）は空文字として扱う
+    """
+    rows = header.values.tolist() if hasattr(header, "values") else list(header)
+    width = max((len(row) for row in rows), default=0)
+    return tuple(tuple("" if c is None else str(c) for c in row) + ("",) * (width - len(row)) for row in rows)
+
+
+def merge_plan(header):
+    """ ヘッダーの結合プランを返す．同じ内容のヘッダーは再計算しない """
+    return _merge_plan(header_key(header))
+
+
+@lru_cache(maxsize=256)
+def _merge_plan(key):
+    """
+    行ごとのランレングス（横方向の連続）を求め，
+    真下の行に同じ範囲・同じ文字のランがあれば縦方向にも結合する．
+    戻り値は行ごとの Span のタプル
+    """
+    n_rows = len(key)
+    n_cols = len(key[0]) if n_rows else 0
+    if n_cols == 0:
+        return tuple(() for _ in range(n_rows))
+
+    # numpy は起動を遅くするので，実際に計算するときに読み込む
+    import numpy as np
+
+    grid = np.array(key, dtype=str).reshape(n_rows, n_cols)
+    # starts[r, c]: (r, c) から新しいランが始まるか
+    starts = np.ones((n_rows, n_cols), dtype=bool)
+    starts[:, 1:] = grid[:, 1:] != grid[:, :-1]
+    # 右端の外側も境界として扱う
+    bounds = np.ones((n_rows, n_cols + 1), dtype=bool)
+    bounds[:, :n_cols] = starts
+    # run_id[r, c]: 行内で何番目のランに属するか
+    run_id = np.cumsum(starts, axis=1)
+    same_below = np.zeros((n_rows, n_cols), dtype=bool)
+    if n_rows > 1:
+        same_below[:-1] = grid[:-1] == grid[1:]
+
+    def continues(r, s, e):
+        """ 行 r のラン [s, e) が，行 r+1 に同じ範囲・同じ文字で続いているか """
+        return (r + 1 < n_rows and same_below[r, s] and starts[r + 1, s]
+                and bounds[r + 1, e] and run_id[r + 1, e - 1] == run_id[r + 1, s])
+
+    plan = []
+    covered = {}
+    for r in range(n_rows):
+        col_starts = np.flatnonzero(starts[r]).tolist()
+        col_ends = col_starts[1:] + [n_cols]
+        row_plan = []
+        for s, e in zip(col_starts, col_ends):
+            anchor = covered.get((r, s))
+            if anchor is not None:
+                row_plan.append(Span(r, s, anchor.rowspan, e - s, anchor.text, covered=True))
+                continue
+            rowspan = 1
+            while continues(r + rowspan - 1, s, e):
+                rowspan += 1
+            span = Span(r, s, rowspan, e - s, key[r][s])
+            for below in range(r + 1, r + rowspan):
+                covered[(below, s)] = span
+            row_plan.append(span)
+        plan.append(tuple(row_plan))
+    return tuple(plan)
+
+
+def cache_info():
+    """ 結合プランのキャッシュの利用状況 """
+    return _merge_plan.cache_info()
@@ -0,0 +1,246 @@
+"""
+数百MBの TSV/CSV をメモリに読み込まずにLaTeXへ変換するストリーミング変換．
+ファイルを mmap して，1回目の走査で列数（列数の足りない行をそろえる幅）などを調べ，
+2回目の走査で一定の大きさのブロックごとに行を切り出してLaTeXを書き出す．
+DataFrame も全セルのリストも作らないので，ピークメモリはブロックの大きさで決まる．
+
+出力は parse_tab_separated_text と dataframe_to_latex を通した場合と同じ
+（テキスト全体の前後の空白の除去・セルの strip・列数の足りない行の補完を含む）．
+"""
+import csv
+import io
+import mmap
+import os
+import re
+from itertools import chain
+
+from .utils import (detect_delimiter, escape_row, escape_table, latex_frame, latex_row,
+                    split_cells, _ASCII_SPACES, _UNICODE_SPACES)
+from .table import Table
+
+# 2回目の走査で1度に処理する大きさ（バイト）
+CHUNK_SIZE = 2**20
+# 区切り文字の判定や前後の空白の除去で読む大きさ
+_PROBE_SIZE = 64 * 1024
+# ストリーミングで変換できないオプション（列全体を見る必要があるもの）
+_WHOLE_TABLE_OPTIONS = ("complex", "align_numbers", "sig_digits", "thousands", "bold_max", "bold_min")
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+class MarkdownTableError(ValueError):
+    """ 自動判別の結果がMarkdown表だった（ストリーミングでは変換できないので，呼び出し側で通常の変換に切り替える） """
+
+
+class FileLayout:
+    """ 1回目の走査の結果 """
+
+    __slots__ = ("start", "end", "delimiter", "encoding", "quoted", "strip", "n_cols", "n_lines")
+
+    def __init__(self, start, end, delimiter, encoding, quoted, strip, n_cols, n_lines):
+        self.start = start
+        self.end = end
+        self.delimiter = delimiter
+        self.encoding = encoding
+        # 引用符・CR を含むときは csv モジュールで読む
+        self.quoted = quoted
+        # セルの前後の空白を取り除くか（utils._needs_strip と同じ判定）
+        self.strip = strip
+        self.n_cols = n_cols
+        self.n_lines = n_lines
+
+
+def can_stream(options, delimiter=None):
+    """ オプションがストリーミング変換に対応しているか（Markdown表と列全体の統計が要る書式は不可） """
+    return delimiter != "|" and not any(options.get(key) for key in _WHOLE_TABLE_OPTIONS)
+
+
+def open_source(source):
+    """
+    ファイルのパスなら mmap，bytes ならそのまま返す．(バッファ, 閉じる関数) の組．
+    空のファイルは mmap できないので b"" にする
+    """
+    if isinstance(source, memoryview):
+        source = bytes(source)
+    if isinstance(source, (bytes, bytearray)):
+        return source, lambda: None
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b"", lambda: None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, mm.close
+
+
+def _codec(buffer, encoding):
+    """ (先頭のBOMを除いた開始位置, デコードに使う文字コード) """
+    if encoding.lower().replace("_", "-") == "utf-8-sig":
+        return (3 if buffer[:3] == b"\xef\xbb\xbf" else 0), "utf-8"
+    return 0, encoding
+
+
+def _strip_bounds(buffer, start, end, encoding):
+    """ text.strip() と同じく，前後の空白を除いた範囲（バイト位置）を返す """
+    while start < end:
+        head = bytes(buffer[start:start + _PROBE_SIZE]).decode(encoding, errors="ignore")
+        stripped = head.lstrip()
+        start += len(head[:len(head) - len(stripped)].encode(encoding))
+        if stripped:
+            break
+    while start < end:
+        tail = bytes(buffer[max(start, end - _PROBE_SIZE):end]).decode(encoding, errors="ignore")
+        stripped = tail.rstrip()
+        end -= len(tail[len(stripped):].encode(encoding))
+        if stripped:
+            break
+    return start, end
+
+
+def _strip_pattern(delimiter, encoding, ascii_only):
+    """ utils._needs_strip をバイト列に対する1つの正規表現にしたもの（mmap のまま1回で検索できる） """
+    patterns = [f" {delimiter}", f"{delimiter} ", " \n", "\n "]
+    spaces = _ASCII_SPACES if ascii_only else _ASCII_SPACES + _UNICODE_SPACES
+    patterns += [c for c in spaces if c != delimiter]
+    encoded = [p.encode(encoding, errors="ignore") for p in patterns]
+    return re.compile(b"|".join(re.escape(e) for e in encoded if e))
+
+
+def _blocks(buffer, start, end, chunk_size):
+    """
+    [start, end) を改行の直後で区切ったブロック（bytes）を順に返す．
+    最後以外のブロックは改行で終わる（end は空白を除いた位置なので，最後のブロックは改行で終わらない）
+    """
+    while start < end:
+        stop = min(start + chunk_size, end)
+        if stop < end:
+            newline = buffer.rfind(b"\n", start, stop)
+            if newline < 0:
+                # 1行がブロックより長い場合は，その行の終わりまで読む
+                newline = buffer.find(b"\n", stop, end)
+            stop = end if newline < 0 else newline + 1
+        yield buffer[start:stop]
+        start = stop
+
+
+def _lines_text(block, encoding):
+    """ ブロックをデコードし，末尾の改行を除く（split("\\n") で行に分けられるようにする） """
+    return block[:-1].decode(encoding) if block.endswith(b"\n") else block.decode(encoding)
+
+
+def _csv_lines(buffer, layout, chunk_size):
+    """ csv.reader に渡す行．ブロックごとにデコードし，"\\n" だけで行に分ける（parse_rows と同じ） """
+    for block in _blocks(buffer, layout.start, layout.end, chunk_size):
+        yield from io.StringIO(block.decode(layout.encoding))
+
+
+def scan(buffer, delimiter=None, encoding="utf-8-sig", chunk_size=CHUNK_SIZE):
+    """ 1回目の走査．区切り文字・前後の空白を除いた範囲・列数・行数などを調べて FileLayout を返す """
+    head, encoding = _codec(buffer, encoding)
+    start, end = _strip_bounds(buffer, head, len(buffer), encoding)
+    if delimiter is None:
+        # 区切り文字は空白を除く前の先頭から推定する（左上の空のセルのタブを落とさない．parse_rows と同じ）
+        sample = bytes(buffer[head:head + _PROBE_SIZE]).decode(encoding, errors="ignore")
+        delimiter = detect_delimiter(sample) if sample else "\t"
+    if start >= end:
+        return FileLayout(start, end, delimiter, encoding, False, False, 0, 0)
+
+    quoted = buffer.find(b'"', start, end) >= 0 or buffer.find(b"\r", start, end) >= 0
+    ascii_only = _NON_ASCII.search(buffer, start, end) is None
+    strip = _strip_pattern(delimiter, encoding, ascii_only).search(buffer, start, end) is not None
+    layout = FileLayout(start, end, delimiter, encoding, quoted, strip, 0, 0)
+
+    n_cols = n_lines = 0
+    if quoted:
+        for row in csv.reader(_csv_lines(buffer, layout, chunk_size), delimiter=delimiter):
+            n_lines += 1
+            n_cols = max(n_cols, len(row))
+    else:
+        separator = delimiter.encode(encoding)
+        for block in _blocks(buffer, start, end, chunk_size):
+            lines = (block[:-1] if block.endswith(b"\n") else block).split(b"\n")
+            n_lines += len(lines)
+            n_cols = max(n_cols, max(line.count(separator) for line in lines) + 1)
+    layout.n_cols = n_cols
+    layout.n_lines = n_lines
+    return layout
+
+
+def iter_tables(buffer, layout, chunk_size=CHUNK_SIZE):
+    """ 2回目の走査．ブロックごとの行を Table（列名なし，n_cols 列にそろえたもの）として返す """
+    width = layout.n_cols
+    if layout.quoted:
+        rows = csv.reader(_csv_lines(buffer, layout, chunk_size), delimiter=layout.delimiter)
+        while True:
+            batch = [row for _, row in zip(range(max(1, chunk_size // 256)), rows)]
+            if not batch:
+                return
+            if layout.strip:
+                batch = [list(map(str.strip, row)) for row in batch]
+            cells = []
+            for row in batch:
+                cells.extend(row)
+                if len(row) < width:
+                    cells.extend([""] * (width - len(row)))
+            yield Table(cells, len(batch), width)
+        return
+
+    for block in _blocks(buffer, layout.start, layout.end, chunk_size):
+        cells, _ = split_cells(_lines_text(block, layout.encoding), layout.delimiter, width)
+        if layout.strip:
+            cells = list(map(str.strip, cells))
+        yield Table(cells, len(cells) // width, width)
+
+
+def iter_file_latex(source, options=None, delimiter=None, encoding="utf-8-sig", chunk_size=CHUNK_SIZE, layout=None):
+    """
+    ファイル（パスか bytes）を python -m tool.cli と同じオプションでLaTeXにし，1行ずつ返すジェネレータ．
+    出力は dataframe_to_latex(parse_table(...)) と同じ．列全体の統計が要るオプションには対応しない．
+    同じ bytes に対して scan 済みなら layout を渡すと1回目の走査を省ける
+    """
+    options = options or {}
+    if not can_stream(options, delimiter):
+        raise ValueError("セル結合付きの表・数値の書式・Markdown表はストリーミング変換できません")
+    buffer, close = open_source(source)
+    try:
+        if layout is None:
+            layout = scan(buffer, delimiter, encoding, chunk_size)
+        if layout.delimiter == "|":
+            raise MarkdownTableError("Markdown表はストリーミング変換できません")
+        use_header = options.get("use_header", True)
+        if layout.n_lines - (1 if use_header else 0) <= 0:
+            return
+
+        tables = iter_tables(buffer, layout, chunk_size)
+        escape = options.get("escape", True)
+        raw = frozenset(options.get("raw_columns", ()))
+        if use_header:
+            first = next(tables)
+            columns = first.row(0)
+            tables = chain([first.slice(1)], tables)
+        else:
+            # parse_tab_separated_text と同じく，列名は 0, 1, 2, ...
+            columns = [str(i) for i in range(layout.n_cols)]
+        if escape:
+            columns = escape_row(columns, raw)
+
+        head, indent, foot = latex_frame(columns, caption=options.get("caption", ""), label=options.get("label", ""),
+                                         position=options.get("position", "h"),
+                                         caption_position=options.get("caption_position", "上"),
+                                         left_centered=options.get("left_centered", False),
+                                         longtable=options.get("longtable", False))
+        yield from head
+        for table in tables:
+            if escape:
+                table = escape_table(table, raw)
+            for row in table.rows():
+                yield latex_row(row, indent)
+        yield from foot
+    finally:
+        close()
+
+
+def write_file_latex(source, fp, options=None, delimiter=None, encoding="utf-8-sig", chunk_size=CHUNK_SIZE,
+                     layout=None):
+    """ iter_file_latex の出力をファイルオブジェクトへ書き出す．書き込んだ文字数を返す """
+    written = 0
+    for chunk in iter_file_latex(source, options, delimiter, encoding, chunk_size, layout):
+        written += fp.write(chunk)
+    return written
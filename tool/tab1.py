@@ -1,6 +1,16 @@
+import io
+import os
+from itertools import islice
+
 import streamlit as st
 import pandas as pd
-from .utils import parse_tab_separated_text, dataframe_to_latex
+from .cache import parse_tab_separated_text, dataframe_to_latex
+from .downloads import render_downloads
+from .notion import TOKEN_ENV, NotionClient, NotionError, import_notion, to_tsv
+from .stream import MarkdownTableError, iter_file_latex, scan, write_file_latex
+
+# アップロードしたファイルの変換結果のうち画面に表示する行数
+UPLOAD_PREVIEW_LINES = 40
 
 def render_tab1():
     st.subheader("📋 Notionなどから表を貼り付け")
@@ -12,11 +22,16 @@ def render_tab1():
     with col_opt2:
         use_index = st.checkbox("最初の列を行名として扱う", value=True, key="use_index_checkbox")
 
+    # Notion のデータベース・ページから直接読み込む（読み込んだ表は下の入力欄に入る）
+    with st.expander("🔗 Notionから読み込む"):
+        render_notion_import()
+
     tab_input = st.text_area(
         "タブ区切りの表を貼り付けてください",
+        key="pasted_text",
         height=150,
         placeholder="\t課題2成功\t課題2失敗\t合計\t\n課題1成功\t7247\t166\t7424\t\n課題1失敗\t74\t4102\t4176\t\n合計\t7321\t4279\t\t",
-        help="NotionやExcelから表をコピーして貼り付けてください．タブ区切りで自動認識します．"
+        help="NotionやExcelから表をコピーして貼り付けてください．タブ・カンマ・セミコロン区切りやMarkdown表を自動認識します．"
     )
 
     # デフォルト表示用のサンプルデータ
@@ -40,46 +55,47 @@ def render_tab1():
             with col1:
                 caption = st.text_input("キャプション", placeholder="表のタイトルを入力", key="pasted_caption")
                 label = st.text_input("ラベル", placeholder="tab:example", key="pasted_label")
+                escape = st.checkbox("LaTeXの特殊文字（& % $ # _ など）をエスケープ", value=True, key="escape_pasted")
+                raw_columns = []
+                if escape:
+                    raw_columns = st.multiselect("エスケープしない列（数式やLaTeXコードが入った列）",
+                                                 options=list(range(len(parsed_df.columns))),
+                                                 format_func=lambda i: str(parsed_df.columns[i]), key="raw_columns_pasted")
             with col2:
                 position_options = {"h": "ここ(here)", "t": "上(top)", "b": "下(bottom)", "p": "別ページ(page)"}
                 position = st.selectbox("位置", options=list(position_options.keys()),
                                       format_func=lambda x: position_options[x], key="pasted_position")
                 caption_position = st.radio("キャプションの位置", options=["上", "下"], index=0, key="caption_position_pasted")
                 left_centered = st.checkbox("左端も中央寄せにする", value=False, key="left_centered_pasted")
+                longtable = st.checkbox("longtableで出力（複数ページに自動分割）", value=False, key="longtable_pasted")
+
+            # 数値の列の書式（数値かどうかは列ごとに自動で判定する）
+            with st.expander("🔢 数値の書式"):
+                col3, col4 = st.columns(2)
+                with col3:
+                    align_options = {"": "そのまま", "r": "右揃え（r）", "S": "小数点揃え（siunitx の S 列）"}
+                    align_numbers = st.selectbox("数値の列の揃え方", options=list(align_options.keys()),
+                                                 format_func=lambda x: align_options[x], key="align_numbers_pasted")
+                    use_sig_digits = st.checkbox("有効数字をそろえる", value=False, key="use_sig_digits_pasted")
+                    sig_digits = st.number_input("有効数字の桁数", min_value=1, max_value=15, value=3, step=1,
+                                                 disabled=not use_sig_digits, key="sig_digits_pasted")
+                with col4:
+                    thousands = st.checkbox("3桁区切りを入れる", value=False, key="thousands_pasted")
+                    bold_max = st.checkbox("列の最大値を太字にする", value=False, key="bold_max_pasted")
+                    bold_min = st.checkbox("列の最小値を太字にする", value=False, key="bold_min_pasted")
+                if align_numbers == "S":
+                    st.caption("S 列を使うにはプリアンブルに \\usepackage{siunitx} が必要です．")
 
             # LaTeXコード生成
-            latex_code = dataframe_to_latex(parsed_df, caption=caption, label=label, position=position, caption_position=caption_position, left_centered=left_centered)
+            latex_code = dataframe_to_latex(parsed_df, caption=caption, label=label, position=position, caption_position=caption_position, left_centered=left_centered, longtable=longtable, escape=escape, raw_columns=raw_columns,
+                                            align_numbers=align_numbers or None,
+                                            sig_digits=sig_digits if use_sig_digits else None, thousands=thousands,
+                                            bold_max=bold_max, bold_min=bold_min)
             st.subheader("📄 LaTeXコード")
             st.code(latex_code, language="latex")
 
-            # ダウンロードボタン
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                csv_data = parsed_df.to_csv(index=False)
-                st.download_button(
-                    label="📊 CSVダウンロード",
-                    data=csv_data,
-                    file_name="pasted_table.csv",
-                    mime="text/csv",
-                    key="pasted_csv_download"
-                )
-            with col2:
-                st.download_button(
-                    label="📄 LaTeXファイルダウンロード",
-                    data=latex_code,
-                    file_name="pasted_table.tex",
-                    mime="text/plain",
-                    key="pasted_latex_download"
-                )
-            with col3:
-                html_table = parsed_df.to_html(index=False, border=1, justify='center')
-                st.download_button(
-                    label="🌐 HTMLダウンロード",
-                    data=f"<html><body>{html_table}</body></html>",
-                    file_name="pasted_table.html",
-                    mime="text/html",
-                    key="pasted_html_download"
-                )
+            # ダウンロードボタン（ファイルの中身はボタンが押されたときに作る）
+            render_downloads(parsed_df, latex_code, name="pasted_table", key_prefix="pasted_")
         else:
             if tab_input.strip():
                 st.warning("⚠️ 有効な表データを検出できませんでした．")
@@ -88,4 +104,109 @@ def render_tab1():
         if tab_input.strip():
             st.error(f"❌ 表の解析に失敗しました: {e}")
         else:
-            st.error("❌ サンプルデータの解析に失敗しました．")
\ No newline at end of file
+            st.error("❌ サンプルデータの解析に失敗しました．")
+
+    # 大きなファイルは表（DataFrame）を作らずにストリーミングで変換する
+    with st.expander("📁 ファイルから変換（大きなTSV/CSV向け）"):
+        render_file_upload()
+
+
+def _use_notion_table():
+    # 選んだ表をタブ区切りにしたものを貼り付け欄に入れる
+    tables = st.session_state.notion_tables
+    st.session_state.pasted_text = tables[st.session_state.get("notion_table_index", 0)][1]
+
+
+def _import_notion():
+    target = st.session_state.get("notion_target", "").strip()
+    if not target:
+        st.session_state.notion_message = ("warning", "⚠️ データベースかページのURLを入力してください．")
+        return
+    try:
+        with NotionClient(st.session_state.get("notion_token") or None) as client:
+            tables, stats = import_notion(client, target)
+    except (ImportError, ValueError, NotionError, OSError) as e:
+        # requests の例外（接続エラーなど）は OSError の派生
+        st.session_state.notion_message = ("error", f"❌ Notionから読み込めませんでした: {e}")
+        return
+    if not tables:
+        st.session_state.notion_message = ("warning", "⚠️ 表が見つかりませんでした（ページ直下の表だけを読み込みます）．")
+        return
+    st.session_state.notion_tables = [(title, to_tsv(table)) for title, table in tables]
+    st.session_state.notion_table_index = 0
+    _use_notion_table()
+    rows = sum(table.n_rows for _, table in tables)
+    st.session_state.notion_message = (
+        "success", f"✅ {tables[0][0]}: {rows}行を読み込みました（取得 {stats['fetched']}/{stats['pages']}・API {stats['requests']} 回）")
+
+
+def render_notion_import():
+    st.caption("インテグレーションと共有したデータベースかページのURLを指定します．2回目からは編集された行だけを取得します．")
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.text_input("データベースかページのURL / ID", key="notion_target")
+    with col2:
+        st.text_input("トークン", type="password", key="notion_token", help=f"省略時は環境変数 {TOKEN_ENV} を使います")
+    st.button("📥 読み込む", key="notion_import_btn", on_click=_import_notion)
+
+    tables = st.session_state.get("notion_tables")
+    if tables and len(tables) > 1:
+        st.selectbox("貼り付け欄に入れる表", options=list(range(len(tables))), format_func=lambda i: tables[i][0],
+                     key="notion_table_index", on_change=_use_notion_table)
+    message = st.session_state.get("notion_message")
+    if message:
+        kind, text = message
+        getattr(st, kind)(text)
+
+
+def render_file_upload():
+    uploaded = st.file_uploader("TSV / CSV / TXT ファイル（UTF-8）", type=["tsv", "csv", "txt"], key="upload_table")
+    if uploaded is None:
+        st.caption("ファイル全体を表にせず，少しずつLaTeXに変換します．"
+                   "ただしアップロードしたファイルとダウンロードする .tex はブラウザとの受け渡しのためメモリに載ります．"
+                   "数百MBのファイルはコマンドライン（python -m tool.cli）で変換してください（こちらはメモリを抑えて変換します）．")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        caption = st.text_input("キャプション", placeholder="表のタイトルを入力", key="upload_caption")
+        label = st.text_input("ラベル", placeholder="tab:example", key="upload_label")
+    with col2:
+        use_header = st.checkbox("最初の行をヘッダーとして扱う", value=True, key="upload_use_header")
+        escape = st.checkbox("LaTeXの特殊文字（& % $ # _ など）をエスケープ", value=True, key="upload_escape")
+        longtable = st.checkbox("longtableで出力（複数ページに自動分割）", value=True, key="upload_longtable")
+    options = {"caption": caption, "label": label, "use_header": use_header, "escape": escape, "longtable": longtable}
+
+    delimiter = "," if uploaded.name.lower().endswith(".csv") else None
+    data = uploaded.getvalue()
+    try:
+        layout = scan(data, delimiter)
+        preview = list(islice(iter_file_latex(data, options, delimiter, layout=layout), UPLOAD_PREVIEW_LINES))
+    except UnicodeDecodeError:
+        st.error("❌ UTF-8 のファイルを指定してください．")
+        return
+    except MarkdownTableError:
+        st.warning("⚠️ Markdown表は上の入力欄に貼り付けてください．")
+        return
+
+    st.success(f"✅ {uploaded.name}: {layout.n_lines}行 × {layout.n_cols}列（ヘッダー行を含む）")
+    preview_code = "".join(preview)
+    if len(preview) == UPLOAD_PREVIEW_LINES:
+        preview_code += f"\n% ...（先頭の{UPLOAD_PREVIEW_LINES}行だけを表示しています．全体はダウンロードしてください）"
+    st.code(preview_code, language="latex")
+
+    def latex_file():
+        # Streamlit はダウンロードする中身をバイト列でメモリに持つので，文字列を経由せず直接 UTF-8 で書く
+        buffer = io.BytesIO()
+        with io.TextIOWrapper(buffer, encoding="utf-8", newline="\n", write_through=True) as f:
+            write_file_latex(data, f, options, delimiter, layout=layout)
+            return buffer.getvalue()
+
+    st.download_button(
+        label="📄 LaTeXファイルダウンロード",
+        data=latex_file,
+        file_name=os.path.splitext(uploaded.name)[0] + ".tex",
+        mime="text/plain",
+        on_click="ignore",
+        key="upload_latex_download"
+    )
@@ -1,6 +1,19 @@
 import streamlit as st
-import pandas as pd
-from .utils import dataframe_to_latex
+from . import perf
+from .downloads import render_downloads
+from .history import TableState, commit_editor
+from .incremental import RowRenderCache
+from .table import Table
+from .utils import latex_frame, latex_row, escape_row
+
+# 表の大きさの上限（LaTeXは編集された行だけを描き直すので，行数を増やしても重くならない）
+MAX_ROWS = 5000
+MAX_COLS = 50
+
+def _empty_state_table(rows, col_names):
+    """ 空の表．以前の dict から DataFrame を作る方法と同じく，同じ列名は最初の1つだけにする """
+    columns = list(dict.fromkeys(col_names))
+    return Table([""] * (rows * len(columns)), rows, len(columns), columns)
 
 def render_tab2():
     st.subheader("🎨 インタラクティブ表作成")
@@ -8,9 +21,9 @@ def render_tab2():
     # 表のサイズ設定
     col1, col2 = st.columns(2)
     with col1:
-        rows = st.number_input("行数", min_value=1, max_value=20, value=3, step=1, key="interactive_rows")
+        rows = st.number_input("行数", min_value=1, max_value=MAX_ROWS, value=3, step=1, key="interactive_rows")
     with col2:
-        cols = st.number_input("列数", min_value=1, max_value=10, value=3, step=1, key="interactive_cols")
+        cols = st.number_input("列数", min_value=1, max_value=MAX_COLS, value=3, step=1, key="interactive_cols")
 
     # 列名の設定
     st.subheader("📋 列名の設定")
@@ -39,32 +52,35 @@ def render_tab2():
             col_names.append(col_name)
             st.session_state[f'col_name_{i}'] = col_name
 
-    # 初期データの作成
-    if 'table_data' not in st.session_state or st.button("🔄 新しい表を作成"):
+    # 初期データの作成（新しい表の作成も元に戻せる）
+    if 'table_state' not in st.session_state:
+        st.session_state.table_state = TableState(_empty_state_table(rows, col_names))
+    state = st.session_state.table_state
+    history = state.history
+    c_new, c_undo, c_redo, c_history = st.columns([2, 1, 1, 2])
+    if c_new.button("🔄 新しい表を作成"):
         # 列名をリセット
-        for i in range(10):  # 最大10列まで
+        for i in range(MAX_COLS):
             if f'col_name_{i}' in st.session_state:
                 del st.session_state[f'col_name_{i}']
-        
-        # 空のDataFrameを作成
-        data = {}
-        for i in range(cols):
-            col_name = col_names[i] if i < len(col_names) else f"列{i+1}"
-            data[col_name] = [""] * (rows)
-        st.session_state.table_data = pd.DataFrame(data)
+        state.replace(_empty_state_table(rows, col_names))
+    c_undo.button("↩️ 元に戻す", key="undo_interactive", on_click=history.undo, disabled=not history.can_undo)
+    c_redo.button("↪️ やり直す", key="redo_interactive", on_click=history.redo, disabled=not history.can_redo)
+    c_history.caption(f"元に戻せる操作 {len(history)} 件・履歴 {history.nbytes / 1024:.1f} KiB")
 
-    # 表の編集
+    # 表の編集（編集は on_change で TableState に取り込む．エディタの key は版ごとに変わる）
     st.subheader("📝 表の編集")
-    edited_df = st.data_editor(
-        st.session_state.table_data,
-        num_rows="dynamic",
-        width="stretch",
-        key="table_editor"
-    )
-
-    # 編集されたデータをセッションステートに保存
-    #重複していたためコメントアウト
-    #st.session_state.table_data = edited_df
+    editor_key = state.editor_key("table_editor")
+    with perf.stage("data_editor", state.table):
+        st.data_editor(
+            state.to_frame(),
+            num_rows="dynamic",
+            width="stretch",
+            key=editor_key,
+            on_change=commit_editor,
+            args=(state, editor_key)
+        )
+    table = state.table
 
     # LaTeXコードの生成と表示
     st.subheader("📄 LaTeXコード")
@@ -74,56 +90,45 @@ def render_tab2():
     with col1:
         caption = st.text_input("キャプション", placeholder="表のタイトルを入力", key="interactive_caption")
         label = st.text_input("ラベル", placeholder="tab:example", key="interactive_label")
+        escape = st.checkbox("LaTeXの特殊文字（& % $ # _ など）をエスケープ", value=True, key="escape_interactive")
+        raw_columns = []
+        if escape:
+            raw_columns = st.multiselect("エスケープしない列（数式やLaTeXコードが入った列）",
+                                         options=list(range(table.n_cols)),
+                                         format_func=lambda i: str(table.columns[i]), key="raw_columns_interactive")
     with col2:
         position_options = {"h": "ここ(here)", "t": "上(top)", "b": "下(bottom)", "p": "別ページ(page)"}
         position = st.selectbox("位置", options=list(position_options.keys()),
                               format_func=lambda x: position_options[x], key="interactive_position")
         caption_position = st.radio("キャプションの位置", options=["上", "下"], index=0, key="caption_position_interactive")
         left_centered = st.checkbox("左端も中央寄せにする", value=False, key="left_centered_interactive")
-
-    # LaTeX用にダミー列を追加（関数を変えない場合の対応）
-    df_for_latex = edited_df.copy()
-    df_for_latex[""] = ""  # 右端に空列を追加
-    
-    latex_code = dataframe_to_latex(df_for_latex, caption=caption, label=label, position=position, caption_position=caption_position, left_centered=left_centered)
+        longtable = st.checkbox("longtableで出力（複数ページに自動分割）", value=False, key="longtable_interactive")
+
+    # 編集された行だけを描き直す（表全体のコピーや再生成をしない）
+    # エスケープの設定が変わったときは全行を描き直す
+    raw = frozenset(raw_columns)
+    if 'table_latex_rows' not in st.session_state or st.session_state.get('table_latex_rows_options') != (escape, raw):
+        # 右端に空列を追加した形で描画する（dataframe_to_latex のヘッダーの仕様に合わせるため）
+        if escape:
+            render_row = lambda row: latex_row(escape_row(row, raw) + [""], indent="")
+        else:
+            render_row = lambda row: latex_row(row + [""], indent="")
+        st.session_state.table_latex_rows = RowRenderCache(render_row)
+        st.session_state.table_latex_rows_options = (escape, raw)
+    with perf.stage("latex_rows", table):
+        body_lines = st.session_state.table_latex_rows.sync_state(state)
+
+    latex_code = ""
+    if body_lines:
+        columns = escape_row([str(col) for col in table.columns], raw) if escape else list(table.columns)
+        head, indent, foot = latex_frame(columns + [""], caption=caption, label=label, position=position, caption_position=caption_position, left_centered=left_centered, longtable=longtable)
+        latex_code = "".join(head) + indent.join([""] + body_lines) + "".join(foot)
 
 
     # LaTeXコードを表示
     st.code(latex_code, language="latex")
 
 
-    # エクスポート機能
+    # エクスポート機能（ファイルの中身はボタンが押されたときに作る）
     st.subheader("💾 エクスポート")
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        # CSVエクスポート
-        csv_data = edited_df.to_csv(index=False)
-        st.download_button(
-            label="📊 CSVダウンロード",
-            data=csv_data,
-            file_name="table.csv",
-            mime="text/csv",
-            key="csv_download"
-        )
-
-    with col2:
-        # HTMLエクスポート
-        html_table = edited_df.to_html(index=False, border=1, justify='center')
-        st.download_button(
-            label="🌐 HTMLダウンロード",
-            data=f"<html><body>{html_table}</body></html>",
-            file_name="table.html",
-            mime="text/html",
-            key="html_download"
-        )
-
-    with col3:
-        # LaTeXファイルダウンロード
-        st.download_button(
-            label="📄 LaTeXファイルダウンロード",
-            data=latex_code,
-            file_name="table.tex",
-            mime="text/plain",
-            key="latex_download"
-        )
\ No newline at end of file
+    render_downloads(table, latex_code, name="table")
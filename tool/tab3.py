@@ -1,6 +1,134 @@
 import streamlit as st
-import pandas as pd
-from .utils import generate_preview_html, generate_complex_latex
+from . import perf
+from .history import EditHistory, TableState, commit_editor
+from .html_table import parse_html_tables
+from .incremental import RowRenderCache
+from .table import Table
+from .utils import generate_preview_html, generate_complex_latex, complex_row_latex, escape_row
+
+# 表の大きさの上限（プレビューは1ページ分しか描画しないので，行数を増やしても重くならない）
+MAX_ROWS = 5000
+MAX_COLS = 50
+MAX_HEADER_ROWS = 10
+# プレビューの1ページの行数の選択肢
+PAGE_SIZES = (25, 50, 100, 200)
+
+# 「深海データセットの例」
+TEMPLATE_HEADER = [
+    ["観測コード", "水温 (C)", "水温 (C)", "塩分濃度", "塩分濃度", "深度"],
+    ["観測コード", "エリアA", "エリアB", "ゾーンX", "ゾーンY", "トレンチZ"],
+]
+TEMPLATE_BODY = [
+    ["データセット X01", "5.1", "1.3", "34.90", "35.15", "9870.5"],
+    ["解析セット S02", "22.8", "7.7", "33.05", "36.88", "1234.9"],
+]
+
+
+def _states():
+    """ ヘッダーとデータの TableState（元に戻す履歴を共有する）．無ければ行数・列数の入力欄の値で作る """
+    if "body_state_t3" not in st.session_state:
+        history = EditHistory()
+        cols = st.session_state.cols_t3
+        st.session_state.header_state_t3 = TableState.empty(st.session_state.h_rows_t3, cols, history=history)
+        st.session_state.body_state_t3 = TableState.empty(st.session_state.rows_t3, cols, history=history)
+    return st.session_state.header_state_t3, st.session_state.body_state_t3
+
+
+def _sync_size_inputs():
+    # 元に戻す・テンプレートの読み込みで変わった大きさを入力欄に反映する
+    header, body = _states()
+    st.session_state.rows_t3 = max(1, body.table.n_rows)
+    st.session_state.cols_t3 = max(1, body.table.n_cols)
+    st.session_state.h_rows_t3 = max(1, header.table.n_rows)
+
+
+def _resize():
+    """ 行数・列数・ヘッダー段数の変更．入力済みのセルは残す（減らした部分も元に戻せる） """
+    header, body = _states()
+    cols = st.session_state.cols_t3
+    with body.history.transaction():
+        header.resize(st.session_state.h_rows_t3, cols)
+        body.resize(st.session_state.rows_t3, cols)
+
+
+def _load_template():
+    header, body = _states()
+    with body.history.transaction():
+        header.replace(Table.from_rows(TEMPLATE_HEADER))
+        body.replace(Table.from_rows(TEMPLATE_BODY))
+    _sync_size_inputs()
+
+
+def _read_html(uploaded, text):
+    """ アップロードされた HTML か貼り付けられた HTML の表を読み込む（Excel の「Webページ」は Shift_JIS のことがある） """
+    if uploaded is None:
+        return parse_html_tables(text, max_rows=MAX_HEADER_ROWS + MAX_ROWS, max_cols=MAX_COLS)
+    data = uploaded.getvalue()
+    try:
+        return parse_html_tables(data, max_rows=MAX_HEADER_ROWS + MAX_ROWS, max_cols=MAX_COLS)
+    except UnicodeDecodeError:
+        return parse_html_tables(data, max_rows=MAX_HEADER_ROWS + MAX_ROWS, max_cols=MAX_COLS, encoding="cp932")
+
+
+def _load_html():
+    """ HTML の表の結合セルを展開して，ヘッダーとデータに入れる（1回の操作として元に戻せる） """
+    uploaded = st.session_state.get("html_file_t3")
+    text = st.session_state.get("html_t3", "")
+    if uploaded is None and not text.strip():
+        st.session_state.html_message_t3 = ("warning", "⚠️ HTMLを貼り付けるか，ファイルを指定してください．")
+        return
+    try:
+        tables = _read_html(uploaded, text)
+    except UnicodeDecodeError:
+        st.session_state.html_message_t3 = ("error", "❌ UTF-8 か Shift_JIS のファイルを指定してください．")
+        return
+    if not tables:
+        st.session_state.html_message_t3 = ("warning", "⚠️ 表（<table>）が見つかりませんでした．")
+        return
+
+    html_table = tables[0]
+    n_header = min(html_table.header_rows, MAX_HEADER_ROWS)
+    header_table = html_table.table.slice(0, n_header)
+    body_table = html_table.table.slice(n_header, n_header + MAX_ROWS)
+    truncated = html_table.truncated or html_table.table.n_rows - n_header > MAX_ROWS
+    if body_table.empty:
+        body_table = TableState.empty(1, html_table.table.n_cols).table
+    header, body = _states()
+    with body.history.transaction():
+        header.replace(header_table)
+        body.replace(body_table)
+    _sync_size_inputs()
+
+    message = f"✅ ヘッダー {header_table.n_rows} 段・データ {body_table.n_rows} 行 × {body_table.n_cols} 列を読み込みました"
+    if truncated:
+        message += f"（{MAX_ROWS} 行・{MAX_COLS} 列を超えた部分は読み込んでいません）"
+    if len(tables) > 1:
+        message += f"．{len(tables)} 個の表のうち最初の表です"
+    st.session_state.html_message_t3 = ("success", message)
+
+
+def render_html_import():
+    st.caption("Excel の「Webページとして保存」や Notion の「HTMLとしてエクスポート」のファイル，"
+               "クリップボードのHTML（Linux なら xclip -selection clipboard -t text/html -o）から，"
+               "結合セル（colspan / rowspan）を復元して読み込みます．ヘッダーの段数は自動で判定します．")
+    st.file_uploader("HTML ファイル", type=["html", "htm"], key="html_file_t3")
+    st.text_area("またはHTMLを貼り付け", height=120, key="html_t3", placeholder="<table>...</table>")
+    st.button("📥 HTMLの表を読み込む", key="load_html_btn_t3", on_click=_load_html)
+    message = st.session_state.get("html_message_t3")
+    if message:
+        kind, text = message
+        getattr(st, kind)(text)
+
+
+def _undo():
+    if _states()[1].history.undo():
+        _sync_size_inputs()
+
+
+def _redo():
+    if _states()[1].history.redo():
+        _sync_size_inputs()
+
 
 def render_tab3():
     st.subheader("🧩 リアルタイム・プレビュー付き表作成")
@@ -8,63 +136,72 @@ def render_tab3():
     **使い方：** 隣り合ったセルに「同じ文字」を入力すると、下のプレビュー画面で自動的に結合されます。
     """)
 
-    # テンプレートボタン
-    if st.button("深海データセットの例をロード", key="load_template_btn"):
-        st.session_state.header_data_tab3 = pd.DataFrame([
-            ["観測コード", "水温 (C)", "水温 (C)", "塩分濃度", "塩分濃度", "深度"],
-            ["観測コード", "エリアA", "エリアB", "ゾーンX", "ゾーンY", "トレンチZ"]
-        ])
-        st.session_state.body_data_tab3 = pd.DataFrame([
-            ["データセット X01", "5.1", "1.3", "34.90", "35.15", "9870.5"],
-            ["解析セット S02", "22.8", "7.7", "33.05", "36.88", "1234.9"]
-        ])
-        st.rerun()
-
-    # サイズ設定
+    st.session_state.setdefault("rows_t3", 2)
+    st.session_state.setdefault("cols_t3", 6)
+    st.session_state.setdefault("h_rows_t3", 2)
+    header_state, body_state = _states()
+    history = body_state.history
+
+    # テンプレートボタンと元に戻す・やり直す
+    c_template, c_undo, c_redo, c_history = st.columns([2, 1, 1, 2])
+    c_template.button("深海データセットの例をロード", key="load_template_btn", on_click=_load_template)
+    c_undo.button("↩️ 元に戻す", key="undo_t3", on_click=_undo, disabled=not history.can_undo)
+    c_redo.button("↪️ やり直す", key="redo_t3", on_click=_redo, disabled=not history.can_redo)
+    c_history.caption(f"元に戻せる操作 {len(history)} 件・履歴 {history.nbytes / 1024:.1f} KiB")
+
+    with st.expander("📋 HTMLの表から読み込む（セル結合を復元）", expanded=False):
+        render_html_import()
+
+    # サイズ設定（変更しても入力済みのセルは消えない）
     with st.expander("📏 行数・列数の変更", expanded=False):
         c1, c2, c3 = st.columns(3)
-        rows_t3 = c1.number_input("データ行数", 1, 20, 2, key="rows_t3")
-        cols_t3 = c2.number_input("列数", 1, 10, 6, key="cols_t3")
-        h_rows_t3 = c3.number_input("ヘッダー段数", 1, 3, 2, key="h_rows_t3")
-
-    # データ初期化
-    if 'header_data_tab3' not in st.session_state:
-        st.session_state.header_data_tab3 = pd.DataFrame("", index=range(h_rows_t3), columns=range(cols_t3))
-    if 'body_data_tab3' not in st.session_state:
-        st.session_state.body_data_tab3 = pd.DataFrame("", index=range(rows_t3), columns=range(cols_t3))
-
-    # リサイズ対応
-    if st.session_state.header_data_tab3.shape != (h_rows_t3, cols_t3):
-        st.session_state.header_data_tab3 = pd.DataFrame("", index=range(h_rows_t3), columns=range(cols_t3))
-    if st.session_state.body_data_tab3.shape != (rows_t3, cols_t3):
-        st.session_state.body_data_tab3 = pd.DataFrame("", index=range(rows_t3), columns=range(cols_t3))
+        c1.number_input("データ行数", 1, MAX_ROWS, key="rows_t3", on_change=_resize)
+        cols_t3 = c2.number_input("列数", 1, MAX_COLS, key="cols_t3", on_change=_resize)
+        c3.number_input("ヘッダー段数", 1, MAX_HEADER_ROWS, key="h_rows_t3", on_change=_resize)
 
     col_editor, col_preview = st.columns([1, 1])
 
     with col_editor:
+        # 編集は on_change で TableState に取り込む（エディタの key は版ごとに変わる）
         st.write("###### 1. ヘッダー編集 (同じ文字で結合)")
-        edited_header = st.data_editor(
-            st.session_state.header_data_tab3,
-            key="header_editor_t3",
-            width="stretch"  # リクエスト通り変更
-        )
-        #重複しているのでコメントアウト：連続の編集ができない
-        #st.session_state.header_data_tab3 = edited_header
+        header_key = header_state.editor_key("header_editor_t3")
+        with perf.stage("data_editor", header_state.table):
+            st.data_editor(
+                header_state.to_frame(),
+                key=header_key,
+                on_change=commit_editor,
+                args=(header_state, header_key),
+                width="stretch"  # リクエスト通り変更
+            )
 
         st.write("###### 2. データ入力")
-        edited_body = st.data_editor(
-            st.session_state.body_data_tab3,
-            key="body_editor_t3",
-            width="stretch"  # リクエスト通り変更
-        )
-        #上記と同じ理由でコメントアウト
-        #st.session_state.body_data_tab3 = edited_body
+        body_key = body_state.editor_key("body_editor_t3")
+        with perf.stage("data_editor", body_state.table):
+            st.data_editor(
+                body_state.to_frame(),
+                key=body_key,
+                on_change=commit_editor,
+                args=(body_state, body_key),
+                width="stretch"  # リクエスト通り変更
+            )
 
     with col_preview:
         st.write("###### 👀 仕上がりプレビュー")
-        # ここでHTMLプレビューを表示
-        preview_html = generate_preview_html(edited_header, edited_body)
+        # 表示中のページの行だけをHTMLにする
+        n_body = body_state.table.n_rows
+        page_size = st.selectbox("1ページの行数", PAGE_SIZES, index=0, key="preview_page_size_t3")
+        n_pages = max(1, -(-n_body // page_size))
+        page = 1
+        if n_pages > 1:
+            # 行数を減らしたときに，存在しないページを指したままにならないようにする
+            st.session_state.preview_page_t3 = min(st.session_state.get("preview_page_t3", 1), n_pages)
+            page = st.number_input(f"ページ（全{n_pages}ページ）", 1, n_pages, key="preview_page_t3")
+        start = (page - 1) * page_size
+        stop = min(start + page_size, n_body)
+        preview_html = generate_preview_html(header_state.table, body_state.table, start=start, stop=stop)
         st.markdown(preview_html, unsafe_allow_html=True)
+        if n_pages > 1:
+            st.caption(f"{start + 1}〜{stop} 行目を表示中（全{n_body}行）")
         st.info("👆 同じ文字が隣り合うと、このように結合されて表示されます。")
 
     st.markdown("---")
@@ -76,7 +213,24 @@ def render_tab3():
         label = st.text_input("ラベル", "tab:deepsea", key="lbl_t3")
     with c_out2:
         pos = st.selectbox("位置", ["h", "t", "b"], key="pos_t3")
+    escape = st.checkbox("LaTeXの特殊文字（& % $ # _ など）をエスケープ", value=True, key="escape_t3")
+    raw_columns = []
+    if escape:
+        raw_columns = st.multiselect("エスケープしない列（数式やLaTeXコードが入った列）", options=list(range(cols_t3)),
+                                     format_func=lambda i: f"列{i + 1}", key="raw_columns_t3")
 
     if st.button("LaTeXコードを生成", type="primary", key="gen_btn_t3"):
-        latex = generate_complex_latex(edited_header, edited_body, caption, label, pos)
+        # エスケープの設定が変わったときは全行を描き直す
+        raw = frozenset(raw_columns)
+        if 'body_latex_rows_t3' not in st.session_state or st.session_state.get('body_latex_rows_t3_options') != (escape, raw):
+            if escape:
+                render_row = lambda row: complex_row_latex(escape_row(row, raw))
+            else:
+                render_row = complex_row_latex
+            st.session_state.body_latex_rows_t3 = RowRenderCache(render_row)
+            st.session_state.body_latex_rows_t3_options = (escape, raw)
+        with perf.stage("latex_rows", body_state.table):
+            body_lines = st.session_state.body_latex_rows_t3.sync_state(body_state)
+        latex = generate_complex_latex(header_state.table, body_state.table, caption, label, pos, body_lines=body_lines,
+                                       escape=escape, raw_columns=raw)
         st.code(latex, language="latex")
\ No newline at end of file
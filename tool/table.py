@@ -0,0 +1,138 @@
+"""
+変換処理の内部で使う表の表現．
+セルを1本の平らなリストに行優先で並べて持ち，同じ内容の文字列は1つのオブジェクトを共有する（インターン）．
+DataFrame（object型）や行のリストに比べ，行ごとのオブジェクトやインデックスを持たない分だけ小さい．
+"""
+import sys
+
+# インターンするか判定するために抜き出すセル数
+_INTERN_SAMPLE = 1024
+
+
+class Table:
+    """
+    文字列の表．
+    - cells: 行優先に並べたセルのリスト（長さ n_rows * n_cols）
+    - columns: 列名のリスト（ヘッダーが無い表では None）
+    """
+    __slots__ = ("cells", "n_rows", "n_cols", "columns")
+
+    def __init__(self, cells, n_rows, n_cols, columns=None):
+        self.cells = cells
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows, header=False, intern=False):
+        """
+        行のリストから作る．列数の足りない行は空文字で埋める．
+        header=True のときは1行目を列名にする．intern=True はセルがすべて文字列のときだけ使う
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        width = max(map(len, rows), default=0)
+        columns = None
+        if header:
+            columns = list(rows[0]) + [""] * (width - len(rows[0])) if rows else []
+            rows = rows[1:]
+
+        cells = []
+        extend = cells.extend
+        for row in rows:
+            extend(row)
+            if len(row) < width:
+                extend([""] * (width - len(row)))
+        if intern:
+            cells = intern_cells(cells)
+        return cls(cells, len(rows), width, columns)
+
+    @classmethod
+    def from_frame(cls, df):
+        """ DataFrame から作る（列名も引き継ぐ）．セルの型はそのまま """
+        n_rows, n_cols = df.shape
+        cells = df.to_numpy(dtype=object).ravel().tolist() if n_cols else []
+        return cls(cells, n_rows, n_cols, list(df.columns))
+
+    def to_frame(self):
+        """ object 型の DataFrame に変換する """
+        import numpy as np
+        import pandas as pd
+
+        values = np.fromiter(self.cells, dtype=object, count=len(self.cells))
+        return pd.DataFrame(values.reshape(self.n_rows, self.n_cols), columns=self.columns, dtype=object)
+
+    def to_rows(self):
+        """ 行のリスト（ヘッダーは含まない）に変換する """
+        return list(self.rows())
+
+    @property
+    def shape(self):
+        return self.n_rows, self.n_cols
+
+    @property
+    def empty(self):
+        return self.n_rows == 0 or self.n_cols == 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def __iter__(self):
+        return self.rows()
+
+    def __repr__(self):
+        return f"<Table {self.n_rows}x{self.n_cols}>"
+
+    def row(self, i):
+        """ i 行目のセルのリスト（新しいリスト） """
+        if i < 0:
+            i += self.n_rows
+        if not 0 <= i < self.n_rows:
+            raise IndexError(i)
+        start = i * self.n_cols
+        return self.cells[start:start + self.n_cols]
+
+    def rows(self, start=0, stop=None):
+        """ start 行目から stop 行目の手前までの各行を順に返す """
+        n_cols, cells = self.n_cols, self.cells
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        if n_cols == 0:
+            for _ in range(start, stop):
+                yield []
+            return
+        for offset in range(start * n_cols, stop * n_cols, n_cols):
+            yield cells[offset:offset + n_cols]
+
+    def slice(self, start, stop=None):
+        """ start 行目から stop 行目の手前までを新しい Table として返す（列名は引き継がない） """
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        start = min(start, stop)
+        return Table(self.cells[start * self.n_cols:stop * self.n_cols], stop - start, self.n_cols)
+
+    def column(self, j):
+        """ j 列目のセルのリスト """
+        if not 0 <= j < self.n_cols:
+            raise IndexError(j)
+        return self.cells[j::self.n_cols]
+
+    def memory_usage(self):
+        """ セルのリストと，そこから参照される（重複を除いた）文字列の合計バイト数 """
+        seen = set()
+        total = sys.getsizeof(self.cells)
+        for cell in self.cells:
+            if id(cell) not in seen:
+                seen.add(id(cell))
+                total += sys.getsizeof(cell)
+        return total
+
+
+def intern_cells(cells):
+    """
+    同じ内容の文字列セルを1つのオブジェクトにまとめる．
+    sys.intern と違いプロセス全体の表には登録しないので，表を捨てればメモリも解放される．
+    抜き出したセルがほとんど異なる値（乱数の測定値など）の表は，まとめても小さくならないのでそのまま返す
+    """
+    sample = cells[::max(1, len(cells) // _INTERN_SAMPLE)]
+    if len(set(sample)) > len(sample) // 2:
+        return cells
+    shared = {}
+    return list(map(shared.setdefault, cells, cells))
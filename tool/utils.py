@@ -1,38 +1,184 @@
-import pandas as pd
+"""
+表の解析とLaTeX・HTMLへの変換．
+Streamlitにもpandasにも依存せずに読み込めるので，CLIなどからすぐに使える．
+各関数は DataFrame のほか，行のリスト（list of list）や table.Table も受け取れる．
+内部では Table で処理し，pandas は DataFrame を作るときだけ読み込む．
+"""
+import csv
+import html
+import io
+import re
 
-def parse_tab_separated_text(text, use_first_row_as_header=True, use_first_column_as_index=False):
+from . import perf
+from .spans import merge_plan
+from .table import Table, intern_cells
+
+# 自動判別の候補となる区切り文字（優先順）
+DELIMITERS = ("\t", ",", ";")
+# Markdown表（Notionのエクスポートなど）の区切り行: | --- | :---: |
+_MARKDOWN_RULE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+_MARKDOWN_CELL_SEP = re.compile(r"(?<!\\)\|")
+# 3桁区切りのカンマの付いた数値だけの行（"1,234" "-12,345.6"）．カンマ区切りの2列とはみなさない
+_THOUSANDS_LINE = re.compile(r"\s*[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?\s*")
+# str.strip が取り除く空白文字のうち，半角スペース・タブ・改行以外のもの
+_ASCII_SPACES = tuple(c for c in map(chr, range(128)) if c.isspace() and c not in " \t\n")
+_UNICODE_SPACES = tuple(c for c in map(chr, range(128, 0x3001)) if c.isspace())
+# LaTeXの特殊文字の置き換え表．上から順に str.replace で置き換える．
+# "\\" は置き換え後の文字列に { } を含むので，いったん "\x00" に退避して最後に戻す
+_LATEX_ESCAPES = (
+    ("\\", "\x00"),
+    ("&", r"\&"),
+    ("%", r"\%"),
+    ("$", r"\$"),
+    ("#", r"\#"),
+    ("_", r"\_"),
+    ("{", r"\{"),
+    ("}", r"\}"),
+    ("~", r"\textasciitilde{}"),
+    ("^", r"\textasciicircum{}"),
+    ("\x00", r"\textbackslash{}"),
+)
+_LATEX_SPECIALS = "\\&%$#_{}~^"
+_LATEX_SPECIAL = re.compile(r"[\\&%$#_{}~^]")
+# 列のセルを連結してまとめてエスケープするときの区切り（セルに含まれることはまずない制御文字）
+_JOIN_SEP = "\x1f"
+
+def detect_delimiter(text, sample_lines=20):
     """
-    タブ区切りのテキストをDataFrameに変換．
-    - 列数は行ごとの最大列数で揃える
-    - 左上セルは空白化せず，必要に応じてインデックスに設定
+    先頭の数行から区切り文字を推定する．
+    - タブ・カンマ・セミコロンのうち，最も多くの行に現れるものを選ぶ
+    - "1,234" のような3桁区切りの数値だけの行のカンマは数えない（1列の数値の表をカンマで分けない）
+    - すべての行が "|" で始まる場合はMarkdown表として "|" を返す
+    text は前後の空白を除く前のものを渡す（左上の空のセルの前のタブも区切り文字として数える）
     """
-    if not text.strip():
-        return pd.DataFrame()
+    lines = [line for line in text.lstrip("\r\n").splitlines()[:sample_lines] if line.strip()]
+    if not lines:
+        return "\t"
+    if all(line.lstrip().startswith("|") for line in lines):
+        return "|"
+    # ExcelやNotionからの貼り付けはタブ区切りなので最優先
+    if any("\t" in line for line in lines):
+        return "\t"
+    # 出現する行数が多いもの，同数なら出現回数が多いものを選ぶ
+    best, best_score = "\t", (0, 0)
+    for delimiter in DELIMITERS[1:]:
+        counts = [0 if delimiter == "," and _THOUSANDS_LINE.fullmatch(line) else line.count(delimiter)
+                  for line in lines]
+        score = (sum(1 for c in counts if c), sum(counts))
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+def _parse_markdown_rows(text):
+    """ Markdownのパイプ表を行のリストに変換する（区切り行は読み飛ばす） """
+    rows = []
+    for line in text.splitlines():
+        if not line.strip() or _MARKDOWN_RULE.match(line):
+            continue
+        line = line.strip()
+        if line.startswith("|"):
+            line = line[1:]
+        if line.endswith("|") and not line.endswith("\\|"):
+            line = line[:-1]
+        rows.append([c.strip().replace("\\|", "|") for c in _MARKDOWN_CELL_SEP.split(line)])
+    return rows
+
+def _needs_strip(text, delimiter):
+    """
+    セルの前後に空白が付いている可能性があるかを調べる．
+    文字列検索だけで判定できるので，全セルに strip をかけるより十分に速い
+    """
+    if f" {delimiter}" in text or f"{delimiter} " in text or " \n" in text or "\n " in text:
+        return True
+    spaces = _ASCII_SPACES if text.isascii() else _ASCII_SPACES + _UNICODE_SPACES
+    return any(c in text for c in spaces if c != delimiter)
 
-    lines = text.strip().split('\n')
-    data = []
+def parse_rows(text, delimiter=None):
+    """
+    区切りテキストを行（セルのリスト）のリストに変換する．
+    - 引用符が無ければ str.split，あれば Cで実装された csv モジュールで分割するため，大きな貼り付けでも高速
+    - Excelの "..." で囲まれた改行入りセルや CRLF の改行にも対応
+    - delimiter=None のときは detect_delimiter で自動判別する
+    - 行ごとの列数はそろえない（DataFrame作成時にまとめて揃える）
+    """
+    if delimiter is None:
+        # 前後の空白を除く前に判別する（除くと "\ta b" の先頭のタブが消える）
+        delimiter = detect_delimiter(text)
+    text = text.strip()
+    if not text:
+        return []
+    if delimiter == "|":
+        return _parse_markdown_rows(text)
 
-    # 各行をタブで分割
-    for line in lines:
-        cells = line.split('\t')
-        cells = [c.strip() for c in cells]
-        data.append(cells)
+    if '"' in text or "\r" in text:
+        # 引用符付きセル・CRLFは csv モジュールに任せる
+        rows = csv.reader(io.StringIO(text), delimiter=delimiter)
+    else:
+        rows = (line.split(delimiter) for line in text.split("\n"))
+    if not _needs_strip(text, delimiter):
+        return list(rows)
+    strip = str.strip
+    return [list(map(strip, row)) for row in rows]
 
-    # データ全体の最大列数で揃える
-    max_cols = max(len(row) for row in data)
-    for i in range(len(data)):
-        row = data[i]
-        while len(row) < max_cols:
-            row.append("")
-        data[i] = row
+def split_cells(text, delimiter, width=None):
+    """
+    引用符の無い区切りテキストを平らなセルのリストにする．(セル, 列数) を返す．
+    列数の足りない行は空のセルで width 列（省略時は最大の列数）にそろえる
+    """
+    lines = text.split("\n")
+    counts = [line.count(delimiter) for line in lines]
+    if width is None:
+        width = max(counts) + 1
+    if min(counts) + 1 == width:
+        # 全行の列数が同じなら，テキスト全体を1回の split で分割できる
+        return text.replace("\n", delimiter).split(delimiter), width
+    cells = []
+    extend = cells.extend
+    for line, count in zip(lines, counts):
+        extend(line.split(delimiter))
+        if count + 1 < width:
+            extend([""] * (width - count - 1))
+    return cells, width
+
+@perf.timed("parse")
+def parse_table(text, use_first_row_as_header=True, delimiter=None):
+    """
+    区切りテキストを Table に変換する（DataFrame を作らない）．
+    - 列数は行ごとの最大列数で揃える
+    - 全行の列数が同じなら，テキスト全体を1回の split で平らなセルのリストにする
+    """
+    if delimiter is None:
+        # 前後の空白を除く前に判別する（除くと "\ta b" の先頭のタブが消える）
+        delimiter = detect_delimiter(text)
+    text = text.strip()
+    if not text or delimiter == "|" or '"' in text or "\r" in text:
+        return Table.from_rows(parse_rows(text, delimiter), header=use_first_row_as_header, intern=True)
 
-    df = pd.DataFrame(data)
+    cells, width = split_cells(text, delimiter)
+    if _needs_strip(text, delimiter):
+        cells = list(map(str.strip, cells))
 
-    # ヘッダー処理
+    columns = None
     if use_first_row_as_header:
-        header = list(df.iloc[0])
-        df = df.iloc[1:].reset_index(drop=True)
-        df.columns = header
+        columns = cells[:width]
+        del cells[:width]
+    cells = intern_cells(cells)
+    return Table(cells, len(cells) // width, width, columns)
+
+@perf.timed("parse_dataframe")
+def parse_tab_separated_text(text, use_first_row_as_header=True, use_first_column_as_index=False, delimiter=None):
+    """
+    タブ区切りのテキストをDataFrameに変換．
+    - 区切り文字（タブ・カンマ・セミコロン・Markdown表）は自動判別する
+    - 列数は行ごとの最大列数で揃える
+    - 左上セルは空白化せず，必要に応じてインデックスに設定
+    """
+    import pandas as pd
+
+    table = parse_table(text, use_first_row_as_header=use_first_row_as_header, delimiter=delimiter)
+    if table.n_rows == 0 and not table.columns:
+        return pd.DataFrame()
+    df = table.to_frame()
 
     # インデックス処理
     if use_first_column_as_index:
@@ -40,157 +186,350 @@ def parse_tab_separated_text(text, use_first_row_as_header=True, use_first_colum
 
     return df
 
-def dataframe_to_latex(df, caption="", label="", position="h", caption_position="上", left_centered=False):
-    if df.empty:
+def as_table(table, header=True):
+    """
+    DataFrame・行のリスト・Table を Table にそろえる．
+    行のリストは header=True なら1行目を列名とみなす（文字列はコピーしない）
+    """
+    if isinstance(table, Table):
+        return table
+    if hasattr(table, "itertuples"):
+        return Table.from_frame(table)
+    return Table.from_rows(table, header=header, intern=False)
+
+def _table_parts(table):
+    """
+    DataFrame・行のリスト（1行目がヘッダー）・Table を (列名のリスト, データ行のイテレータ, データ行数) に分ける
+    """
+    table = as_table(table)
+    if table.columns is None:
+        # ヘッダーの無い Table は1行目を列名にする
+        if table.n_rows == 0:
+            return [], iter(()), 0
+        return table.row(0), table.rows(1), table.n_rows - 1
+    return list(table.columns), table.rows(), table.n_rows
+
+def _body_parts(body):
+    """ DataFrame・行のリスト（ヘッダーなし）・Table を (列数, データ行のイテレータ) に分ける """
+    body = as_table(body, header=False)
+    return body.n_cols, body.rows()
+
+def _cell_text(value):
+    """ セルの値を文字列にする．None / NaN（data_editorで空にしたセル）は空文字 """
+    if value is None or (isinstance(value, float) and value != value):
         return ""
+    return str(value)
 
-    # 列数はヘッダーの列数
-    num_cols = len(df.columns)
-    col_format = "c" + "c" * (num_cols - 1) if left_centered else "l" + "c" * (num_cols - 1)
+def _has_latex_special(text):
+    # 長い文字列では，正規表現より文字ごとの in（Cの高速な検索）の方が速い
+    return any(c in text for c in _LATEX_SPECIALS)
 
-    latex_code = f"\\begin{{table}}[{position}]\n"
-    latex_code += "    \\centering\n"
+def escape_latex(text):
+    """ 文字列中のLaTeXの特殊文字（& % $ # _ { } ~ ^ \\）をエスケープする """
+    if not _has_latex_special(text):
+        return text
+    if "\x00" in text:
+        # 退避用の文字を含む場合は1文字ずつ置き換える
+        table = dict(_LATEX_ESCAPES[1:-1], **{"\\": r"\textbackslash{}"})
+        return _LATEX_SPECIAL.sub(lambda m: table[m.group()], text)
+    for old, new in _LATEX_ESCAPES:
+        text = text.replace(old, new)
+    return text
 
-    if caption and caption_position == "上":
-        latex_code += f"    \\caption{{{caption}}}\n"
+def escape_column(cells):
+    """
+    セルのリストをまとめてエスケープした新しいリストを返す．
+    区切り文字で1つの文字列に連結し，特殊文字の検索と置き換えを列全体に対して1回ずつで済ませる
+    （セルごとに関数を呼ぶより桁違いに速い）
+    """
+    try:
+        joined = _JOIN_SEP.join(cells)
+    except TypeError:
+        cells = list(map(_cell_text, cells))
+        joined = _JOIN_SEP.join(cells)
+    if not _has_latex_special(joined):
+        return list(cells)
+    escaped = escape_latex(joined).split(_JOIN_SEP)
+    if len(escaped) != len(cells):
+        # 区切り文字を含むセルがあった場合は1つずつ処理する
+        return [escape_latex(cell) for cell in cells]
+    return escaped
+
+def escape_row(cells, raw_columns=()):
+    """ 1行分のセルをエスケープする．raw_columns（0から数えた列番号）の列はそのまま """
+    if not raw_columns:
+        return escape_column(cells)
+    return [cell if i in raw_columns else escape_latex(_cell_text(cell)) for i, cell in enumerate(cells)]
+
+@perf.timed("escape")
+def escape_table(table, raw_columns=()):
+    """
+    表のセルと列名をエスケープした新しい Table を返す．
+    raw_columns（0から数えた列番号）の列は数式やLaTeXコードが入っているものとしてそのまま残す
+    """
+    table = as_table(table)
+    raw = set(raw_columns)
+    n_cols = table.n_cols
+    if not raw:
+        cells = escape_column(table.cells)
+    else:
+        cells = list(table.cells)
+        for j in range(n_cols):
+            if j not in raw:
+                # 列ごとにまとめて処理する（拡張スライスで列を取り出して書き戻す）
+                cells[j::n_cols] = escape_column(cells[j::n_cols])
+    columns = table.columns
+    if columns is not None:
+        columns = escape_row([str(col) for col in columns], raw)
+    return Table(cells, table.n_rows, n_cols, columns)
 
-    latex_code += f"    \\begin{{tabular}}{{{col_format}}}\n"
-    latex_code += "        \\hline\n"
+def latex_row(cells, indent="        "):
+    """ セル列をLaTeXの1行（改行付き）に整形する """
+    try:
+        # ほとんどの表はすべて文字列なので，そのまま連結する
+        return indent + " & ".join(cells) + " \\\\\n"
+    except TypeError:
+        return indent + " & ".join(map(_cell_text, cells)) + " \\\\\n"
 
+def _column_format(num_cols, left_centered):
+    return "c" + "c" * (num_cols - 1) if left_centered else "l" + "c" * (num_cols - 1)
+
+def _header_cells(columns):
     # ヘッダー行：左上セルだけ空白
-    header_cells = [""] + [f"\\text{{{str(col)}}}" for col in df.columns[0:(len(df.columns) - 1)]]
-    latex_code += "        " + " & ".join(header_cells) + " \\\\\n"
-    latex_code += "        \\hline\n"
+    return [""] + [f"\\text{{{str(col)}}}" for col in columns[0:(len(columns) - 1)]]
 
-    # データ行
-    for _, row in df.iterrows():
-        row_data = [str(c) for c in row]
-        latex_code += "        " + " & ".join(row_data) + " \\\\\n"
+def latex_frame(columns, caption="", label="", position="h", caption_position="上", left_centered=False, longtable=False,
+                col_specs=None):
+    """
+    dataframe_to_latex の出力のうちデータ行以外の部分を返す．
+    (データ行より前の部分, データ行の字下げ, データ行より後の部分) の組．
+    col_specs には列ごとの列指定（numeric.column_specs の結果）を渡せる
+    """
+    header_cells = _header_cells(columns)
+    if col_specs is None:
+        col_format = _column_format(len(columns), left_centered)
+    else:
+        col_format = "".join(col_specs)
+        # siunitx の S 列では，数値でない見出しを {} で囲む
+        header_cells = [f"{{{cell}}}" if cell and spec.startswith("S") else cell
+                        for cell, spec in zip(header_cells, col_specs)]
+    if longtable:
+        return _longtable_frame(header_cells, col_format, caption, label, caption_position)
 
-    latex_code += "        \\hline\n"
-    latex_code += "    \\end{tabular}\n"
+    head = [f"\\begin{{table}}[{position}]\n", "    \\centering\n"]
+    if caption and caption_position == "上":
+        head.append(f"    \\caption{{{caption}}}\n")
+    head.append(f"    \\begin{{tabular}}{{{col_format}}}\n")
+    head.append("        \\hline\n")
+    head.append(latex_row(header_cells))
+    head.append("        \\hline\n")
 
+    foot = ["        \\hline\n", "    \\end{tabular}\n"]
     # 下キャプションの場合
     if caption and caption_position == "下":
-        latex_code += f"    \\caption{{{caption}}}\n"
-
+        foot.append(f"    \\caption{{{caption}}}\n")
     if label:
-        latex_code += f"    \\label{{{label}}}\n"
+        foot.append(f"    \\label{{{label}}}\n")
+    foot.append("\\end{table}")
+    return head, "        ", foot
 
-    latex_code += "\\end{table}"
+def _longtable_frame(header_cells, col_format, caption, label, caption_position):
+    """ longtable 環境の枠．ヘッダーは各ページの先頭で繰り返される """
+    head = [f"\\begin{{longtable}}{{{col_format}}}\n"]
 
-    return latex_code
+    first_header = list(header_cells)
+    label_code = f"\\label{{{label}}}" if label else ""
+    if caption and caption_position == "上":
+        head.append(f"    \\caption{{{caption}}}{label_code} \\\\\n")
+    elif label and not caption:
+        # キャプションが無い場合は空の左上セルにラベルを置く
+        first_header[0] = label_code
 
-def generate_preview_html(header_df, body_df):
+    # 最初のページのヘッダー
+    head += ["    \\hline\n", latex_row(first_header, indent="    "), "    \\hline\n", "    \\endfirsthead\n"]
+    # 2ページ目以降のヘッダー
+    head += ["    \\hline\n", latex_row(header_cells, indent="    "), "    \\hline\n", "    \\endhead\n"]
+    head += ["    \\hline\n", "    \\endfoot\n", "    \\hline\n"]
+    if caption and caption_position == "下":
+        head.append(f"    \\caption{{{caption}}}{label_code}\n")
+    head.append("    \\endlastfoot\n")
+    return head, "    ", ["\\end{longtable}"]
+
+def iter_dataframe_latex(df, caption="", label="", position="h", caption_position="上", left_centered=False, longtable=False,
+                         escape=True, raw_columns=(), align_numbers=None, sig_digits=None, thousands=False,
+                         bold_max=False, bold_min=False):
+    """
+    dataframe_to_latex と同じ出力を1行ずつ返すジェネレータ．
+    - 文字列の連結を行わないため，行数に対して線形時間で出力できる
+    - longtable=True のときは複数ページに自動分割される longtable 環境を出力する
+    - escape=True のときはセルと列名のLaTeXの特殊文字をエスケープする（raw_columns の列を除く）
+    - 数値の列の書式（tool/numeric.py）:
+      align_numbers="r" で右揃え，"S" で siunitx の小数点揃え，sig_digits で有効数字，
+      thousands で3桁区切り，bold_max / bold_min で列の最大値・最小値を太字にする
+    - df には DataFrame のほか，1行目をヘッダーとする行のリストも渡せる
+    """
+    col_specs = None
+    if align_numbers or sig_digits or thousands or bold_max or bold_min:
+        # numeric は utils を読み込むので，使うときに読み込む
+        from .numeric import number_table
+        df, col_specs = number_table(df, align_numbers, sig_digits, thousands, bold_max, bold_min,
+                                     left_centered=left_centered, escape=escape, raw_columns=raw_columns)
+    elif escape:
+        df = escape_table(df, raw_columns)
+    columns, rows, n_rows = _table_parts(df)
+    if not columns or n_rows == 0:
+        return
+
+    head, indent, foot = latex_frame(columns, caption=caption, label=label, position=position,
+                                     caption_position=caption_position, left_centered=left_centered,
+                                     longtable=longtable, col_specs=col_specs)
+    yield from head
+    # データ行．Table の平らなセル列から1行ずつ切り出すので，行ごとに Series やタプルを作らない
+    for row in rows:
+        yield latex_row(row, indent)
+    yield from foot
+
+@perf.timed("latex_write")
+def write_dataframe_latex(df, fp, **kwargs):
+    """
+    LaTeXコードをファイルオブジェクト（.texファイルやダウンロード用のバッファ）へ直接書き出す．
+    文字列全体をメモリに保持しない．書き込んだ文字数を返す．
+    """
+    written = 0
+    for chunk in iter_dataframe_latex(df, **kwargs):
+        written += fp.write(chunk)
+    return written
+
+@perf.timed("latex")
+def dataframe_to_latex(df, caption="", label="", position="h", caption_position="上", left_centered=False, longtable=False,
+                       escape=True, raw_columns=(), align_numbers=None, sig_digits=None, thousands=False,
+                       bold_max=False, bold_min=False):
+    return "".join(iter_dataframe_latex(df, caption=caption, label=label, position=position,
+                                        caption_position=caption_position, left_centered=left_centered,
+                                        longtable=longtable, escape=escape, raw_columns=raw_columns,
+                                        align_numbers=align_numbers, sig_digits=sig_digits, thousands=thousands,
+                                        bold_max=bold_max, bold_min=bold_min))
+
+# プレビューの見た目．セルごとに style 属性を付けず，クラスでまとめて指定する
+PREVIEW_CSS = """<style>
+.latex-preview { border-collapse: collapse; width: 100%; text-align: center; font-family: sans-serif; }
+.latex-preview th { background-color: #f0f2f6; border: 1px solid #ddd; padding: 8px; font-weight: bold; }
+.latex-preview td { border: 1px solid #ddd; padding: 6px; }
+</style>"""
+_PREVIEW_TABLE_OPEN = '<table class="latex-preview">'
+
+def preview_header_html(header_df):
+    """ 結合プランからプレビューのヘッダー部分（HTMLの行のリスト）を作る．セルの文字はエスケープする """
+    lines = []
+    for row_plan in merge_plan(header_df):
+        cells = []
+        for span in row_plan:
+            # 上の行と縦に結合されているセルは出力しない
+            if span.covered:
+                continue
+            attrs = ""
+            if span.colspan > 1: attrs += f' colspan="{span.colspan}"'
+            if span.rowspan > 1: attrs += f' rowspan="{span.rowspan}"'
+            cells.append(f"<th{attrs}>{html.escape(span.text)}</th>")
+        lines.append("<tr>" + "".join(cells) + "</tr>")
+    return lines
+
+def preview_row_html(row):
+    """ プレビューのデータ1行分のHTML """
+    return "<tr>" + "".join(f"<td>{html.escape(_cell_text(val))}</td>" for val in row) + "</tr>"
+
+def body_window(body, start=0, stop=None):
+    """ DataFrame・行のリスト・Table の start 行目から stop 行目の手前までを取り出す（他の行には触れない） """
+    if isinstance(body, Table):
+        return body.slice(start, stop)
+    if hasattr(body, "iloc"):
+        return body.iloc[start:stop]
+    return body[start:stop]
+
+@perf.timed("preview_html")
+def generate_preview_html(header_df, body_df, body_lines=None, start=0, stop=None):
     """
     現在のDataFrameの状態から、結合状態を可視化したHTMLを作成する関数
+    - start / stop を指定すると，その範囲のデータ行だけを描画する（大きな表のページ表示用）
+    - body_lines に preview_row_html で描画済みの行を渡すと，body_df の描画を省略する
     """
-    html = ['<table style="border-collapse: collapse; width: 100%; text-align: center; font-family: sans-serif;">']
-    
-    # --- ヘッダー部分の生成 ---
-    header_rows = header_df.values.tolist()
-    n_cols = len(header_df.columns)
-    
-    for r_idx, row in enumerate(header_rows):
-        html.append("<tr>")
-        c_idx = 0
-        while c_idx < n_cols:
-            current_val = str(row[c_idx])
-            colspan = 1
-            rowspan = 1
-            
-            # 横結合チェック
-            while (c_idx + colspan < n_cols) and (str(row[c_idx + colspan]) == current_val):
-                colspan += 1
-            
-            # 縦結合チェック（簡易版：下の行と同じならrowspan=2、上の行と同じならスキップ）
-            is_vertical_merge_start = False
-            skip_cell = False
-            
-            if r_idx + 1 < len(header_rows):
-                if str(header_rows[r_idx+1][c_idx]) == current_val:
-                    rowspan = 2
-                    is_vertical_merge_start = True
-            
-            if r_idx > 0:
-                if str(header_rows[r_idx-1][c_idx]) == current_val:
-                    skip_cell = True
-            
-            # HTML生成
-            if not skip_cell:
-                # スタイル調整
-                bg_color = "#f0f2f6"
-                border = "1px solid #ddd"
-                cell_style = f"background-color: {bg_color}; border: {border}; padding: 8px; font-weight: bold;"
-                
-                # 属性作成
-                attrs = f'style="{cell_style}"'
-                if colspan > 1: attrs += f' colspan="{colspan}"'
-                if rowspan > 1: attrs += f' rowspan="{rowspan}"'
-                
-                html.append(f'<th {attrs}>{current_val}</th>')
-            
-            c_idx += colspan
-        html.append("</tr>")
-    
+    lines = [PREVIEW_CSS, _PREVIEW_TABLE_OPEN]
+    # --- ヘッダー部分の生成（結合プランから描画） ---
+    lines.extend(preview_header_html(header_df))
     # --- ボディ部分の生成 ---
-    for _, row in body_df.iterrows():
-        html.append("<tr>")
-        for val in row:
-            val_str = str(val) if val is not None else ""
-            html.append(f'<td style="border: 1px solid #ddd; padding: 6px;">{val_str}</td>')
-        html.append("</tr>")
-        
-    html.append("</table>")
-    return "\n".join(html)
-
-def generate_complex_latex(header_df, body_df, caption, label, position):
-    """ LaTeXコード生成ロジック（前回のものと同じロジック） """
-    latex = []
-    pos_str = f"[{position}]" if position else ""
-    latex.append(f"\\begin{{table}}{pos_str}")
-    latex.append(f"\\centering")
-    if caption: latex.append(f"\\caption{{{caption}}}")
-    if label: latex.append(f"\\label{{{label}}}")
-    
-    n_cols = len(body_df.columns)
-    latex.append(f"\\begin{{tabular}}{{{'c' * n_cols}}}")
-    latex.append(f"\\toprule")
-
-    header_rows = header_df.values.tolist()
-    for r_idx, row in enumerate(header_rows):
+    if body_lines is None:
+        body_lines = map(preview_row_html, _body_parts(body_window(body_df, start, stop))[1])
+    elif start or stop is not None:
+        body_lines = body_lines[start:stop]
+    lines.extend(body_lines)
+    lines.append("</table>")
+    return "\n".join(lines)
+
+def complex_header_latex(header_df):
+    """ 結合プランからヘッダー部分のLaTeX行（\\cmidrule を含む）を作る """
+    plan = merge_plan(header_df)
+    n_header = len(plan)
+    # 結合セルの下に引く線．縦に結合している場合は一番下の行の後に引く
+    cmidrules = [[] for _ in range(n_header)]
+    lines = []
+    for r_idx, row_plan in enumerate(plan):
         row_latex = []
-        cmidrules = []
-        c_idx = 0
-        while c_idx < n_cols:
-            current_val = str(row[c_idx])
-            colspan = 1
-            while (c_idx + colspan < n_cols) and (str(row[c_idx + colspan]) == current_val):
-                colspan += 1
-            
-            cell_text = current_val
-            if r_idx + 1 < len(header_rows) and str(header_rows[r_idx+1][c_idx]) == current_val:
-                 if r_idx > 0 and str(header_rows[r_idx-1][c_idx]) == current_val: cell_text = ""
-                 else: cell_text = f"\\multirow{{2}}{{*}}{{{current_val}}}"
-            elif r_idx > 0 and str(header_rows[r_idx-1][c_idx]) == current_val: cell_text = ""
-            
-            if colspan > 1:
-                row_latex.append(f"\\multicolumn{{{colspan}}}{{c}}{{{cell_text}}}")
-                if current_val.strip() != "" and (r_idx + 1 < len(header_rows)):
-                     # 下の行のセル構成を見て線を引くか判断（簡易的に全部引く）
-                     cmidrules.append(f"\\cmidrule(lr){{{c_idx+1}-{c_idx+colspan}}}")
+        for span in row_plan:
+            if span.covered or not span.text:
+                cell_text = ""
+            elif span.rowspan > 1:
+                cell_text = f"\\multirow{{{span.rowspan}}}{{*}}{{{span.text}}}"
+            else:
+                cell_text = span.text
+
+            if span.colspan > 1:
+                row_latex.append(f"\\multicolumn{{{span.colspan}}}{{c}}{{{cell_text}}}")
+                bottom = r_idx + span.rowspan - 1
+                if not span.covered and span.text.strip() != "" and bottom + 1 < n_header:
+                    cmidrules[bottom].append((span.col, f"\\cmidrule(lr){{{span.col+1}-{span.col+span.colspan}}}"))
             else:
                 row_latex.append(cell_text)
-            c_idx += colspan
-        
-        latex.append(" & ".join(row_latex) + " \\\\")
-        if cmidrules: latex.append(" ".join(cmidrules))
 
+        lines.append(" & ".join(row_latex) + " \\\\")
+        if cmidrules[r_idx]:
+            lines.append(" ".join(rule for _, rule in sorted(cmidrules[r_idx])))
+    return lines
+
+def complex_row_latex(row):
+    """ generate_complex_latex のデータ1行分 """
+    return " & ".join(map(_cell_text, row)) + " \\\\"
+
+def complex_latex_frame(n_cols, caption, label, position):
+    """ generate_complex_latex の出力のうちヘッダー・データ行以外の部分 (前, 後) """
+    head = []
+    pos_str = f"[{position}]" if position else ""
+    head.append(f"\\begin{{table}}{pos_str}")
+    head.append(f"\\centering")
+    if caption: head.append(f"\\caption{{{caption}}}")
+    if label: head.append(f"\\label{{{label}}}")
+    head.append(f"\\begin{{tabular}}{{{'c' * n_cols}}}")
+    head.append(f"\\toprule")
+    foot = [f"\\bottomrule", f"\\end{{tabular}}", f"\\end{{table}}"]
+    return head, foot
+
+@perf.timed("latex_complex")
+def generate_complex_latex(header_df, body_df, caption, label, position, body_lines=None, escape=True, raw_columns=()):
+    """
+    LaTeXコード生成ロジック（ヘッダーの結合は spans.merge_plan から描画）
+    - escape=True のときはヘッダーとデータのLaTeXの特殊文字をエスケープする（raw_columns の列を除く）
+    - body_lines に complex_row_latex で描画済みの行を渡すと，body_df の描画を省略する（エスケープも済ませておく）
+    """
+    if escape:
+        header_df = escape_table(as_table(header_df, header=False), raw_columns)
+        if body_lines is None:
+            body_df = escape_table(as_table(body_df, header=False), raw_columns)
+    n_cols, rows = _body_parts(body_df)
+    head, foot = complex_latex_frame(n_cols, caption, label, position)
+    latex = list(head)
+    latex.extend(complex_header_latex(header_df))
     latex.append(f"\\midrule")
-    for _, row in body_df.iterrows():
-        row_str = " & ".join([str(x) if x is not None else "" for x in row])
-        latex.append(f"{row_str} \\\\")
-    latex.append(f"\\bottomrule")
-    latex.append(f"\\end{{tabular}}")
-    latex.append(f"\\end{{table}}")
-    return "\n".join(latex)
\ No newline at end of file
+    if body_lines is None:
+        body_lines = (complex_row_latex(row) for row in rows)
+    latex.extend(body_lines)
+    latex.extend(foot)
+    return "\n".join(latex)
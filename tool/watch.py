@@ -0,0 +1,199 @@
+"""
+入力の表ファイルを監視し，変わったファイルだけをLaTeXに変換し直す（実験結果を書き換えながら論文を書くとき用）．
+
+    python -m tool.cli results/ -o tables/ --watch
+    python -m tool.build tables.toml --watch
+
+os.stat のポーリングで監視するので，追加のパッケージは要らない．
+書き込みが続いている間は待ち，(mtime, サイズ) が DEBOUNCE 秒変わらなくなってから1回だけ変換する．
+出力は一時ファイルからの置き換えで書くので，latexmk -pvc などが書きかけの .tex を読むことはない．
+"""
+import os
+import sys
+import time
+
+# 入力の状態を調べる間隔（秒）
+POLL_INTERVAL = 0.1
+# 最後の変化からこの秒数だけ変わらなければ，書き込みが終わったとみなす
+DEBOUNCE = 0.25
+# ディレクトリ・globパターンを調べ直して，増えたファイルを見つける間隔（秒）
+RESCAN_INTERVAL = 1.0
+
+
+def _signature(path):
+    """ ファイルの (mtime_ns, サイズ, inode)．なければ None """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class Watcher:
+    """
+    collect() が返すファイルの変化を調べる．poll() は変化が落ち着いたファイルを返す．
+    最初の poll() はその時点の状態を覚えるだけ（すでに変換済みとみなす）
+    """
+
+    def __init__(self, collect, debounce=DEBOUNCE, rescan_interval=RESCAN_INTERVAL):
+        self.collect = collect
+        self.debounce = debounce
+        self.rescan_interval = rescan_interval
+        self._paths = []
+        self._rescanned = None
+        self._seen = None
+        # path -> (変化後の状態, 最後に変化を見た時刻)
+        self._pending = {}
+
+    def poll(self, now=None):
+        """ 変化してから debounce 秒たったファイルの [(path, mtime_ns)] を返す（消えたファイルは含めない） """
+        now = time.monotonic() if now is None else now
+        if self._rescanned is None or now - self._rescanned >= self.rescan_interval:
+            self._paths = self.collect()
+            self._rescanned = now
+        current = {path: _signature(path) for path in self._paths}
+        current = {path: signature for path, signature in current.items() if signature is not None}
+        if self._seen is None:
+            self._seen = current
+            return []
+
+        for path, signature in current.items():
+            if path in self._pending:
+                if self._pending[path][0] != signature:
+                    self._pending[path] = (signature, now)
+            elif signature != self._seen.get(path):
+                self._pending[path] = (signature, now)
+        settled = []
+        for path, (signature, changed_at) in list(self._pending.items()):
+            if path not in current:
+                del self._pending[path]
+            elif now - changed_at >= self.debounce:
+                del self._pending[path]
+                self._seen[path] = signature
+                settled.append((path, signature[0]))
+        # 消えたファイルは忘れる（作り直されたら変換する）
+        for path in self._seen.keys() - current.keys():
+            del self._seen[path]
+        return sorted(settled)
+
+
+def run(watcher, on_change, interval=POLL_INTERVAL, stop=None):
+    """ interval 秒ごとに watcher.poll() し，変化があれば on_change(変化) を呼ぶ．stop（threading.Event）が立つまで続ける """
+    while stop is None or not stop.is_set():
+        if stop is None:
+            time.sleep(interval)
+        elif stop.wait(interval):
+            break
+        changed = watcher.poll()
+        if changed:
+            on_change(changed)
+
+
+def _since_saved(mtime_ns):
+    """ 入力が保存されてから今までの秒数（監視・待ち・変換・書き込みを含む遅延） """
+    return max(time.time() - mtime_ns / 1e9, 0.0)
+
+
+def regenerate_sources(changed, output_dir, options, report=None, sources=None):
+    """
+    変わった入力だけを変換し直す．[(入力, 出力, 書いたか, 変換の秒数, 保存からの秒数 か 例外)] を返す．
+    sources（監視中の全入力）を渡すと，出力先が他の入力と同じになる入力は変換しない
+    """
+    from .cli import output_collisions, output_path_for, write_file
+
+    collisions = output_collisions(sources, output_dir) if sources else {}
+    results = []
+    for source, mtime_ns in changed:
+        destination = output_path_for(source, output_dir)
+        start = time.perf_counter()
+        try:
+            group = collisions.get(os.path.normpath(destination))
+            if group:
+                raise FileExistsError(f"出力先 {destination} が {', '.join(s for s in group if s != source)} と同じです")
+            written = write_file(source, destination, options)
+        except Exception as e:
+            results.append((source, destination, False, time.perf_counter() - start, e))
+        else:
+            results.append((source, destination, written, time.perf_counter() - start, _since_saved(mtime_ns)))
+        if report is not None:
+            report(_format(*results[-1]))
+    return results
+
+
+def _format(source, destination, written, elapsed, latency):
+    if isinstance(latency, Exception):
+        return f"❌ {source}: {latency}"
+    mark = "🔄" if written else "＝"
+    timing = f"保存から {latency * 1000:.0f} ms"
+    if elapsed is not None:
+        timing = f"変換 {elapsed * 1000:.1f} ms・" + timing
+    return f"{mark} {source} -> {destination}  {timing}" + ("" if written else "（出力は変わらず）")
+
+
+def _print(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+
+
+def watch_sources(watcher, output_dir, options, interval=POLL_INTERVAL, stop=None):
+    """ python -m tool.cli --watch の本体．Ctrl+C まで変わったファイルを変換し続ける """
+    _print("入力を監視しています（Ctrl+C で終了）")
+    try:
+        run(watcher, lambda changed: regenerate_sources(changed, output_dir, options, report=_print,
+                                                        sources=watcher.collect()),
+            interval=interval, stop=stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def manifest_watcher(manifest_path):
+    """ マニフェストと，そこに書かれた各表の入力を監視する Watcher（マニフェストが変われば入力の一覧も変わる） """
+    from .build import load_manifest, plan_tables
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    def collect():
+        try:
+            _, plans = plan_tables(load_manifest(manifest_path), base_dir)
+        except (OSError, ValueError):
+            plans = []
+        return [manifest_path] + sorted({plan["source"] for plan in plans})
+
+    return Watcher(collect)
+
+
+def watch_build(watcher, manifest_path, workers=1, interval=POLL_INTERVAL, stop=None):
+    """
+    python -m tool.build --watch の本体．manifest_watcher() の変化のたびにビルドし直す
+    （build() は変わった表だけを描き直す）
+    """
+    from .build import build
+
+    def on_change(changed):
+        saved = {os.path.abspath(path): mtime_ns for path, mtime_ns in changed}
+        rendered = []
+        start = time.perf_counter()
+        try:
+            result = build(manifest_path, workers=workers, report=lambda plan, outcome: rendered.append(plan))
+        except (OSError, ValueError) as e:
+            _print(f"❌ マニフェストを読み込めません: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        failed = dict(result["failed"])
+        for plan in rendered:
+            # マニフェストだけが変わった（オプションを変えた）表は，マニフェストの保存からの遅延
+            mtime_ns = saved.get(os.path.abspath(plan["source"])) or max(saved.values())
+            latency = failed.get(plan["output"]) or _since_saved(mtime_ns)
+            _print(_format(plan["source"], plan["output"], plan["output"] in result["written"], None, latency))
+        for output, error in result["failed"]:
+            if all(plan["output"] != output for plan in rendered):
+                _print(f"❌ {output}: {error}")
+        _print(f"描き直し {len(result['rendered'])}・書き込み {len(result['written'])}"
+               f"・失敗 {len(result['failed'])} ({elapsed * 1000:.0f} ms)")
+
+    _print("マニフェストと入力を監視しています（Ctrl+C で終了）")
+    try:
+        run(watcher, on_change, interval=interval, stop=stop)
+    except KeyboardInterrupt:
+        pass
+    return 0